@@ -1,11 +1,8 @@
 import sys
 import os
 import shutil
-from PyQt5.QtWidgets import QApplication
 from clans.clans.io.parser import parse_arguments
-from clans.clans.GUI.main_window import MainWindow
 import clans.config as cfg
-from clans.clans_cmd import run_cmd
 
 
 def copy_dir(root_src_dir, root_dst_dir):
@@ -41,6 +38,12 @@ def main():
         print(error)
         print("Cannot parse the command-line arguments")
 
+    # Compile the numba functions, save them in the on-disk cache and exit
+    if cfg.run_params['precompile']:
+        from clans.clans.layouts.precompile import run_precompile
+        run_precompile()
+        return
+
     # Check if 'input_example' directory exists in working directory. If not, copy it
     input_example_local_dir = cfg.run_params['working_dir'] + '/clans/input_example/'
     if not os.path.exists(input_example_local_dir):
@@ -54,6 +57,7 @@ def main():
     # Run the application in command-line mode (no GUI)
     if cfg.run_params['no_gui']:
         try:
+            from clans.clans_cmd import run_cmd
             run_cmd()
 
         except Exception as error:
@@ -61,9 +65,12 @@ def main():
             print("CLANS application cannot be executed in command-line mode")
             exit()
 
-    # Open the GUI
+    # Open the GUI (PyQt5 and vispy are imported only here, so the command-line mode does not depend on them)
     else:
         try:
+            from PyQt5.QtWidgets import QApplication
+            from clans.clans.GUI.main_window import MainWindow
+
             app = QApplication([])
             window = MainWindow()
             window.show()
@@ -0,0 +1,64 @@
+# A benchmark of the start-up (import) time of the command-line mode compared to the GUI mode.                #
+# Each set of modules is imported in a fresh Python process, and the GUI packages it loads are reported.      #
+# Usage: python -m clans.benchmarks.import_time [-repeats 5]                                                  #
+###############################################################################################################
+import argparse
+import statistics
+import subprocess
+import sys
+
+# The modules imported by each start-up path
+import_paths = {'command-line': ['clans.clans.io.parser', 'clans.clans_cmd'],
+                'vispy.color': ['vispy.color'],
+                'GUI': ['clans.clans.io.parser', 'clans.clans.GUI.main_window']}
+
+gui_packages = ['PyQt5', 'vispy']
+
+# The script run in each fresh process: import the modules and print the time and the loaded GUI packages
+timing_script = """
+import sys
+import time
+before = time.perf_counter()
+for module_name in sys.argv[1:]:
+    __import__(module_name)
+after = time.perf_counter()
+print(after - before)
+print(",".join(sorted({name.split('.')[0] for name in sys.modules} & set(""" + repr(gui_packages) + """))))
+"""
+
+
+def time_imports(modules, repeats_num):
+    times = []
+    loaded_packages = ""
+
+    for i in range(repeats_num):
+        result = subprocess.run([sys.executable, "-c", timing_script] + modules, capture_output=True, text=True)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()
+            return None, error[-1] if len(error) > 0 else "Import failed"
+
+        output = result.stdout.strip().splitlines()
+        times.append(float(output[0]))
+        loaded_packages = output[1] if len(output) > 1 else ""
+
+    return statistics.median(times), loaded_packages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-repeats", metavar="repeats", help="The number of fresh processes per start-up path "
+                                                            "(default=5)", type=int, default=5)
+    args = parser.parse_args()
+
+    print("path\tmedian_seconds\tloaded_GUI_packages")
+
+    for path_name in import_paths:
+        median_time, loaded_packages = time_imports(import_paths[path_name], args.repeats)
+        if median_time is None:
+            print(path_name + "\tNA\t(" + loaded_packages + ")")
+        else:
+            print(path_name + "\t" + "{:.3f}".format(median_time) + "\t" + (loaded_packages or "none"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# A headless benchmark suite of the main CLANS stages on reproducible synthetic networks:                  #
+# parsing a CLANS file, preprocessing the sequence pairs, Fruchterman-Reingold rounds (2D / 3D, full data  #
+# and subset mode) and writing the output file. The results are saved in JSON format.                      #
+# Usage: python -m clans.benchmarks.layout_benchmark [-sizes 1000 10000 50000 100000] [-out results.json]   #
+#############################################################################################################
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import numpy as np
+import numba
+import clans.config as cfg
+import clans.clans.data.sequence_pairs as sp
+import clans.clans.io.file_formats.clans_format as clans_format
+import clans.clans.layouts.fruchterman_reingold_class as fr_class
+import clans.benchmarks.synthetic as synthetic
+
+
+def time_parsing(file_path):
+    format_object = clans_format.ClansFormat()
+
+    before = time.time()
+    format_object.read_file(file_path)
+    after = time.time()
+    parse_time = after - before
+
+    before = time.time()
+    format_object.fill_values()
+    after = time.time()
+    fill_time = after - before
+
+    return parse_time, fill_time
+
+
+def time_preprocessing():
+    before = time.time()
+    sp.calculate_attraction_values()
+    sp.define_connected_sequences('hsp')
+    sp.define_connected_sequences_list()
+    after = time.time()
+
+    return after - before
+
+
+def time_layout(dim_num, is_subset_mode, rounds_num):
+    cfg.run_params['dimensions_num_for_clustering'] = dim_num
+
+    fr = fr_class.FruchtermanReingold(cfg.sequences_array['x_coor'], cfg.sequences_array['y_coor'],
+                                      cfg.sequences_array['z_coor'])
+
+    # The first round includes the compilation of the numba functions (if not compiled yet)
+    before = time.time()
+    fr.calculate_new_positions(is_subset_mode)
+    after = time.time()
+    first_round_time = after - before
+
+    before = time.time()
+    for i in range(rounds_num):
+        fr.calculate_new_positions(is_subset_mode)
+    after = time.time()
+    rounds_time = after - before
+
+    return {'first_round_seconds': first_round_time,
+            'seconds_per_round': rounds_time / rounds_num,
+            'rounds_per_second': rounds_num / rounds_time if rounds_time > 0 else None}
+
+
+def time_writing(file_path):
+    format_object = clans_format.ClansFormat()
+
+    before = time.time()
+    format_object.write_file(file_path, False, 0)
+    after = time.time()
+
+    return after - before
+
+
+def run_benchmark(seq_num, density, seed, rounds_num, subset_fraction, work_dir):
+    results = {'sequences': seq_num, 'density': density}
+    file_path = os.path.join(work_dir, "synthetic_" + str(seq_num) + ".clans")
+
+    before = time.time()
+    synthetic.create_synthetic_dataset(seq_num, density, seed)
+    after = time.time()
+    results['generation_seconds'] = after - before
+    results['pairs'] = len(cfg.pairs_index1)
+
+    # Write the synthetic network (this is also the input file for the parsing benchmark)
+    results['write_seconds'] = time_writing(file_path)
+    results['file_size_bytes'] = os.path.getsize(file_path)
+
+    results['parse_seconds'], results['fill_values_seconds'] = time_parsing(file_path)
+    results['preprocessing_seconds'] = time_preprocessing()
+    results['connections'] = cfg.run_params['connections_num']
+
+    # Select a random subset of the sequences for the subset-mode benchmark
+    rng = np.random.default_rng(seed)
+    cfg.sequences_array['in_subset'] = rng.random(seq_num) < subset_fraction
+    subset_size = int(np.sum(cfg.sequences_array['in_subset']))
+    sp.define_connected_sequences_list_subset(subset_size)
+    results['subset_sequences'] = subset_size
+
+    results['layout'] = dict()
+    for dim_num in (2, 3):
+        for is_subset_mode in (False, True):
+            mode = str(dim_num) + "D_" + ("subset" if is_subset_mode else "full")
+            results['layout'][mode] = time_layout(dim_num, is_subset_mode, rounds_num)
+
+    os.remove(file_path)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-sizes", metavar="sequences_num", help="The numbers of sequences of the synthetic networks "
+                                                                "(default: 1000 10000 50000 100000)", type=int,
+                        nargs='+', default=[1000, 10000, 50000, 100000])
+    parser.add_argument("-density", metavar="edges_density", help="The fraction of the pairs of sequences which have "
+                                                                  "an HSP (default=0.001)", type=float, default=0.001)
+    parser.add_argument("-rounds", metavar="rounds", help="The number of layout rounds to time in each mode "
+                                                          "(default=3)", type=int, default=3)
+    parser.add_argument("-subset", metavar="subset_fraction", help="The fraction of sequences selected for the "
+                                                                   "subset mode (default=0.2)", type=float, default=0.2)
+    parser.add_argument("-seed", metavar="seed", help="Random seed for the synthetic networks (default=0)", type=int,
+                        default=0)
+    parser.add_argument("-threads", metavar="number_of_threads", help="The number of threads to use in the layout "
+                                                                      "calculation (default: all the available cores)",
+                        type=int)
+    parser.add_argument("--barnes_hut", help="Use the Barnes-Hut approximation of the repulsive forces",
+                        action='store_true', default=False)
+    parser.add_argument("-out", metavar="json_file_path", help="A destination path for the results in JSON format "
+                                                               "(default: print to the screen)", type=str)
+    args = parser.parse_args()
+
+    cfg.run_params['is_barnes_hut'] = args.barnes_hut
+    cfg.run_params['threads_num'] = args.threads
+
+    report = {'clans_version': cfg.version,
+              'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+              'platform': platform.platform(),
+              'python': platform.python_version(),
+              'numpy': np.__version__,
+              'numba': numba.__version__,
+              'available_cores': numba.config.NUMBA_NUM_THREADS,
+              'threads': args.threads if args.threads is not None else numba.config.NUMBA_NUM_THREADS,
+              'barnes_hut': args.barnes_hut,
+              'theta': cfg.run_params['theta'],
+              'seed': args.seed,
+              'rounds': args.rounds,
+              'benchmarks': []}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for seq_num in args.sizes:
+            print("Running the benchmark of " + str(seq_num) + " sequences")
+            report['benchmarks'].append(run_benchmark(seq_num, args.density, args.seed, args.rounds, args.subset,
+                                                      work_dir))
+
+    if args.out is not None:
+        with open(args.out, "w") as outfile:
+            json.dump(report, outfile, indent=2)
+        print("The results were saved in " + args.out)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import numpy as np
+import clans.config as cfg
+import clans.clans.data.sequences as seq
+import clans.clans.data.sequence_pairs as sp
+
+
+# Generate a reproducible (seeded) synthetic HSP network.
+# The sequences are divided into clusters and most of the pairs are drawn within the clusters (with low E-values),
+# while the rest connect random sequences (with higher E-values), similar to real sequence-similarity networks.
+# density: the fraction of all the possible pairs (N*(N-1)/2) which have an HSP.
+# Returns the (non-redundant, unsorted) indices arrays of the pairs and their E-values
+def generate_network(seq_num, density, seed=0, clusters_num=None, intra_cluster_fraction=0.8):
+    rng = np.random.default_rng(seed)
+
+    if clusters_num is None:
+        clusters_num = max(1, seq_num // 100)
+
+    pairs_num = int(density * seq_num * (seq_num - 1) / 2)
+    intra_pairs_num = int(pairs_num * intra_cluster_fraction)
+    inter_pairs_num = pairs_num - intra_pairs_num
+
+    # Assign each sequence to a cluster and sort the sequences by clusters
+    clusters = rng.integers(0, clusters_num, seq_num)
+    sequences_by_clusters = np.argsort(clusters, kind='stable')
+    clusters_start = np.searchsorted(clusters[sequences_by_clusters], np.arange(clusters_num))
+    clusters_size = np.bincount(clusters, minlength=clusters_num)
+
+    # Pairs within the clusters: a random sequence and a random member of its cluster
+    index1 = rng.integers(0, seq_num, intra_pairs_num)
+    cluster_of_index1 = clusters[index1]
+    member = (rng.random(intra_pairs_num) * clusters_size[cluster_of_index1]).astype(int)
+    index2 = sequences_by_clusters[clusters_start[cluster_of_index1] + member]
+    intra_evalues = 10.0 ** -rng.uniform(5, 100, intra_pairs_num)
+
+    # Random pairs between the clusters
+    inter_index1 = rng.integers(0, seq_num, inter_pairs_num)
+    inter_index2 = rng.integers(0, seq_num, inter_pairs_num)
+    inter_evalues = 10.0 ** -rng.uniform(0, 8, inter_pairs_num)
+
+    index1 = np.concatenate((index1, inter_index1))
+    index2 = np.concatenate((index2, inter_index2))
+    evalues = np.concatenate((intra_evalues, inter_evalues))
+
+    return index1, index2, evalues
+
+
+# Fill the global data-structures with a synthetic network of seq_num sequences (with random initial positions)
+def create_synthetic_dataset(seq_num, density, seed=0):
+    rng = np.random.default_rng(seed)
+
+    cfg.run_params['total_sequences_num'] = seq_num
+    cfg.run_params['type_of_values'] = 'hsp'
+
+    coordinates = rng.uniform(-1, 1, (seq_num, 3))
+    sequences_list = []
+    for i in range(seq_num):
+        x_coor, y_coor, z_coor = coordinates[i]
+        sequences_list.append(('seq_' + str(i), 'M', 1, 0.0, '', '', x_coor, y_coor, z_coor, False,
+                               x_coor, y_coor, z_coor))
+    seq.create_sequences_array(sequences_list)
+    seq.init_groups_by_categories()
+
+    index1, index2, evalues = generate_network(seq_num, density, seed)
+    sp.set_similarity_values(index1, index2, evalues, 'hsp')
+    sp.calculate_attraction_values()
+    sp.define_connected_sequences('hsp')
@@ -0,0 +1,83 @@
+# A benchmark of the Fruchterman-Reingold layout calculation speed as a function of the number of threads #
+# Usage: python -m clans.benchmarks.threads_scaling [-sizes 2000 5000] [-threads 1 2 4 8] [-rounds 5]       #
+#############################################################################################################
+import argparse
+import time
+import numba
+import clans.config as cfg
+import clans.clans.data.sequence_pairs as sp
+import clans.clans.layouts.fruchterman_reingold_class as fr_class
+import clans.benchmarks.synthetic as synthetic
+
+
+def time_rounds(seq_num, threads_num, rounds_num):
+    cfg.run_params['threads_num'] = threads_num
+
+    fr = fr_class.FruchtermanReingold(cfg.sequences_array['x_coor'], cfg.sequences_array['y_coor'],
+                                      cfg.sequences_array['z_coor'])
+
+    # The first round also includes the compilation of the numba functions (if not compiled yet)
+    fr.calculate_new_positions(False)
+
+    before = time.time()
+    for i in range(rounds_num):
+        fr.calculate_new_positions(False)
+    after = time.time()
+
+    return (after - before) / rounds_num
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-sizes", metavar="sequences_num", help="The numbers of sequences to test (default: 2000 "
+                                                                "5000)", type=int, nargs='+', default=[2000, 5000])
+    parser.add_argument("-density", metavar="edges_density", help="The fraction of pairs which are connected "
+                                                                  "(default=0.005)", type=float, default=0.005)
+    parser.add_argument("-threads", metavar="threads_num", help="The numbers of threads to test (default: 1, 2, 4... "
+                                                                "up to the number of available cores)",
+                        type=int, nargs='+')
+    parser.add_argument("-rounds", metavar="rounds", help="The number of rounds to time (default=5)", type=int,
+                        default=5)
+    parser.add_argument("-cluster2d", help="Perform the clustering in 2D instead of 3D", action='store_true',
+                        default=False)
+    parser.add_argument("--barnes_hut", help="Use the Barnes-Hut approximation of the repulsive forces",
+                        action='store_true', default=False)
+    parser.add_argument("-seed", metavar="seed", help="Random seed for the synthetic networks (default=0)", type=int,
+                        default=0)
+    args = parser.parse_args()
+
+    if args.threads is None:
+        threads_list = []
+        threads_num = 1
+        while threads_num < numba.config.NUMBA_NUM_THREADS:
+            threads_list.append(threads_num)
+            threads_num *= 2
+        threads_list.append(numba.config.NUMBA_NUM_THREADS)
+    else:
+        threads_list = [t for t in args.threads if 1 <= t <= numba.config.NUMBA_NUM_THREADS]
+
+    if args.cluster2d:
+        cfg.run_params['dimensions_num_for_clustering'] = 2
+    else:
+        cfg.run_params['dimensions_num_for_clustering'] = 3
+    cfg.run_params['is_barnes_hut'] = args.barnes_hut
+
+    print("Available cores: " + str(numba.config.NUMBA_NUM_THREADS))
+    print("sequences\tconnections\tthreads\tseconds_per_round\tspeedup")
+
+    for seq_num in args.sizes:
+        synthetic.create_synthetic_dataset(seq_num, args.density, args.seed)
+        sp.define_connected_sequences_list()
+
+        # The speedup is relative to the first (smallest) number of threads
+        first_round_time = None
+        for threads_num in threads_list:
+            round_time = time_rounds(seq_num, threads_num, args.rounds)
+            if first_round_time is None:
+                first_round_time = round_time
+            print(str(seq_num) + "\t" + str(cfg.run_params['connections_num']) + "\t" + str(threads_num) + "\t" +
+                  "{:.4f}".format(round_time) + "\t" + "{:.2f}".format(first_round_time / round_time))
+
+
+if __name__ == "__main__":
+    main()
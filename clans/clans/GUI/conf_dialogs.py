@@ -51,6 +51,23 @@ class FruchtermanReingoldConfig(QDialog):
         self.cooling_label = QLabel("Cooling")
         self.cooling = QLineEdit(str(cfg.run_params['cooling']))
 
+        self.barnes_hut_label = QLabel("Barnes-Hut approximation")
+        self.barnes_hut = QCheckBox()
+        self.barnes_hut.setChecked(cfg.run_params['is_barnes_hut'])
+
+        self.theta_label = QLabel("Barnes-Hut theta")
+        self.theta = QLineEdit(str(cfg.run_params['theta']))
+
+        self.fps_label = QLabel("Redraw rate (frames per second, 0 = every round)")
+        self.fps = QLineEdit(str(cfg.run_params['frames_per_second']))
+
+        self.rounds_per_frame_label = QLabel("Rounds per redraw (0 = by the redraw rate)")
+        self.rounds_per_frame = QLineEdit(str(cfg.run_params['rounds_per_frame']))
+
+        self.multilevel_label = QLabel("Multilevel initialization of the coordinates")
+        self.multilevel = QCheckBox()
+        self.multilevel.setChecked(cfg.run_params['is_multilevel'])
+
         self.layout.addWidget(self.att_val_label, 0, 0)
         self.layout.addWidget(self.att_val, 0, 1)
 
@@ -75,6 +92,21 @@ class FruchtermanReingoldConfig(QDialog):
         self.layout.addWidget(self.cooling_label, 7, 0)
         self.layout.addWidget(self.cooling, 7, 1)
 
+        self.layout.addWidget(self.barnes_hut_label, 8, 0)
+        self.layout.addWidget(self.barnes_hut, 8, 1)
+
+        self.layout.addWidget(self.theta_label, 9, 0)
+        self.layout.addWidget(self.theta, 9, 1)
+
+        self.layout.addWidget(self.fps_label, 10, 0)
+        self.layout.addWidget(self.fps, 10, 1)
+
+        self.layout.addWidget(self.rounds_per_frame_label, 11, 0)
+        self.layout.addWidget(self.rounds_per_frame, 11, 1)
+
+        self.layout.addWidget(self.multilevel_label, 12, 0)
+        self.layout.addWidget(self.multilevel, 12, 1)
+
         # Add the OK/Cancel standard buttons
         self.button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         self.button_box.accepted.connect(self.accept)
@@ -136,7 +168,27 @@ class FruchtermanReingoldConfig(QDialog):
         else:
             cooling = cfg.run_params['cooling']
 
-        return att_val, att_exp, rep_val, rep_exp, gravity, dampening, maxmove, cooling
+        is_barnes_hut = self.barnes_hut.isChecked()
+
+        if re.search(r"^\d+(\.\d+)?$", self.theta.text()):
+            theta = float(self.theta.text())
+        else:
+            theta = cfg.run_params['theta']
+
+        if re.search(r"^\d+(\.\d+)?$", self.fps.text()):
+            fps = float(self.fps.text())
+        else:
+            fps = cfg.run_params['frames_per_second']
+
+        if re.search(r"^\d+$", self.rounds_per_frame.text()):
+            rounds_per_frame = int(self.rounds_per_frame.text())
+        else:
+            rounds_per_frame = cfg.run_params['rounds_per_frame']
+
+        is_multilevel = self.multilevel.isChecked()
+
+        return att_val, att_exp, rep_val, rep_exp, gravity, dampening, maxmove, cooling, is_barnes_hut, theta, fps, \
+            rounds_per_frame, is_multilevel
 
 
 class NodesConfig(QDialog):
@@ -946,7 +946,8 @@ class EditCategoriesDialog(QDialog):
         cfg.groups_by_categories[category_index]['is_bold'] = True
         cfg.groups_by_categories[category_index]['is_italic'] = False
         cfg.groups_by_categories[category_index]['groups'] = dict()
-        cfg.groups_by_categories[category_index]['sequences'] = np.full(cfg.run_params['total_sequences_num'], -1)
+        cfg.groups_by_categories[category_index]['sequences'] = \
+            np.full(cfg.run_params['total_sequences_num'], -1, dtype=np.int32)
 
         # Open the Edit Category dialog to let the user configure the new category
         try:
@@ -1,4 +1,4 @@
-from PyQt5.QtCore import QThreadPool, QUrl
+from PyQt5.QtCore import QThreadPool, QUrl, QTimer
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import QDesktopServices
 from vispy import app, scene
@@ -14,7 +14,9 @@ import clans.clans.io.io_gui as io
 import clans.clans.io.file_formats.clans_format as clans_format
 import clans.clans.io.file_formats.tab_delimited_format as tab_format
 import clans.clans.layouts.layout_gui as lg
+import clans.clans.layouts.layout_process as lp
 import clans.clans.layouts.fruchterman_reingold_class as fr_class
+import clans.clans.layouts.multilevel_layout as multilevel
 import clans.clans.graphics.network3d as net
 import clans.clans.graphics.colorbar as colorbar
 import clans.clans.graphics.colors as colors
@@ -52,6 +54,9 @@ class MainWindow(QMainWindow):
         # Define a runner that will be executed in a different thread
         self.run_calc_worker = None
 
+        # The layout process (when the calculation is performed in a separate process)
+        self.layout_process = None
+
         # Define an object to hold the fruchterman-reingold calculation information
         self.fr_object = None
 
@@ -85,6 +90,12 @@ class MainWindow(QMainWindow):
         self.done_color_by_length = 0
         self.load_file_worker = None
 
+        # A timer to restore the display of all the connections when the view is idle (after rotation)
+        self.edges_lod_timer = QTimer()
+        self.edges_lod_timer.setSingleShot(True)
+        self.edges_lod_timer.setInterval(cfg.run_params['edges_lod_idle_time'])
+        self.edges_lod_timer.timeout.connect(self.restore_all_edges)
+
         self.setWindowTitle("CLANS " + str(self.dim_num) + "D-View")
         self.setGeometry(50, 50, 1400, 1000)
 
@@ -608,6 +619,11 @@ class MainWindow(QMainWindow):
         qApp.closeAllWindows()
         QApplication.quit()
 
+    def closeEvent(self, event):
+        # Stop the layout process (if any) and free its shared memory
+        self.close_layout_process()
+        super().closeEvent(event)
+
     # Bring all the buttons to their default state
     def reset_window(self):
 
@@ -701,11 +717,12 @@ class MainWindow(QMainWindow):
         cfg.seq_by_tax_level_dict['Phylum'] = {}
         cfg.seq_by_tax_level_dict['Kingdom'] = {}
         cfg.seq_by_tax_level_dict['Domain'] = {}
-        cfg.similarity_values_list = []
-        cfg.similarity_values_mtx = []
-        cfg.attraction_values_mtx = []
-        cfg.connected_sequences_mtx = []
-        cfg.connected_sequences_mtx_subset = []
+        cfg.pairs_index1 = np.zeros(0, dtype=int)
+        cfg.pairs_index2 = np.zeros(0, dtype=int)
+        cfg.similarity_values = np.zeros(0)
+        cfg.attraction_values = np.zeros(0)
+        cfg.connected_pairs = np.zeros(0, dtype=bool)
+        cfg.sorted_pairs_order = None
         cfg.connected_sequences_list = []
         cfg.att_values_for_connected_list = []
         cfg.connected_sequences_list_subset = []
@@ -820,7 +837,7 @@ class MainWindow(QMainWindow):
             self.color_by_submenu.setEnabled(True)
             self.color_by_param_action.setEnabled(True)
 
-            if cfg.run_params['input_format'] == 'clans':
+            if cfg.run_params['input_format'] == 'clans' or cfg.run_params['input_format'] == 'binary':
                 self.color_by_length_action.setEnabled(True)
 
             # Enable the controls
@@ -1040,11 +1057,29 @@ class MainWindow(QMainWindow):
         if self.is_running_calc == 0:
 
             # Create a new calculation worker
-            self.run_calc_worker = lg.LayoutCalculationWorker(self.fr_object, self.is_subset_mode)
+            # (the calculation is performed in a separate process or in a thread of the GUI process)
+            if cfg.run_params['is_layout_process']:
+                try:
+                    self.init_layout_process()
+                except Exception as err:
+                    error_msg = "An error occurred: cannot start the layout process"
+                    error_occurred(self.init_layout_process, 'init_layout_process', err, error_msg)
+                    return
+                self.run_calc_worker = lg.LayoutProcessWorker(self.layout_process, self.fr_object,
+                                                              self.is_subset_mode)
+            else:
+                self.run_calc_worker = lg.LayoutCalculationWorker(self.fr_object, self.is_subset_mode)
             self.run_calc_worker.signals.finished_iteration.connect(self.update_plot)
             self.run_calc_worker.signals.stopped.connect(self.stopped_state)
             self.is_running_calc = 1
 
+            # Display only a sample of the connections during the calculation
+            try:
+                self.network_plot.set_edges_lod(1, self.dim_num)
+            except Exception as err:
+                error_msg = "An error occurred: cannot update the connecting lines"
+                error_occurred(self.network_plot.set_edges_lod, 'set_edges_lod', err, error_msg)
+
             # Hide the connections
             self.connections_button.setChecked(False)
             self.manage_connections()
@@ -1118,35 +1153,56 @@ class MainWindow(QMainWindow):
             # Execute
             self.threadpool.start(self.run_calc_worker)
 
+    # Draw the last coordinates passed by the calculation worker
+    # (the worker may perform several rounds between two frames)
     def update_plot(self):
 
+        coordinates, rounds = self.run_calc_worker.snapshot.read()
+
         try:
-            self.network_plot.update_data(self.dim_num, self.fr_object, 1, self.color_by)
+            self.network_plot.update_data(self.dim_num, self.fr_object, 1, self.color_by, coordinates)
         except Exception as err:
             error_msg = "An error occurred: cannot update the graph"
             error_occurred(self.network_plot.update_data, 'update_data', err, error_msg)
             return
+        finally:
+            self.run_calc_worker.snapshot.release()
 
         # Full data mode
         if self.is_subset_mode == 0:
-            self.rounds_done += 1
+            self.rounds_done += rounds
             self.round_num_label.setText(str(self.rounds_done))
 
             if cfg.run_params['is_debug_mode']:
-                if self.rounds_done % 100 == 0:
+                if self.rounds_done // 100 > (self.rounds_done - rounds) // 100:
                     self.after = time.time()
                     duration = (self.after - self.before)
                     print("The calculation of " + str(self.rounds_done) + " rounds took " + str(duration) + " seconds")
 
         # Subset mode
         else:
-            self.rounds_done_subset += 1
+            self.rounds_done_subset += rounds
             self.round_num_label.setText(str(self.rounds_done_subset))
 
     def stop_calc(self):
         if self.is_running_calc == 1:
             self.run_calc_worker.stop()
 
+    # Start the layout process (once), or start it again when the size of the coordinates has changed
+    def init_layout_process(self):
+        if self.layout_process is not None and self.layout_process.is_alive() and \
+                self.layout_process.shape == self.fr_object.coordinates.shape:
+            return
+
+        self.close_layout_process()
+        self.layout_process = lp.LayoutProcess(self.fr_object.coordinates.shape[0],
+                                               self.fr_object.coordinates.shape[1])
+
+    def close_layout_process(self):
+        if self.layout_process is not None:
+            self.layout_process.close()
+            self.layout_process = None
+
     def stopped_state(self, error):
         if self.is_subset_mode == 0:
             self.after = time.time()
@@ -1159,6 +1215,9 @@ class MainWindow(QMainWindow):
         self.start_button.setText("Resume clustering")
         self.is_running_calc = 0
 
+        # Display all the connections again
+        self.restore_all_edges()
+
         # Enable all settings buttons
         self.init_button.setEnabled(True)
         self.start_button.setEnabled(True)
@@ -1239,14 +1298,6 @@ class MainWindow(QMainWindow):
                 error_occurred(seq.update_positions, 'update_positions', err, error_msg)
                 return
 
-        # Calculate the azimuth and elevation angles of the new points positions
-        try:
-            self.network_plot.calculate_initial_angles()
-        except Exception as err:
-            error_msg = "An error occurred: cannot calculate angles"
-            error_occurred(self.network_plot.calculate_initial_angles, 'calculate_initial_angles', err, error_msg)
-            return
-
         # Update the global variable of number of rounds
         cfg.run_params['rounds_done'] = self.rounds_done
 
@@ -1272,6 +1323,17 @@ class MainWindow(QMainWindow):
                 cfg.sequences_array['x_coor_subset'], cfg.sequences_array['y_coor_subset'], \
                 cfg.sequences_array['z_coor_subset'] = seq.init_positions(cfg.run_params['total_sequences_num'])
 
+                # Multilevel initialization of the subset sequences (by the connections inside the subset)
+                if cfg.run_params['is_multilevel']:
+                    in_subset = cfg.sequences_array['in_subset']
+                    subset_x, subset_y, subset_z = \
+                        multilevel.calculate_multilevel_positions(np.count_nonzero(in_subset),
+                                                                  cfg.connected_sequences_list_subset,
+                                                                  cfg.att_values_for_connected_list_subset)
+                    cfg.sequences_array['x_coor_subset'][in_subset] = subset_x
+                    cfg.sequences_array['y_coor_subset'][in_subset] = subset_y
+                    cfg.sequences_array['z_coor_subset'][in_subset] = subset_z
+
                 # Update the coordinates in the fruchterman-reingold object
                 try:
                     self.fr_object.init_calculation(cfg.sequences_array['x_coor_subset'],
@@ -1284,8 +1346,14 @@ class MainWindow(QMainWindow):
 
             # Full mode -> Init the whole dataset
             else:
-                cfg.sequences_array['x_coor'], cfg.sequences_array['y_coor'], cfg.sequences_array['z_coor'] = \
-                    seq.init_positions(cfg.run_params['total_sequences_num'])
+                if cfg.run_params['is_multilevel']:
+                    cfg.sequences_array['x_coor'], cfg.sequences_array['y_coor'], cfg.sequences_array['z_coor'] = \
+                        multilevel.calculate_multilevel_positions(cfg.run_params['total_sequences_num'],
+                                                                  cfg.connected_sequences_list,
+                                                                  cfg.att_values_for_connected_list)
+                else:
+                    cfg.sequences_array['x_coor'], cfg.sequences_array['y_coor'], cfg.sequences_array['z_coor'] = \
+                        seq.init_positions(cfg.run_params['total_sequences_num'])
 
                 # Update the coordinates in the fruchterman-reingold object
                 try:
@@ -1304,14 +1372,6 @@ class MainWindow(QMainWindow):
                 error_occurred(self.network_plot.update_data, 'update_data', err, error_msg)
                 return
 
-            # Calculate the angles of each point for future use when having rotations
-            try:
-                self.network_plot.calculate_initial_angles()
-            except Exception as err:
-                error_msg = "An error occurred: cannot calculate angles"
-                error_occurred(self.network_plot.calculate_initial_angles, 'calculate_initial_angles', err, error_msg)
-                return
-
             print("Coordinates were initiated.")
 
             # Move back to interactive mode
@@ -1579,7 +1639,13 @@ class MainWindow(QMainWindow):
             if conf_dlg.exec_():
                 cfg.run_params['att_val'], cfg.run_params['att_exp'], cfg.run_params['rep_val'], \
                 cfg.run_params['rep_exp'], cfg.run_params['gravity'], cfg.run_params['dampening'], \
-                cfg.run_params['maxmove'], cfg.run_params['cooling'] = conf_dlg.get_parameters()
+                cfg.run_params['maxmove'], cfg.run_params['cooling'], cfg.run_params['is_barnes_hut'], \
+                cfg.run_params['theta'], cfg.run_params['frames_per_second'], \
+                cfg.run_params['rounds_per_frame'], cfg.run_params['is_multilevel'] = conf_dlg.get_parameters()
+
+                # Pass the new parameters to the running layout process
+                if self.is_running_calc == 1 and self.layout_process is not None:
+                    self.layout_process.update_params()
 
         except Exception as err:
             error_msg = "An error occurred: cannot update the Fruchterman-Reingold layout parameters."
@@ -2746,7 +2812,8 @@ class MainWindow(QMainWindow):
                 cfg.groups_by_categories[self.group_by]['is_bold'] = is_bold
                 cfg.groups_by_categories[self.group_by]['is_italic'] = is_italic
                 cfg.groups_by_categories[self.group_by]['groups'] = dict()
-                cfg.groups_by_categories[self.group_by]['sequences'] = np.full(cfg.run_params['total_sequences_num'], -1)
+                cfg.groups_by_categories[self.group_by]['sequences'] = \
+                    np.full(cfg.run_params['total_sequences_num'], -1, dtype=np.int32)
 
                 # Generate distinct colors according to the number of groups in the chosen level
                 try:
@@ -2830,7 +2897,7 @@ class MainWindow(QMainWindow):
                     cfg.groups_by_categories[category_index]['is_italic'] = is_italic
                     cfg.groups_by_categories[category_index]['groups'] = dict()
                     cfg.groups_by_categories[category_index]['sequences'] = \
-                        np.full(cfg.run_params['total_sequences_num'], -1)
+                        np.full(cfg.run_params['total_sequences_num'], -1, dtype=np.int32)
 
                     # Generate distinct colors according to the number of groups in the chosen level
                     if "Not assigned" in groups_dict[category]:
@@ -2920,7 +2987,8 @@ class MainWindow(QMainWindow):
         cfg.groups_by_categories[category_index]['is_bold'] = True
         cfg.groups_by_categories[category_index]['is_italic'] = False
         cfg.groups_by_categories[category_index]['groups'] = dict()
-        cfg.groups_by_categories[category_index]['sequences'] = np.full(cfg.run_params['total_sequences_num'], -1)
+        cfg.groups_by_categories[category_index]['sequences'] = \
+            np.full(cfg.run_params['total_sequences_num'], -1, dtype=np.int32)
 
         # Open the Edit Category dialog to let the user configure the new category
         try:
@@ -3008,6 +3076,10 @@ class MainWindow(QMainWindow):
         if event.button == 1:
             self.canvas_mouse_drag(event)
 
+        # The view is rotated / moved by the camera
+        if self.mode == "interactive" and event.is_dragging:
+            self.start_edges_lod()
+
     def on_canvas_mouse_double_click(self, event):
         if event.button == 1:
             self.canvas_mouse_double_click(event)
@@ -3024,6 +3096,29 @@ class MainWindow(QMainWindow):
         if event.key == 'Control':
             self.canvas_CTRL_release(event)
 
+    # While the view is moving, display only a sample of the connections
+    # (all the connections are displayed again when the view has been idle for a short time)
+    def start_edges_lod(self):
+        if self.is_show_connections and cfg.run_params['edges_lod_budget'] > 0:
+            try:
+                self.network_plot.set_edges_lod(1, self.dim_num)
+            except Exception as err:
+                error_msg = "An error occurred: cannot update the connecting lines"
+                error_occurred(self.network_plot.set_edges_lod, 'set_edges_lod', err, error_msg)
+                return
+
+            self.edges_lod_timer.start()
+
+    def restore_all_edges(self):
+
+        # During the calculation, the sample of connections is displayed until the calculation stops
+        if self.is_running_calc == 0:
+            try:
+                self.network_plot.set_edges_lod(0, self.dim_num)
+            except Exception as err:
+                error_msg = "An error occurred: cannot update the connecting lines"
+                error_occurred(self.network_plot.set_edges_lod, 'set_edges_lod', err, error_msg)
+
     def canvas_left_mouse_release(self, event):
 
         pos_array = event.trail()
@@ -1,3 +1,4 @@
+import numpy as np
 import clans.config as cfg
 
 
@@ -11,22 +12,64 @@ def add_group_with_sequences(group_by, points_dict, parameters_dict):
     cfg.groups_by_categories[group_by]['groups'][group_ID] = parameters_dict
 
     # Add the member-sequences indices to the group and remove them from their previous group (if any)
-    for seq_index in points_dict:
+    seq_indices = np.fromiter(points_dict, dtype=np.int64, count=len(points_dict))
+    old_group_IDs = cfg.groups_by_categories[group_by]['sequences'][seq_indices]
 
-        # The sequence was a member of another group - delete it from the old group
-        if cfg.groups_by_categories[group_by]['sequences'][seq_index] != -1:
-            old_group_ID = cfg.groups_by_categories[group_by]['sequences'][seq_index]
-            if seq_index in cfg.groups_by_categories[group_by]['groups'][old_group_ID]['seqIDs']:
-                del cfg.groups_by_categories[group_by]['groups'][old_group_ID]['seqIDs'][seq_index]
+    # The sequences that were members of other groups - delete them from the old groups
+    for seq_index, old_group_ID in zip(seq_indices[old_group_IDs != -1].tolist(),
+                                       old_group_IDs[old_group_IDs != -1].tolist()):
+        cfg.groups_by_categories[group_by]['groups'][old_group_ID]['seqIDs'].pop(seq_index, None)
 
-        # Add the new group index to the sequence
-        cfg.groups_by_categories[group_by]['sequences'][seq_index] = group_ID
+    # Add the new group index to the sequences
+    cfg.groups_by_categories[group_by]['sequences'][seq_indices] = group_ID
 
     cfg.groups_by_categories[group_by]['groups'][group_ID]['seqIDs'] = points_dict
 
     return group_ID
 
 
+# Build the members of all the groups of a category from its group-ID array, in CSR form:
+# the members of group_ID (-1 = no group) are members[indptr[group_ID+1]:indptr[group_ID+2]],
+# sorted by the sequence index
+def get_members_by_groups(group_by):
+    labels = cfg.groups_by_categories[group_by]['sequences']
+    groups_num = max(cfg.groups_by_categories[group_by]['groups'].keys(), default=-1) + 1
+    if len(labels) > 0:
+        groups_num = max(groups_num, int(np.amax(labels)) + 1)
+
+    counts = np.bincount(labels + 1, minlength=groups_num + 1)
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    members = np.argsort(labels, kind='stable')
+
+    return indptr, members
+
+
+def get_group_members(indptr, members, group_ID):
+    return members[indptr[group_ID + 1]:indptr[group_ID + 2]]
+
+
+# Build lookup tables of the nodes parameters (color, size, outline color) by the group_ID of a category.
+# The last row holds the parameters of the sequences that don't belong to any group, so indexing the tables with
+# the group-ID array of the category gives the parameters of all the sequences
+def get_nodes_params_by_groups(group_by, default_color):
+    category = cfg.groups_by_categories[group_by]
+    groups_num = max(category['groups'].keys(), default=-1) + 2
+
+    colors = np.zeros((groups_num, 4), dtype=np.float32)
+    colors[:] = default_color
+    sizes = np.full(groups_num, category['nodes_size'], dtype=np.int8)
+    outline_colors = np.zeros((groups_num, 4), dtype=np.float32)
+    outline_colors[:] = category['nodes_outline_color']
+
+    for group_ID in category['groups']:
+        colors[group_ID] = category['groups'][group_ID]['color_array']
+        sizes[group_ID] = category['groups'][group_ID]['size']
+        outline_colors[group_ID] = category['groups'][group_ID]['outline_color']
+
+    return colors, sizes, outline_colors
+
+
 def delete_group(group_by, group_ID):
 
     # create a list of group_IDs, sorted according to the order
@@ -1,58 +1,142 @@
 import numpy as np
-import numba
 import clans.config as cfg
 
 
+# Save the given pairs of sequences and their similarity values in the global sparse arrays.
+# The pairs are saved in a non-redundant way (index1 < index2) and sorted by index1 and then by index2.
+# If a pair appears more than once, only its best value is kept (the lowest E-value / the highest attraction value)
+def set_similarity_values(index1_array, index2_array, values_array, mode):
+    index1_array = np.asarray(index1_array, dtype=int)
+    index2_array = np.asarray(index2_array, dtype=int)
+    values_array = np.asarray(values_array, dtype=float)
+
+    # Ignore self-pairs and make the pairs non-redundant
+    not_self_pairs = index1_array != index2_array
+    index1_array = index1_array[not_self_pairs]
+    index2_array = index2_array[not_self_pairs]
+    values_array = values_array[not_self_pairs]
+    pairs_index1 = np.minimum(index1_array, index2_array)
+    pairs_index2 = np.maximum(index1_array, index2_array)
+
+    # Sort the pairs (for pairs that appear more than once, the best value comes first)
+    if mode == 'hsp':
+        sorted_indices = np.lexsort((values_array, pairs_index2, pairs_index1))
+    else:
+        sorted_indices = np.lexsort((-values_array, pairs_index2, pairs_index1))
+    pairs_index1 = pairs_index1[sorted_indices]
+    pairs_index2 = pairs_index2[sorted_indices]
+    values_array = values_array[sorted_indices]
+
+    # Remove the duplicated pairs
+    is_first = np.ones(len(pairs_index1), dtype=bool)
+    is_first[1:] = (pairs_index1[1:] != pairs_index1[:-1]) | (pairs_index2[1:] != pairs_index2[:-1])
+
+    cfg.pairs_index1 = pairs_index1[is_first]
+    cfg.pairs_index2 = pairs_index2[is_first]
+    cfg.similarity_values = values_array[is_first]
+
+    # The given values are the attraction values themselves
+    if mode == 'att':
+        cfg.attraction_values = cfg.similarity_values
+
+    reset_sorted_pairs()
+
+
 def calculate_attraction_values():
-    # Pairs, which have the init value of 100 (no HSP), automatically get the value of 0
-    minus_log_similarity_values = np.where(cfg.similarity_values_mtx > 1, 0, -np.log10(cfg.similarity_values_mtx))
-    max_value = np.amax(minus_log_similarity_values)
-    cfg.attraction_values_mtx = np.true_divide(minus_log_similarity_values, max_value)
+    # E-values of 0 are replaced by 1e-180. Pairs with E-value > 1 get the attraction value of 0
+    similarity_values = np.where(cfg.similarity_values == 0.0, 10 ** -180, cfg.similarity_values)
+    minus_log_similarity_values = np.where(similarity_values > 1, 0, -np.log10(similarity_values))
 
-    #print("Attraction values:\n" + str(cfg.attraction_values_mtx))
+    if len(minus_log_similarity_values) > 0 and np.amax(minus_log_similarity_values) > 0:
+        max_value = np.amax(minus_log_similarity_values)
+        cfg.attraction_values = np.true_divide(minus_log_similarity_values, max_value)
+    else:
+        cfg.attraction_values = minus_log_similarity_values
 
+    #print("Attraction values:\n" + str(cfg.attraction_values))
 
-def define_connected_sequences(mode):
-    # Create the 2D redundant boolean matrix of connections
+    reset_sorted_pairs()
+
+
+# The pairs / values have changed -> sort the pairs again on the next cutoff update
+def reset_sorted_pairs():
+    cfg.sorted_pairs_order = None
+
+
+# Sort the pairs by their similarity, from the most similar pair (the lowest E-value / the highest attraction value).
+# The pairs that are connected under any cutoff are then a prefix of the sorted pairs.
+# The sorting is done once (for each set of values) and no pair is connected yet.
+def sort_pairs_by_similarity(mode):
     if mode == 'hsp':
-        cfg.connected_sequences_mtx = np.where(cfg.similarity_values_mtx <= cfg.run_params['similarity_cutoff'], 1, 0)
-    elif mode == 'att':
-        cfg.connected_sequences_mtx = np.where(cfg.attraction_values_mtx >= cfg.run_params['similarity_cutoff'], 1, 0)
-    #print("Connected_sequences:\n" + str(cfg.connected_sequences_mtx))
+        keys = cfg.similarity_values
+    else:
+        keys = -cfg.attraction_values
+
+    cfg.sorted_pairs_order = np.argsort(keys, kind='stable')
+    cfg.sorted_pairs_keys = keys[cfg.sorted_pairs_order]
+    cfg.sorted_pairs = np.column_stack((cfg.pairs_index1[cfg.sorted_pairs_order],
+                                        cfg.pairs_index2[cfg.sorted_pairs_order]))
+    cfg.sorted_att_values = cfg.attraction_values[cfg.sorted_pairs_order]
 
-    # Create the 1D boolean is_singelton array
-    define_singeltons()
+    # Index the pairs by their first sequence (the pairs are sorted by index1)
+    cfg.pairs_index_ptr = np.searchsorted(cfg.pairs_index1, np.arange(cfg.run_params['total_sequences_num'] + 1))
+    cfg.pairs_sorted_position = np.empty(len(cfg.sorted_pairs_order), dtype=int)
+    cfg.pairs_sorted_position[cfg.sorted_pairs_order] = np.arange(len(cfg.sorted_pairs_order))
 
+    cfg.connected_pairs = np.zeros(len(cfg.sorted_pairs_order), dtype=bool)
+    cfg.connected_pairs_num = 0
+    cfg.connections_per_sequence = np.zeros(cfg.run_params['total_sequences_num'], dtype=int)
+    cfg.singeltons_list = np.ones(cfg.run_params['total_sequences_num'], dtype=int)
 
-def define_singeltons():
-    connections_sum = np.sum(cfg.connected_sequences_mtx, axis=1)
-    cfg.singeltons_list = np.where(connections_sum == 0, 1, 0)
 
+def define_connected_sequences(mode):
+    if cfg.sorted_pairs_order is None or len(cfg.sorted_pairs_order) != len(cfg.similarity_values):
+        sort_pairs_by_similarity(mode)
+
+    # The number of connected pairs under the cutoff (the length of the connected prefix of the sorted pairs)
+    if mode == 'hsp':
+        connected_pairs_num = np.searchsorted(cfg.sorted_pairs_keys, cfg.run_params['similarity_cutoff'],
+                                              side='right')
+    else:
+        connected_pairs_num = np.searchsorted(cfg.sorted_pairs_keys, -cfg.run_params['similarity_cutoff'],
+                                              side='right')
+
+    # Update only the pairs between the previous and the new cutoff
+    if connected_pairs_num > cfg.connected_pairs_num:
+        changed_pairs = slice(cfg.connected_pairs_num, connected_pairs_num)
+        is_connected = True
+        connections_change = 1
+    else:
+        changed_pairs = slice(connected_pairs_num, cfg.connected_pairs_num)
+        is_connected = False
+        connections_change = -1
 
-# Create a list of connected pairs (non-redundant, [indexi][indexj]) for the line plot graphics
-@numba.njit
-def create_lists(connected_sequences_mtx, attraction_values_mtx):
-    total_seq_num = connected_sequences_mtx.shape[0]
-    hsp_num = 0
-    connections_list = []
-    att_values_list = []
+    # Update the boolean array of connected pairs
+    cfg.connected_pairs[cfg.sorted_pairs_order[changed_pairs]] = is_connected
+    cfg.connected_pairs_num = int(connected_pairs_num)
+    #print("Connected_pairs:\n" + str(cfg.connected_pairs))
 
-    for i in range(total_seq_num - 1):
-        for j in range(i + 1, total_seq_num):
-            if i < j and connected_sequences_mtx[i][j] == 1:
-                connected_pair_tuple = (i, j)
-                connections_list.append(connected_pair_tuple)
-                att_values_list.append(attraction_values_mtx[i][j])
-                hsp_num += 1
+    # Update the number of connections and the is_singelton array of the sequences of the changed pairs
+    changed_sequences = cfg.sorted_pairs[changed_pairs].ravel()
+    np.add.at(cfg.connections_per_sequence, changed_sequences, connections_change)
+    cfg.singeltons_list[changed_sequences] = cfg.connections_per_sequence[changed_sequences] == 0
 
-    return hsp_num, connections_list, att_values_list
 
+# Count the number of connections of each sequence
+def count_connections(connected_sequences_list, seq_num):
+    if len(connected_sequences_list) == 0:
+        return np.zeros(seq_num, dtype=int)
 
-def define_connected_sequences_list():
-    hsp_num, connections_list, att_values_list = create_lists(cfg.connected_sequences_mtx, cfg.attraction_values_mtx)
+    return np.bincount(connected_sequences_list[:, 0], minlength=seq_num) + \
+        np.bincount(connected_sequences_list[:, 1], minlength=seq_num)
 
-    cfg.connected_sequences_list = np.array(connections_list, dtype=int)
-    cfg.att_values_for_connected_list = np.array(att_values_list, dtype=float)
+
+def define_connected_sequences_list():
+    # The list of connected pairs (non-redundant, [indexi][indexj]) for the layout calculation and graphics:
+    # the connected prefix of the sorted pairs (sorted by decreasing attraction values)
+    cfg.connected_sequences_list = cfg.sorted_pairs[:cfg.connected_pairs_num]
+    cfg.att_values_for_connected_list = cfg.sorted_att_values[:cfg.connected_pairs_num]
+    hsp_num = len(cfg.connected_sequences_list)
     cfg.run_params['connections_num'] = hsp_num
 
     if cfg.run_params['type_of_values'] == 'hsp':
@@ -63,68 +147,35 @@ def define_connected_sequences_list():
               + str(hsp_num))
 
 
-# Create a list of connected pairs (non-redundant, [indexi][indexj]) for the line plot graphics
-@numba.njit
-def create_lists_subset(connected_sequences_mtx, attraction_values_mtx, in_subset_array):
-    total_seq_num = connected_sequences_mtx.shape[0]
-    hsp_num = 0
-    connections_list = []
-    att_values_list = []
-
-    i_in_subset = 0
-    for i in range(total_seq_num - 1):
-        # sequence i is in the subset
-        if in_subset_array[i]:
-            j_in_subset = i_in_subset + 1
-            for j in range(i + 1, total_seq_num):
-                # sequence j is in the subset
-                if in_subset_array[j]:
-                    # If the sequences are connected and j is also in the subset, add the connection to the list
-                    if connected_sequences_mtx[i][j] == 1:
-                        # Adding the sequences indices in the subset to the list of connected pairs
-                        connected_pair_tuple = (i_in_subset, j_in_subset)
-                        connections_list.append(connected_pair_tuple)
-                        att_values_list.append(attraction_values_mtx[i][j])
-                        hsp_num += 1
-                    j_in_subset += 1
-            i_in_subset += 1
-
-    return hsp_num, connections_list, att_values_list
-
-
-@numba.njit
-def create_connected_mtx_subset(connected_sequences_mtx, in_subset_array, connected_sequences_mtx_subset):
-    total_seq_num = connected_sequences_mtx.shape[0]
-
-    i_in_subset = 0
-    for i in range(total_seq_num):
-        # sequence i is in the subset
-        if in_subset_array[i]:
-            j_in_subset = 0
-            for j in range(total_seq_num):
-                # sequence j is in the subset
-                if in_subset_array[j]:
-                    connected_sequences_mtx_subset[i_in_subset][j_in_subset] = connected_sequences_mtx[i][j]
-                    j_in_subset += 1
-            i_in_subset += 1
-
-    return connected_sequences_mtx_subset
+def define_connected_sequences_list_subset(subset_size):
+    in_subset = cfg.sequences_array['in_subset']
+    subset_indices = np.flatnonzero(in_subset)
 
+    # Take the pairs of the subset sequences (as index1) from the pairs index
+    starts = cfg.pairs_index_ptr[subset_indices]
+    pairs_nums = cfg.pairs_index_ptr[subset_indices + 1] - starts
+    subset_pairs_num = int(np.sum(pairs_nums))
 
-def define_connected_sequences_list_subset(subset_size):
-    hsp_num, connections_list, att_values_list = create_lists_subset(cfg.connected_sequences_mtx,
-                                                                     cfg.attraction_values_mtx,
-                                                                     cfg.sequences_array['in_subset'])
+    # A large subset: it is faster to scan the connected pairs (the prefix of the sorted pairs) with a boolean mask
+    if subset_pairs_num > cfg.connected_pairs_num // 4:
+        connected_pairs = cfg.sorted_pairs[:cfg.connected_pairs_num]
+        sorted_positions = np.flatnonzero(in_subset[connected_pairs[:, 0]] & in_subset[connected_pairs[:, 1]])
+
+    else:
+        offsets = np.cumsum(pairs_nums) - pairs_nums
+        subset_pairs = np.repeat(starts - offsets, pairs_nums) + np.arange(subset_pairs_num)
+
+        # Keep the connected pairs in which the second sequence is also in the subset
+        subset_pairs = subset_pairs[cfg.connected_pairs[subset_pairs] & in_subset[cfg.pairs_index2[subset_pairs]]]
 
-    cfg.connected_sequences_list_subset = np.array(connections_list, dtype=int)
-    cfg.att_values_for_connected_list_subset = np.array(att_values_list, dtype=float)
+        # Order the pairs as in the full list of connected pairs (by decreasing attraction values)
+        sorted_positions = np.sort(cfg.pairs_sorted_position[subset_pairs])
 
-    cfg.connected_sequences_mtx_subset = np.zeros([subset_size, subset_size])
-    cfg.connected_sequences_mtx_subset = create_connected_mtx_subset(cfg.connected_sequences_mtx,
-                                                                     cfg.sequences_array['in_subset'],
-                                                                     cfg.connected_sequences_mtx_subset)
-    #print("Connected mtx subset:")
-    #print(cfg.connected_sequences_mtx_subset)
+    # Convert the sequences indices to their indices in the subset
+    index_in_subset = np.cumsum(in_subset) - 1
+    cfg.connected_sequences_list_subset = index_in_subset[np.take(cfg.sorted_pairs, sorted_positions, axis=0)]
+    cfg.att_values_for_connected_list_subset = cfg.sorted_att_values[sorted_positions]
+    hsp_num = len(cfg.connected_sequences_list_subset)
 
     if cfg.run_params['type_of_values'] == 'hsp':
         print("Number of connections in the subset (under the P-value of " + str(cfg.run_params['similarity_cutoff'])
@@ -133,10 +184,10 @@ def define_connected_sequences_list_subset(subset_size):
         print("Number of connections in the subset (above the threshold of " + str(cfg.run_params['similarity_cutoff'])
               + "): " + str(hsp_num))
 
-    define_singeltons_subset()
+    define_singeltons_subset(subset_size)
 
 
-def define_singeltons_subset():
-    connections_sum = np.sum(cfg.connected_sequences_mtx_subset, axis=1)
+def define_singeltons_subset(subset_size):
+    connections_sum = count_connections(cfg.connected_sequences_list_subset, subset_size)
     cfg.singeltons_list_subset = np.where(connections_sum == 0, 1, 0)
 
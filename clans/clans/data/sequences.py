@@ -1,6 +1,5 @@
 import numpy as np
 import numba
-from vispy.color import ColorArray
 import clans.config as cfg
 import random
 
@@ -18,7 +17,7 @@ def create_sequences_array(sequences_list):
 
 
 def init_groups_by_categories():
-    cfg.groups_by_categories[0]['sequences'] = np.full(cfg.run_params['total_sequences_num'], -1)
+    cfg.groups_by_categories[0]['sequences'] = np.full(cfg.run_params['total_sequences_num'], -1, dtype=np.int32)
 
 
 def add_seq_length_param():
@@ -90,6 +89,9 @@ def add_numeric_params(params_dict):
 
 # Add numeric parameters that were saved in a full CLANS file (including colors)
 def add_saved_numeric_params(params_dict):
+    # vispy is imported only here, so the command-line mode does not load it unless there are saved colors
+    from vispy.color import ColorArray
+
     for param_name in params_dict:
         cfg.sequences_numeric_params[param_name] = dict()
 
@@ -178,7 +180,7 @@ def generate_rand_pos():
     return rand
 
 
-@numba.njit(parallel=True)
+@numba.njit(parallel=True, cache=True)
 def init_positions(seq_num):
     coor_array = np.zeros((seq_num, 3))
 
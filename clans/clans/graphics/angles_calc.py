@@ -1,102 +1,31 @@
 import numpy as np
-import numba
 
 
-@numba.njit(parallel=True)
-def calculate_azimuth_elevation(coor_array):
-    n_coor = coor_array.shape[0]
-    azimuth_array = np.zeros(n_coor)
-    elevation_array = np.zeros(n_coor)
+# Calculate the rotation matrix of a change in the azimuth and elevation angles (in radians) of the Turntable camera:
+# a rotation of the XY plane by the azimuth change (around the Z axis), followed by a rotation of the YZ plane by the
+# elevation change (around the X axis).
+# The matrix is orthonormal, so its inverse is its transpose
+def calculate_rotation_mtx(azimuth_change, elevation_change):
+    cos_azimuth = np.cos(azimuth_change)
+    sin_azimuth = np.sin(azimuth_change)
+    cos_elevation = np.cos(elevation_change)
+    sin_elevation = np.sin(elevation_change)
 
-    for i in range(n_coor):
+    azimuth_mtx = np.array([[cos_azimuth, sin_azimuth, 0.0],
+                            [-sin_azimuth, cos_azimuth, 0.0],
+                            [0.0, 0.0, 1.0]])
+    elevation_mtx = np.array([[1.0, 0.0, 0.0],
+                              [0.0, cos_elevation, -sin_elevation],
+                              [0.0, sin_elevation, cos_elevation]])
 
-        # Calculate azimuth angles
-        if coor_array[i, 0] == 0:
-            azimuth_array[i] = np.radians(90)
-        else:
-            azimuth_array[i] = np.arctan(coor_array[i, 1] / coor_array[i, 0])
+    return np.dot(elevation_mtx, azimuth_mtx)
 
-        # Calculate elevation angles
-        if coor_array[i, 1] == 0:
-            elevation_array[i] = np.radians(90)
-        else:
-            elevation_array[i] = np.arctan(coor_array[i, 2] / coor_array[i, 1])
 
-    return azimuth_array, elevation_array
+# Rotate all the coordinates (rows of coor_array) with one matrix product
+def rotate_positions(coor_array, rotation_mtx):
+    return np.dot(coor_array, rotation_mtx.T).astype(coor_array.dtype, copy=False)
 
 
-@numba.njit(parallel=True)
-def calculate_elevation_angles(coor_array):
-    n_coor = coor_array.shape[0]
-    elevation_array = np.zeros(n_coor)
-
-    for i in range(n_coor):
-        # Calculate elevation angles
-        if coor_array[i, 1] == 0:
-            elevation_array[i] = np.radians(90)
-        else:
-            elevation_array[i] = np.arctan(coor_array[i, 2] / coor_array[i, 1])
-
-    return elevation_array
-
-
-@numba.njit
-def calcuate_positions_after_azimuth_change(coor_array, xy_vectors_array, azimuth_angles_array, azimuth_change):
-    n_coor = coor_array.shape[0]
-    new_coor_array = coor_array.copy()
-
-    for i in range(n_coor):
-        # Calculate new X after azimuth change
-        if coor_array[i, 0] == 0:
-            new_coor_array[i, 0] = xy_vectors_array[i] * np.cos(azimuth_angles_array[i] - azimuth_change)
-        else:
-            new_coor_array[i, 0] = np.cos(azimuth_angles_array[i] - azimuth_change) * coor_array[i, 0] \
-                                   / np.cos(azimuth_angles_array[i])
-
-        if 0 < np.abs(new_coor_array[i, 0]) <= 10 ** -15:
-            new_coor_array[i, 0] = 0
-
-        # Calculate new Y after azimuth change
-        if coor_array[i, 1] == 0:
-            # Calculate new Y
-            new_coor_array[i, 1] = xy_vectors_array[i] * np.sin(azimuth_angles_array[i] - azimuth_change)
-        else:
-            # Calculate new Y
-            new_coor_array[i, 1] = np.sin(azimuth_angles_array[i] - azimuth_change) * coor_array[i, 1] \
-                                   / np.sin(azimuth_angles_array[i])
-
-        if 0 < np.abs(new_coor_array[i, 1]) <= 10 ** -15:
-            new_coor_array[i, 1] = 0
-
-    return new_coor_array
-
-
-@numba.njit
-def calcuate_positions_after_elevation_change(coor_array, yz_vectors_array, elevation_angles_array, elevation_change):
-    n_coor = coor_array.shape[0]
-    new_coor_array = coor_array.copy()
-
-    for i in range(n_coor):
-
-        # Calculate new Y after elevation change
-        if coor_array[i, 1] == 0:
-            new_coor_array[i, 1] = yz_vectors_array[i] * np.cos(elevation_angles_array[i] + elevation_change)
-        else:
-            new_coor_array[i, 1] = np.cos(elevation_angles_array[i] + elevation_change) * coor_array[i, 1] \
-                                   / np.cos(elevation_angles_array[i])
-
-        if 0 < np.abs(new_coor_array[i, 1]) <= 10 ** -15:
-            new_coor_array[i, 1] = 0
-
-        # Calculate new Z after elevation change
-        if coor_array[i, 2] == 0:
-            new_coor_array[i, 2] = yz_vectors_array[i] * np.sin(elevation_angles_array[i] + elevation_change)
-        else:
-            new_coor_array[i, 2] = np.sin(elevation_angles_array[i] + elevation_change) * coor_array[i, 2] \
-                                       / np.sin(elevation_angles_array[i])
-
-        if 0 < np.abs(new_coor_array[i, 2]) <= 10 ** -15:
-            new_coor_array[i, 2] = 0
-
-    return new_coor_array
-
+# Rotate the coordinates back to the original (non-rotated) coordinate system
+def inverse_rotate_positions(rotated_coor_array, rotation_mtx):
+    return np.dot(rotated_coor_array, rotation_mtx).astype(rotated_coor_array.dtype, copy=False)
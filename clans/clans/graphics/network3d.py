@@ -1,11 +1,13 @@
 import re
 import numpy as np
-from vispy import app, scene, util
+from vispy import app, scene
 import clans.config as cfg
 import clans.clans.data.sequences as seq
 import clans.clans.data.sequence_pairs as sp
+import clans.clans.data.groups as groups
 import clans.clans.graphics.angles_calc as ac
 import clans.clans.graphics.colors as colors
+import clans.clans.graphics.screen_index as si
 
 
 def set_edges(i):
@@ -22,6 +24,23 @@ def set_edges(i):
     return line_color, line_width
 
 
+# Sample up to 'budget' connections, weighted by their attraction values (weighted random sampling without
+# replacement: take the connections with the largest keys u^(1/w), where u is uniform in (0, 1) and w is the attraction
+# value). A fixed seed is used, so the same sample is displayed for the same connections.
+# Return the sorted indices of the sampled connections, or None if all the connections should be displayed
+def sample_connections(att_values, budget):
+    connections_num = len(att_values)
+    if budget <= 0 or connections_num <= budget:
+        return None
+
+    rng = np.random.default_rng(0)
+    weights = np.maximum(np.asarray(att_values, dtype=np.float64), np.finfo(np.float64).tiny)
+    keys = np.log(1.0 - rng.random(connections_num)) / weights  # log(u^(1/w)), keeps the order of the keys
+    sampled = np.argpartition(keys, connections_num - budget)[connections_num - budget:]
+
+    return np.sort(sampled)
+
+
 class Network3D:
 
     def __init__(self, view):
@@ -64,25 +83,26 @@ class Network3D:
         self.is_subset_mode = 0
         self.is_hide_singeltons = 0
 
+        # Cached colors of the nodes as displayed (recalculated only after changes in the colors / selection /
+        # singeltons)
+        self.display_colors_key = None
+        self.display_colors_array = []
+        self.display_outline_colors_array = []
+
         # Arrays for holding coordinates / angles
         self.pos_array = []  # To hold the positions of the whole dataset
         self.rotated_pos_array = []  # To hold the rotated-positions of the whole dataset (for 2D view)
         self.selected_pos_array = []  # To hold the positions of the selected subset
         self.selected_rotated_pos_array = []  # To hold the rotated-positions of the selected subset
+        self.screen_index = None  # To hold the screen-coordinates index of the data points (for selection)
         self.connections_by_bins = []  # To hold the connected-pairs divided into bins
         self.selected_connections_by_bins = []  # To hold the connected-pairs among the selected subset, divided into bins
-        self.xy_vector = []
-        self.yz_vector = []
-        self.azimuth_angles = []
-        self.elevation_angles = []
-        self.affine_mtx = []
-        self.inverse_affine_mtx = []
-        self.selected_xy_vector = []
-        self.selected_yz_vector = []
-        self.selected_azimuth_angles = []
-        self.selected_elevation_angles = []
-        self.selected_affine_mtx = []
-        self.selected_inverse_affine_mtx = []
+        self.lod_connections_by_bins = []  # To hold a sample of the connected-pairs (displayed while the view moves)
+        self.selected_lod_connections_by_bins = []  # To hold a sample of the connected-pairs among the selected subset
+        self.lines_connections = [None] * 5  # To hold the connections currently set in each of the lines visuals
+        self.is_edges_lod = 0
+        self.rotation_mtx = np.identity(3)  # The rotation of the coordinates by the camera (the inverse is the transpose)
+        self.selected_rotation_mtx = np.identity(3)
 
         # Initialize the camera parameters
         self.initial_azimuth = 0
@@ -147,6 +167,7 @@ class Network3D:
 
     # Set the plot data for the first time
     def init_data(self, fr_object, group_by):
+        self.invalidate_display_colors()
 
         self.nodes_size = cfg.run_params['nodes_size']
         self.nodes_default_color = cfg.run_params['nodes_color']
@@ -166,9 +187,6 @@ class Network3D:
             self.pos_array = np.column_stack((self.pos_array, cfg.sequences_array['z_coor']))
         self.rotated_pos_array = self.pos_array.copy()
 
-        # Calculate and save the initial azimuth and elevation angles of all the points
-        self.calculate_initial_angles()
-
         # If the input file contained groups
         if len(cfg.groups_by_categories[group_by]['groups']) > 0:
 
@@ -180,21 +198,9 @@ class Network3D:
             # Build the text visuals of the group names
             self.build_group_names_visual(group_by)
 
-            for seq_index in range(cfg.run_params['total_sequences_num']):
-
-                # Update the colors and size of the nodes that belongs to a group according to the group's information
-                if cfg.groups_by_categories[group_by]['sequences'][seq_index] > -1:
-                    group_ID = cfg.groups_by_categories[group_by]['sequences'][seq_index]
-                    self.nodes_colors_array[seq_index] = \
-                        cfg.groups_by_categories[group_by]['groups'][group_ID]['color_array']
-                    self.nodes_size_array[seq_index] = cfg.groups_by_categories[group_by]['groups'][group_ID]['size']
-                    self.nodes_outline_color_array[seq_index] = \
-                        cfg.groups_by_categories[group_by]['groups'][group_ID]['outline_color']
-
-                # Update the parameters according to the category's definitions
-                else:
-                    self.nodes_size_array[seq_index] = cfg.groups_by_categories[group_by]['nodes_size']
-                    self.nodes_outline_color_array[seq_index] = cfg.groups_by_categories[group_by]['nodes_outline_color']
+            # Update the colors and size of the nodes that belong to a group according to the group's information,
+            # and of the other nodes according to the category's definitions
+            self.set_nodes_params_by_groups(group_by)
 
             self.build_scatter_by_groups(group_by)
 
@@ -218,10 +224,7 @@ class Network3D:
         self.create_connections_by_bins()
 
         # Set the data for the connecting lines (without displaying them) -
-        for i in range(5):
-            line_color, line_width = set_edges(i)
-            self.lines[i].set_data(pos=self.pos_array, color=line_color, width=line_width,
-                                   connect=self.connections_by_bins[i])
+        self.set_lines_data(self.pos_array)
 
     # Initialize all main variables and clear the canvas to enable loading a new file
     def reset_data(self):
@@ -238,20 +241,15 @@ class Network3D:
         self.rotated_pos_array = []
         self.selected_pos_array = []
         self.selected_rotated_pos_array = []
+        self.screen_index = None
         self.connections_by_bins = []
         self.selected_connections_by_bins = []
-        self.xy_vector = []
-        self.yz_vector = []
-        self.azimuth_angles = []
-        self.elevation_angles = []
-        self.affine_mtx = []
-        self.inverse_affine_mtx = []
-        self.selected_xy_vector = []
-        self.selected_yz_vector = []
-        self.selected_azimuth_angles = []
-        self.selected_elevation_angles = []
-        self.selected_affine_mtx = []
-        self.selected_inverse_affine_mtx = []
+        self.lod_connections_by_bins = []
+        self.selected_lod_connections_by_bins = []
+        self.lines_connections = [None] * 5
+        self.is_edges_lod = 0
+        self.rotation_mtx = np.identity(3)
+        self.selected_rotation_mtx = np.identity(3)
         self.nodes_colors_array = []
         self.nodes_colors_array_by_param = []
         self.nodes_size_array = []
@@ -267,6 +265,9 @@ class Network3D:
         self.group_name_to_move = None
         self.is_subset_mode = 0
         self.is_hide_singeltons = 0
+        self.display_colors_key = None
+        self.display_colors_array = []
+        self.display_outline_colors_array = []
         self.scatter_by_groups = {}
         self.members_array_by_groups = {}
         self.pos_array_by_groups = {}
@@ -277,6 +278,8 @@ class Network3D:
         self.nodes_outline_width = 0.5
 
     def set_defaults(self, dim_num, color_by, group_by, z_index_mode):
+        self.invalidate_display_colors()
+
         self.nodes_size = cfg.run_params['nodes_size']
         self.nodes_default_color = cfg.run_params['nodes_color']
         self.nodes_outline_default_color = cfg.run_params['nodes_outline_color']
@@ -297,12 +300,16 @@ class Network3D:
         self.update_view(dim_num, color_by, group_by, z_index_mode)
 
     # Update the nodes positions after calculation update or initialization
-    def update_data(self, dim_num_view, fr_object, set_range, color_by):
+    # (during the calculation, the coordinates are taken from a snapshot of the layout coordinates)
+    def update_data(self, dim_num_view, fr_object, set_range, color_by, coordinates=None):
+
+        if coordinates is None:
+            coordinates = fr_object.coordinates
 
         # Full-data mode
         if self.is_subset_mode == 0:
             # Update the coordinates array
-            self.pos_array = fr_object.coordinates.copy()
+            self.pos_array = coordinates.copy()
             if self.pos_array.shape[1] == 2:
                 self.pos_array = np.column_stack((self.pos_array, cfg.sequences_array['z_coor']))
 
@@ -315,19 +322,11 @@ class Network3D:
                 pos_array[:, 2] = 0
 
             if color_by == 'groups':
-                nodes_color_array = self.nodes_colors_array.copy()
                 nodes_size_array = self.nodes_size_array
             else:
-                nodes_color_array = self.nodes_colors_array_by_param.copy()
                 nodes_size_array = self.nodes_size
 
-            nodes_outline_color_array = self.nodes_outline_color_array.copy()
-
-            if self.is_hide_singeltons:
-                for seq_index in range(cfg.run_params['total_sequences_num']):
-                    if cfg.singeltons_list[seq_index]:
-                        nodes_color_array[seq_index] = cfg.hide_color
-                        nodes_outline_color_array[seq_index] = cfg.hide_color
+            nodes_color_array, nodes_outline_color_array = self.get_display_colors(color_by)
 
             # Update the scatter-plot
             self.scatter_plot.set_data(pos=pos_array, face_color=nodes_color_array,
@@ -339,15 +338,12 @@ class Network3D:
                 pos_array[:, 2] = -0.01
 
             # Update the connecting lines
-            for i in range(5):
-                line_color, line_width = set_edges(i)
-                self.lines[i].set_data(pos=pos_array, color=line_color, width=line_width,
-                                       connect=self.connections_by_bins[i])
+            self.set_lines_data(pos_array)
 
         # Subset mode
         else:
             # Update the coordinates array
-            self.selected_pos_array = fr_object.coordinates[cfg.sequences_array['in_subset']]
+            self.selected_pos_array = coordinates[cfg.sequences_array['in_subset']]
             if self.selected_pos_array.shape[1] == 2:
                 z_coor_subset = cfg.sequences_array['z_coor_subset']
                 self.selected_pos_array = np.column_stack((self.selected_pos_array,
@@ -362,21 +358,13 @@ class Network3D:
                 selected_pos_array[:, 2] = 0
 
             if color_by == 'groups':
-                selected_nodes_color_array = self.selected_nodes_colors_array.copy()
-                selected_nodes_outline_color_array = self.selected_nodes_outline_color_array.copy()
-                selected_nodes_size_array = self.selected_nodes_size_array.copy()
+                selected_nodes_size_array = self.selected_nodes_size_array
             else:
-                selected_nodes_color_array = self.selected_nodes_colors_array_by_param.copy()
-                selected_nodes_outline_color_array = self.nodes_outline_default_color
-                selected_nodes_size_array = self.nodes_sizes
+                selected_nodes_size_array = self.nodes_size
 
-            if self.is_hide_singeltons:
-                for seq_index in range(len(cfg.singeltons_list_subset)):
-                    if cfg.singeltons_list_subset[seq_index]:
-                        selected_nodes_color_array[seq_index] = cfg.hide_color
-                        selected_nodes_outline_color_array[seq_index] = cfg.hide_color
+            selected_nodes_color_array, selected_nodes_outline_color_array = self.get_display_colors(color_by)
 
-                # Display the scatter-plot for the subset
+            # Display the scatter-plot for the subset
             self.scatter_plot.set_data(pos=selected_pos_array, face_color=selected_nodes_color_array,
                                        size=selected_nodes_size_array, edge_width=self.nodes_outline_width,
                                        edge_color=selected_nodes_outline_color_array, symbol=self.nodes_symbol)
@@ -386,10 +374,7 @@ class Network3D:
                 selected_pos_array[:, 2] = -0.01
 
             # Update the connecting lines
-            for i in range(5):
-                line_color, line_width = set_edges(i)
-                self.lines[i].set_data(pos=selected_pos_array, color=line_color, width=line_width,
-                                       connect=self.selected_connections_by_bins[i])
+            self.set_lines_data(selected_pos_array)
 
         # Set the coor-range of the camera
         if set_range == 1:
@@ -427,18 +412,7 @@ class Network3D:
         # Full-data mode
         if self.is_subset_mode == 0:
 
-            if color_by == 'groups':
-                nodes_color_array = self.nodes_colors_array.copy()
-            else:
-                nodes_color_array = self.nodes_colors_array_by_param.copy()
-
-            nodes_outline_color_array = self.nodes_outline_color_array.copy()
-
-            if self.is_hide_singeltons:
-                for seq_index in range(cfg.run_params['total_sequences_num']):
-                    if cfg.singeltons_list[seq_index]:
-                        nodes_color_array[seq_index] = cfg.hide_color
-                        nodes_outline_color_array[seq_index] = cfg.hide_color
+            nodes_color_array, nodes_outline_color_array = self.get_display_colors(color_by)
 
             # Update the nodes with the updated rotation
             self.scatter_plot.set_data(pos=self.pos_array, face_color=nodes_color_array,
@@ -446,25 +420,11 @@ class Network3D:
                                        edge_color=nodes_outline_color_array, symbol=self.nodes_symbol)
 
             # Update the lines with the updated rotation
-            for i in range(5):
-                line_color, line_width = set_edges(i)
-                self.lines[i].set_data(pos=self.pos_array, color=line_color, width=line_width,
-                                       connect=self.connections_by_bins[i])
+            self.set_lines_data(self.pos_array)
         # Subset mode
         else:
 
-            if color_by == 'groups':
-                selected_nodes_color_array = self.selected_nodes_colors_array.copy()
-                selected_nodes_outline_color_array = self.selected_nodes_outline_color_array.copy()
-            else:
-                selected_nodes_color_array = self.selected_nodes_colors_array_by_param.copy()
-                selected_nodes_outline_color_array = self.nodes_outline_default_color
-
-            if self.is_hide_singeltons:
-                for seq_index in range(len(cfg.singeltons_list_subset)):
-                    if cfg.singeltons_list_subset[seq_index]:
-                        selected_nodes_color_array[seq_index] = cfg.hide_color
-                        selected_nodes_outline_color_array[seq_index] = cfg.hide_color
+            selected_nodes_color_array, selected_nodes_outline_color_array = self.get_display_colors(color_by)
 
             # Display the scatter-plot for the subset
             self.scatter_plot.set_data(pos=self.selected_pos_array, face_color=selected_nodes_color_array,
@@ -472,10 +432,7 @@ class Network3D:
                                        edge_color=selected_nodes_outline_color_array, symbol=self.nodes_symbol)
 
             # Set the data for the connecting lines (without displaying them) -
-            for i in range(5):
-                line_color, line_width = set_edges(i)
-                self.lines[i].set_data(pos=self.selected_pos_array, color=line_color, width=line_width,
-                                       connect=self.selected_connections_by_bins[i])
+            self.set_lines_data(self.selected_pos_array)
 
         # Update the text visual of the sequences names with the correct positions
         self.update_sequences_names(3)
@@ -502,18 +459,7 @@ class Network3D:
             pos_array = self.rotated_pos_array.copy()
             pos_array[:, 2] = 0  # Zero the Z-axis
 
-            if color_by == 'groups':
-                nodes_color_array = self.nodes_colors_array.copy()
-            else:
-                nodes_color_array = self.nodes_colors_array_by_param.copy()
-
-            nodes_outline_color_array = self.nodes_outline_color_array.copy()
-
-            if self.is_hide_singeltons:
-                for seq_index in range(cfg.run_params['total_sequences_num']):
-                    if cfg.singeltons_list[seq_index]:
-                        nodes_color_array[seq_index] = cfg.hide_color
-                        nodes_outline_color_array[seq_index] = cfg.hide_color
+            nodes_color_array, nodes_outline_color_array = self.get_display_colors(color_by)
 
             # Update the nodes with the updated rotation
             # One scatter-plot visual - no control of the Z-indexing
@@ -527,10 +473,8 @@ class Network3D:
                 # Update the lines with the updated rotation. Set the correct order
                 pos_array[:, 2] = -0.01  # Put the lines at the back of the scatter plot (since the ordering is not enough)
                 order = 6
+                self.set_lines_data(pos_array)
                 for i in range(5):
-                    line_color, line_width = set_edges(i)
-                    self.lines[i].set_data(pos=pos_array, color=line_color, width=line_width,
-                                           connect=self.connections_by_bins[i])
                     self.lines[i].order = order
                     order -= 1
 
@@ -545,10 +489,8 @@ class Network3D:
                 # Update the lines with the updated rotation. Set the correct order
                 pos_array[:, 2] = -0.01  # Put the lines at the back of the scatter plot (since the ordering is not enough)
                 order = len(self.groups_to_show) + 6
+                self.set_lines_data(pos_array)
                 for i in range(5):
-                    line_color, line_width = set_edges(i)
-                    self.lines[i].set_data(pos=pos_array, color=line_color, width=line_width,
-                                           connect=self.connections_by_bins[i])
                     self.lines[i].order = order
                     order -= 1
 
@@ -559,18 +501,7 @@ class Network3D:
             pos_array = self.selected_rotated_pos_array.copy()
             pos_array[:, 2] = 0  # Zero the Z-axis
 
-            if color_by == 'groups':
-                selected_nodes_color_array = self.selected_nodes_colors_array.copy()
-                selected_nodes_outline_color_array = self.selected_nodes_outline_color_array.copy()
-            else:
-                selected_nodes_color_array = self.selected_nodes_colors_array_by_param.copy()
-                selected_nodes_outline_color_array = self.nodes_outline_default_color
-
-            if self.is_hide_singeltons:
-                for seq_index in range(len(cfg.singeltons_list_subset)):
-                    if cfg.singeltons_list_subset[seq_index]:
-                        selected_nodes_color_array[seq_index] = cfg.hide_color
-                        selected_nodes_outline_color_array[seq_index] = cfg.hide_color
+            selected_nodes_color_array, selected_nodes_outline_color_array = self.get_display_colors(color_by)
 
             # Display the scatter-plot for the subset
             self.scatter_plot.set_data(pos=pos_array, face_color=selected_nodes_color_array,
@@ -582,10 +513,8 @@ class Network3D:
             # Update the connecting lines
             pos_array[:, 2] = -0.01  # Put the lines at the back of the scatter plot (since the ordering is not enough)
             order = 6
+            self.set_lines_data(pos_array)
             for i in range(5):
-                line_color, line_width = set_edges(i)
-                self.lines[i].set_data(pos=pos_array, color=line_color, width=line_width,
-                                       connect=self.selected_connections_by_bins[i])
                 self.lines[i].order = order
                 order -= 1
 
@@ -595,6 +524,8 @@ class Network3D:
         self.update_sequences_names(2)
 
     def set_subset_view(self, dim_num, color_by, group_by, z_index_mode):
+        self.invalidate_display_colors()
+
         self.is_subset_mode = 1
 
         subset_size = len(self.selected_points)
@@ -640,13 +571,11 @@ class Network3D:
         # Divide the connections into 5 bins
         self.create_connections_by_bins_subset()
 
-        # Calculate the initial azimuth and elevation angles of the points in the subset (for future rotation)
-        if dim_num == 3:
-            self.calculate_initial_angles()
-
         self.update_view(dim_num, color_by, group_by, z_index_mode)
 
     def set_full_view(self, dim_num, color_by, group_by, z_index_mode):
+        self.invalidate_display_colors()
+
         self.is_subset_mode = 0
 
         self.set_range_turntable_camera(dim_num)
@@ -674,7 +603,6 @@ class Network3D:
             self.selected_pos_array = self.selected_rotated_pos_array.copy()
 
         self.update_view(dim_num, color_by, group_by, z_index_mode)
-        self.calculate_initial_angles()
 
     def set_selection_mode(self, z_index_mode, color_by, group_by):
 
@@ -691,42 +619,11 @@ class Network3D:
         else:
             self.save_rotated_coordinates(2, fr_object, color_by, group_by, z_index_mode)
 
-    def calculate_initial_angles(self):
-
-        #print("Calculating the initial angles for rotation purposes")
-        #print("Initial Coordinates:")
-        #print(self.pos_array)
-
-        # Full data mode
-        if self.is_subset_mode == 0:
-
-            # Calculate the distance of the point from the origin on the XY and YZ planes
-            self.xy_vector = np.sqrt(self.pos_array[:, 0] ** 2 + self.pos_array[:, 1] ** 2)
-            self.yz_vector = np.sqrt(self.pos_array[:, 1] ** 2 + self.pos_array[:, 2] ** 2)
-
-            # Calculate the initial azimuth angles (on XY plane, relative to X) and elevation angles
-            # (on YZ plane, relative to Y) for all the points
-            self.azimuth_angles, self.elevation_angles = ac.calculate_azimuth_elevation(self.pos_array)
-
-        # Subset mode
-        else:
-            # Calculate the distance of the point from the origin on the XY and YZ planes
-            self.selected_xy_vector = np.sqrt(self.selected_pos_array[:, 0] ** 2 + self.selected_pos_array[:, 1] ** 2)
-            self.selected_yz_vector = np.sqrt(self.selected_pos_array[:, 1] ** 2 + self.selected_pos_array[:, 2] ** 2)
-
-            # Calculate the initial azimuth angles (on XY plane, relative to X) and elevation angles
-            # (on YZ plane, relative to Y) for all the points
-            self.selected_azimuth_angles, self.selected_elevation_angles = ac.calculate_azimuth_elevation(self.selected_pos_array)
-
+    # Rotate the coordinates according to the rotation made by the user with the camera (if any):
+    # all the coordinates are rotated with one matrix product, and the rotation matrix is saved, so the rotated
+    # coordinates can be transformed back using its transpose
     def calculate_rotation(self):
 
-        # Full data mode
-        if self.is_subset_mode == 0:
-            self.rotated_pos_array = self.pos_array.copy()
-        # Subset mode
-        else:
-            self.selected_rotated_pos_array = self.selected_pos_array.copy()
-
         # Get the current 3D camera angles to extract the angles of the rotation made by the user (if any)
         self.last_azimuth = self.view.camera.azimuth
         azimuth_change = self.last_azimuth - self.initial_azimuth
@@ -735,92 +632,23 @@ class Network3D:
         elevation_change = self.last_elevation - self.initial_elevation
         elevation_change_in_radians = np.radians(elevation_change)
 
-        if azimuth_change != 0 or elevation_change != 0:
-            #if cfg.run_params['is_debug_mode']:
-                #print("Azimuth was changed in " + str(azimuth_change) + " degrees")
-                #print("Elevation was changed in " + str(elevation_change) + " degrees")
-                #print("The new azimuth is: " + str(self.view.camera.azimuth))
-                #print("The new elevation is: " + str(self.view.camera.elevation))
-
-            # Correct the data coordinates (for display) according to the change in azimuth and/or elevation
-            self.set_rotated_coordinates(azimuth_change_in_radians, elevation_change_in_radians)
-
-        # Calculate the affine matrix and the inverse matrix between the two coordinate systems (original and rotated)
-        self.calculate_affine_mtx()
-
-    def set_rotated_coordinates(self, azimuth_change_in_radians, elevation_change_in_radians):
+        rotation_mtx = ac.calculate_rotation_mtx(azimuth_change_in_radians, elevation_change_in_radians)
 
         # Full data mode
         if self.is_subset_mode == 0:
-
-            # Calculate the corrected coordinates after a movement in the XY plane (Azimuth)
-            if azimuth_change_in_radians != 0:
-                self.rotated_pos_array = ac.calcuate_positions_after_azimuth_change(self.rotated_pos_array,
-                                                                                    self.xy_vector,
-                                                                                    self.azimuth_angles,
-                                                                                    azimuth_change_in_radians)
-
-            # There was a change in elevation
-            if elevation_change_in_radians != 0:
-
-                # If there was already a change in the azimuth, the YZ angles were changed and should be recalculated
-                if azimuth_change_in_radians != 0:
-                    self.elevation_angles = ac.calculate_elevation_angles(self.rotated_pos_array)
-
-                # Calculate the corrected coordinates after a movement in the YZ plane (Elevation)
-                self.rotated_pos_array = ac.calcuate_positions_after_elevation_change(self.rotated_pos_array,
-                                                                                      self.yz_vector,
-                                                                                      self.elevation_angles,
-                                                                                      elevation_change_in_radians)
-
-        # Subset mode
-        else:
-            # Calculate the corrected coordinates after a movement in the XY plane (Azimuth)
-            if azimuth_change_in_radians != 0:
-                self.selected_rotated_pos_array = ac.calcuate_positions_after_azimuth_change(self.selected_rotated_pos_array,
-                                                                                             self.selected_xy_vector,
-                                                                                             self.selected_azimuth_angles,
-                                                                                             azimuth_change_in_radians)
-
-            # There was a change in elevation
-            if elevation_change_in_radians != 0:
-
-                # If there was already a change in the azimuth, the YZ angles were changed and should be recalculated
-                if azimuth_change_in_radians != 0:
-                    self.selected_elevation_angles = ac.calculate_elevation_angles(self.selected_rotated_pos_array)
-                    # print("New elevation angles:")
-                    # print(self.elevation_angles)
-
-                # Calculate the corrected coordinates after a movement in the YZ plane (Elevation)
-                self.selected_rotated_pos_array = ac.calcuate_positions_after_elevation_change(self.selected_rotated_pos_array,
-                                                                                               self.selected_yz_vector,
-                                                                                               self.selected_elevation_angles,
-                                                                                               elevation_change_in_radians)
-
-    def calculate_affine_mtx(self):
-
-        # Full data mode
-        if self.is_subset_mode == 0:
-            pos_array_4 = self.pos_array[:4, :]
-            rotated_pos_array_4 = self.rotated_pos_array[:4, :]
-
-            # If the Z coordinate is 0 (can happen if the input file was originally in 2d)
-            # - generate a random coordinate, just for the matrix (otherwise - errors)
-            if pos_array_4[0, 2] == 0:
-                for i in range(4):
-                    pos_array_4[i, 2] = seq.generate_rand_pos()
-                    rotated_pos_array_4[i, 2] = seq.generate_rand_pos()
-
-            self.affine_mtx = util.transforms.affine_map(pos_array_4, rotated_pos_array_4)
-            self.inverse_affine_mtx = util.transforms.affine_map(rotated_pos_array_4, pos_array_4)
+            self.rotation_mtx = rotation_mtx
+            if azimuth_change != 0 or elevation_change != 0:
+                self.rotated_pos_array = ac.rotate_positions(self.pos_array, rotation_mtx)
+            else:
+                self.rotated_pos_array = self.pos_array.copy()
 
         # Subset mode
         else:
-            pos_array_4 = self.selected_pos_array[:4, :]
-            rotated_pos_array_4 = self.selected_rotated_pos_array[:4, :]
-
-            self.selected_affine_mtx = util.transforms.affine_map(pos_array_4, rotated_pos_array_4)
-            self.selected_inverse_affine_mtx = util.transforms.affine_map(rotated_pos_array_4, pos_array_4)
+            self.selected_rotation_mtx = rotation_mtx
+            if azimuth_change != 0 or elevation_change != 0:
+                self.selected_rotated_pos_array = ac.rotate_positions(self.selected_pos_array, rotation_mtx)
+            else:
+                self.selected_rotated_pos_array = self.selected_pos_array.copy()
 
     def show_connections(self):
 
@@ -840,10 +668,7 @@ class Network3D:
             if dim_num == 2:
                 pos_array[:, 2] = -0.01
 
-            for i in range(5):
-                line_color, line_width = set_edges(i)
-                self.lines[i].set_data(pos=pos_array, color=line_color, width=line_width,
-                                       connect=self.connections_by_bins[i])
+            self.set_lines_data(pos_array)
         # Subset mode
         else:
             selected_pos_array = self.selected_pos_array.copy()
@@ -852,27 +677,92 @@ class Network3D:
             if dim_num == 2:
                 selected_pos_array[:, 2] = -0.01
 
-            for i in range(5):
-                line_color, line_width = set_edges(i)
-                self.lines[i].set_data(pos=selected_pos_array, color=line_color, width=line_width,
-                                       connect=self.selected_connections_by_bins[i])
+            self.set_lines_data(selected_pos_array)
 
     def hide_connections(self):
         for i in range(5):
             self.lines[i].parent = None
 
+    # Set the positions and the connections of the five lines visuals (one per attraction-values bin).
+    # In level-of-detail mode (while the view is rotated or the layout is calculated), only a sample of the connections
+    # is displayed. The connections are passed to a visual only when they have changed (otherwise the whole index
+    # buffer is uploaded again in each frame), and the positions are not passed to the visuals of empty bins
+    def set_lines_data(self, pos_array):
+
+        if self.is_subset_mode == 0:
+            if self.is_edges_lod:
+                connections_by_bins = self.lod_connections_by_bins
+            else:
+                connections_by_bins = self.connections_by_bins
+        else:
+            if self.is_edges_lod:
+                connections_by_bins = self.selected_lod_connections_by_bins
+            else:
+                connections_by_bins = self.selected_connections_by_bins
+
+        for i in range(5):
+            line_color, line_width = set_edges(i)
+
+            if connections_by_bins[i] is self.lines_connections[i]:
+                if len(connections_by_bins[i]) > 0:
+                    self.lines[i].set_data(pos=pos_array, color=line_color, width=line_width)
+                else:
+                    self.lines[i].set_data(color=line_color, width=line_width)
+            else:
+                self.lines[i].set_data(pos=pos_array, color=line_color, width=line_width,
+                                       connect=connections_by_bins[i])
+                self.lines_connections[i] = connections_by_bins[i]
+
+    # Move into / out of the level-of-detail mode of the connections (a sample of the connections is displayed while
+    # the view is moving, and all of them when the view is idle)
+    def set_edges_lod(self, is_edges_lod, dim_num):
+
+        if self.is_edges_lod == is_edges_lod:
+            return
+
+        self.is_edges_lod = is_edges_lod
+
+        # Update the lines only if the sample is different from the full set of connections
+        if self.is_subset_mode == 0:
+            is_sampled = self.lod_connections_by_bins is not self.connections_by_bins
+        else:
+            is_sampled = self.selected_lod_connections_by_bins is not self.selected_connections_by_bins
+        if is_sampled:
+            self.update_connections(dim_num)
+
     def create_connections_by_bins(self):
         self.connections_by_bins = []
 
         # (Divide the data to 5 color-bins, according to the attraction values.
         # lower att-values -> higher == lighter gray -> darker gray)
-        edges_bins_array = np.digitize(cfg.att_values_for_connected_list, self.att_values_bins, right=True)
+        # The connected pairs are sorted by decreasing attraction values, so each bin is a slice of the connections
+        # list: bin i holds the connections with att_values_bins[i-1] < attraction value <= att_values_bins[i]
+        connections_num = len(cfg.att_values_for_connected_list)
+        bins_bounds = connections_num - np.searchsorted(cfg.att_values_for_connected_list[::-1], self.att_values_bins,
+                                                        side='right')
 
-        # For each bin, build an array consisting only the connections that belong to the same bin
+        # For each bin, take the connections that belong to the same bin
         for i in range(5):
-            connections = cfg.connected_sequences_list[edges_bins_array == (i + 1)]
+            connections = cfg.connected_sequences_list[bins_bounds[i + 1]:bins_bounds[i]]
             self.connections_by_bins.append(connections)
 
+        # Sample the connections to display while the view is moving (the sampled indices are sorted, so they are
+        # divided into the bins in the same way)
+        sampled_connections = sample_connections(cfg.att_values_for_connected_list,
+                                                 cfg.run_params['edges_lod_budget'])
+        if sampled_connections is None:
+            self.lod_connections_by_bins = self.connections_by_bins
+        else:
+            self.lod_connections_by_bins = []
+            sampled_bounds = np.searchsorted(sampled_connections, bins_bounds)
+            for i in range(5):
+                connections = cfg.connected_sequences_list[
+                    sampled_connections[sampled_bounds[i + 1]:sampled_bounds[i]]]
+                self.lod_connections_by_bins.append(connections)
+
+        # The singeltons may have changed
+        self.invalidate_display_colors()
+
     def create_connections_by_bins_subset(self):
         self.selected_connections_by_bins = []
 
@@ -885,6 +775,21 @@ class Network3D:
             connections = cfg.connected_sequences_list_subset[edges_bins_array == (i + 1)]
             self.selected_connections_by_bins.append(connections)
 
+        # Sample the connections to display while the view is moving
+        sampled_connections = sample_connections(cfg.att_values_for_connected_list_subset,
+                                                 cfg.run_params['edges_lod_budget'])
+        if sampled_connections is None:
+            self.selected_lod_connections_by_bins = self.selected_connections_by_bins
+        else:
+            self.selected_lod_connections_by_bins = []
+            sampled_bins_array = edges_bins_array[sampled_connections]
+            for i in range(5):
+                connections = cfg.connected_sequences_list_subset[sampled_connections[sampled_bins_array == (i + 1)]]
+                self.selected_lod_connections_by_bins.append(connections)
+
+        # The singeltons may have changed
+        self.invalidate_display_colors()
+
     def hide_singeltons(self, dim_num, color_by, group_by, z_index_mode):
         self.is_hide_singeltons = 1
 
@@ -895,7 +800,54 @@ class Network3D:
 
         self.update_view(dim_num, color_by, group_by, z_index_mode)
 
+    # Mark the cached display colors for recalculation
+    # (must be called after changing the nodes colors, the selection or the singeltons)
+    def invalidate_display_colors(self):
+        self.display_colors_key = None
+
+    # Return the face and outline colors of the displayed nodes (full data or subset) according to the coloring mode,
+    # with the singeltons colored in white in 'hide singeltons' mode.
+    # The arrays are cached, so redrawing the nodes after a coordinates update requires no color calculation
+    def get_display_colors(self, color_by):
+
+        key = (color_by, self.is_subset_mode, self.is_hide_singeltons)
+        if self.display_colors_key == key:
+            return self.display_colors_array, self.display_outline_colors_array
+
+        # Full-data mode
+        if self.is_subset_mode == 0:
+            if color_by == 'groups':
+                nodes_color_array = self.nodes_colors_array.astype(np.float32)
+            else:
+                nodes_color_array = self.nodes_colors_array_by_param.astype(np.float32)
+            nodes_outline_color_array = self.nodes_outline_color_array.astype(np.float32)
+            singeltons_list = cfg.singeltons_list
+
+        # Subset mode
+        else:
+            if color_by == 'groups':
+                nodes_color_array = self.selected_nodes_colors_array.astype(np.float32)
+                nodes_outline_color_array = self.selected_nodes_outline_color_array.astype(np.float32)
+            else:
+                nodes_color_array = self.selected_nodes_colors_array_by_param.astype(np.float32)
+                nodes_outline_color_array = np.tile(np.array(self.nodes_outline_default_color, dtype=np.float32),
+                                                    (len(nodes_color_array), 1))
+            singeltons_list = cfg.singeltons_list_subset
+
+        # Color the singeltons in white (and hide their outline)
+        if self.is_hide_singeltons:
+            is_singelton = np.asarray(singeltons_list) == 1
+            nodes_color_array[is_singelton] = cfg.hide_color
+            nodes_outline_color_array[is_singelton] = cfg.hide_color
+
+        self.display_colors_array = nodes_color_array
+        self.display_outline_colors_array = nodes_outline_color_array
+        self.display_colors_key = key
+
+        return nodes_color_array, nodes_outline_color_array
+
     def color_by_param(self, colormap, param_norm_array, dim_num, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
 
         self.colormap = colormap
         self.norm_array = param_norm_array
@@ -929,24 +881,10 @@ class Network3D:
 
     def color_by_groups(self, dim_num, z_index_mode, color_by, group_by):
 
-        for seq_index in range(cfg.run_params['total_sequences_num']):
-
-            # The sequence belongs to a group -> use the group's definitions
-            if cfg.groups_by_categories[group_by]['sequences'][seq_index] > -1:
-                group_ID = cfg.groups_by_categories[group_by]['sequences'][seq_index]
-                self.nodes_outline_color_array[seq_index] = \
-                    cfg.groups_by_categories[group_by]['groups'][group_ID]['outline_color']
-                self.nodes_size_array[seq_index] = cfg.groups_by_categories[group_by]['groups'][group_ID]['size']
-
-            # The sequence doesn't belong to a group -> use the category's definitions
-            else:
-                self.nodes_outline_color_array[seq_index] = cfg.groups_by_categories[group_by]['nodes_outline_color']
-                self.nodes_size_array[seq_index] = cfg.groups_by_categories[group_by]['nodes_size']
-
-            # If the sequence is selected -> apply the selected definitions
-            if seq_index in self.selected_points:
-                self.nodes_outline_color_array[seq_index] = self.selected_outline_color
-                self.nodes_size_array[seq_index] += 5
+        # The sequences that belong to a group -> use the group's definitions,
+        # the sequences that don't belong to a group -> use the category's definitions
+        # (the selected sequences get the selected definitions)
+        self.set_nodes_params_by_groups(group_by, is_set_colors=False)
 
         if dim_num == 3:
             self.update_3d_view(color_by)
@@ -954,6 +892,7 @@ class Network3D:
             self.update_2d_view(z_index_mode, color_by, group_by)
 
     def update_group_by(self, dim_num, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
 
         # Initiate all groups-related variables
         self.groups_to_show = {}
@@ -969,26 +908,8 @@ class Network3D:
 
         self.nodes_outline_width = cfg.groups_by_categories[group_by]['nodes_outline_width']
 
-        for seq_index in range(cfg.run_params['total_sequences_num']):
-
-            # Change the size and color according to the groups definition (if any)
-            if cfg.groups_by_categories[group_by]['sequences'][seq_index] > -1:
-                group_ID = cfg.groups_by_categories[group_by]['sequences'][seq_index]
-                self.nodes_colors_array[seq_index] = \
-                    cfg.groups_by_categories[group_by]['groups'][group_ID]['color_array']
-                self.nodes_size_array[seq_index] = cfg.groups_by_categories[group_by]['groups'][group_ID]['size']
-                self.nodes_outline_color_array[seq_index] = \
-                    cfg.groups_by_categories[group_by]['groups'][group_ID]['outline_color']
-
-            # Use the category's definitions
-            else:
-                self.nodes_colors_array[seq_index] = self.nodes_default_color
-                self.nodes_size_array[seq_index] = cfg.groups_by_categories[group_by]['nodes_size']
-                self.nodes_outline_color_array[seq_index] = cfg.groups_by_categories[group_by]['nodes_outline_color']
-
-            if seq_index in self.selected_points:
-                self.nodes_size_array[seq_index] += 5
-                self.nodes_outline_color_array[seq_index] = self.selected_outline_color
+        # Change the size and color according to the groups definition (if any) or the category's definitions
+        self.set_nodes_params_by_groups(group_by)
 
         # Build the text visuals of the group names
         self.build_group_names_visual(group_by)
@@ -999,33 +920,43 @@ class Network3D:
         # Subset view mode
         if self.is_subset_mode == 1:
 
-            i = 0
-            for seq_index in sorted(self.selected_points):
+            selected_indices = np.array(sorted(self.selected_points), dtype=np.int64)
+            group_IDs = cfg.groups_by_categories[group_by]['sequences'][selected_indices]
+            colors_by_groups, sizes_by_groups, outline_colors_by_groups = \
+                groups.get_nodes_params_by_groups(group_by, self.nodes_default_color)
 
-                self.selected_nodes_colors_array[i] = self.nodes_colors_array[seq_index]
-
-                # The sequence belongs to a group -> Use the group definitions
-                if cfg.groups_by_categories[group_by]['sequences'][seq_index] > -1:
-                    group_ID = cfg.groups_by_categories[group_by]['sequences'][seq_index]
-                    self.selected_nodes_size_array[i] = cfg.groups_by_categories[group_by]['groups'][group_ID]['size']
-                    self.selected_nodes_outline_color_array[i] = \
-                        cfg.groups_by_categories[group_by]['groups'][group_ID]['outline_color']
-
-                # Use the grouping-category definitons
-                else:
-                    self.selected_nodes_size_array[i] = cfg.groups_by_categories[group_by]['nodes_size']
-                    self.selected_nodes_outline_color_array[i] = \
-                        cfg.groups_by_categories[group_by]['nodes_outline_color']
-
-                i += 1
+            self.selected_nodes_colors_array[:len(selected_indices)] = self.nodes_colors_array[selected_indices]
+            self.selected_nodes_size_array[:len(selected_indices)] = sizes_by_groups[group_IDs]
+            self.selected_nodes_outline_color_array[:len(selected_indices)] = outline_colors_by_groups[group_IDs]
 
         if dim_num == 3:
             self.update_3d_view(color_by)
         else:
             self.update_2d_view(z_index_mode, color_by, group_by)
 
+    # Set the nodes colors, sizes and outline colors according to the groups of the category (for the sequences
+    # that belong to a group) and the category's definitions (for the rest). Selected sequences are marked.
+    def set_nodes_params_by_groups(self, group_by, is_set_colors=True):
+        self.invalidate_display_colors()
+
+        group_IDs = cfg.groups_by_categories[group_by]['sequences']
+        colors_by_groups, sizes_by_groups, outline_colors_by_groups = \
+            groups.get_nodes_params_by_groups(group_by, self.nodes_default_color)
+
+        if is_set_colors:
+            self.nodes_colors_array[:] = colors_by_groups[group_IDs]
+        self.nodes_size_array[:] = sizes_by_groups[group_IDs]
+        self.nodes_outline_color_array[:] = outline_colors_by_groups[group_IDs]
+
+        selected_indices = np.fromiter(self.selected_points, dtype=np.int64, count=len(self.selected_points))
+        self.nodes_size_array[selected_indices] += 5
+        self.nodes_outline_color_array[selected_indices] = self.selected_outline_color
+
     def build_scatter_by_groups(self, group_by):
 
+        # The members of all the groups
+        indptr, members = groups.get_members_by_groups(group_by)
+
         order = -1
         for group_ID in self.ordered_groups_to_show:
 
@@ -1036,11 +967,8 @@ class Network3D:
             self.scatter_by_groups[group_ID] = scatter
             order += 1
 
-            # Build an array holding the sequences-indices of the members of this group
-            members_array = []
-            for seqID in cfg.groups_by_categories[group_by]['groups'][group_ID]['seqIDs']:
-                members_array.append(seqID)
-            self.members_array_by_groups[group_ID] = members_array.copy()
+            # An array holding the sequences-indices of the members of this group
+            self.members_array_by_groups[group_ID] = groups.get_group_members(indptr, members, group_ID)
 
         # Add a scatter visual for the sequences that do not belong to any group
         group_ID = 'none'
@@ -1049,12 +977,8 @@ class Network3D:
         scatter.order = order
         self.scatter_by_groups[group_ID] = scatter
 
-        # Build an array holding the sequences-indices of the members of the 'none' group
-        members_array = []
-        for seq_index in range(len(cfg.sequences_array)):
-            if cfg.groups_by_categories[group_by]['sequences'][seq_index] == -1:
-                members_array.append(seq_index)
-        self.members_array_by_groups[group_ID] = members_array.copy()
+        # An array holding the sequences-indices of the members of the 'none' group
+        self.members_array_by_groups[group_ID] = groups.get_group_members(indptr, members, -1)
 
     def add_to_scatter_by_groups(self, group_ID):
 
@@ -1074,19 +998,14 @@ class Network3D:
 
     def update_members_by_groups(self, group_by):
 
+        indptr, members = groups.get_members_by_groups(group_by)
+
         # Update the member sequences of each group
         for group_ID in self.groups_to_show:
-            members_array = []
-            for seqID in cfg.groups_by_categories[group_by]['groups'][group_ID]['seqIDs']:
-                members_array.append(seqID)
-            self.members_array_by_groups[group_ID] = members_array.copy()
+            self.members_array_by_groups[group_ID] = groups.get_group_members(indptr, members, group_ID)
 
         # Update the members of the 'none' group
-        members_array = []
-        for seq_index in range(len(cfg.sequences_array)):
-            if cfg.groups_by_categories[group_by]['sequences'][seq_index] == -1:
-                members_array.append(seq_index)
-        self.members_array_by_groups['none'] = members_array.copy()
+        self.members_array_by_groups['none'] = groups.get_group_members(indptr, members, -1)
 
     def remove_from_scatter_by_groups(self, group_ID, dim_num, z_index_mode, color_by, group_by):
 
@@ -1116,38 +1035,16 @@ class Network3D:
         pos_array = self.rotated_pos_array.copy()
         pos_array[:, 2] = 0  # Zero the Z-axis
 
+        nodes_color_array, nodes_outline_color_array = self.get_display_colors('groups')
+
         for group_ID in self.scatter_by_groups:
-            if len(self.members_array_by_groups[group_ID]) > 0:
-                self.pos_array_by_groups[group_ID] = np.zeros((len(self.members_array_by_groups[group_ID]), 3),
-                                                              dtype=np.float32)
-                self.size_array_by_groups[group_ID] = np.zeros(len(self.members_array_by_groups[group_ID]),
-                                                               dtype=np.float32)
-                self.nodes_outline_color_array_by_groups[group_ID] = \
-                    np.zeros((len(self.members_array_by_groups[group_ID]), 4), dtype=np.float32)
-                self.nodes_color_array_by_groups[group_ID] = \
-                    np.zeros((len(self.members_array_by_groups[group_ID]), 4), dtype=np.float32)
-
-                for i in range(len(self.members_array_by_groups[group_ID])):
-                    orig_seq_index = self.members_array_by_groups[group_ID][i]
-
-                    self.pos_array_by_groups[group_ID][i] = pos_array[orig_seq_index]
-                    self.size_array_by_groups[group_ID][i] = self.nodes_size_array[orig_seq_index]
-                    self.nodes_color_array_by_groups[group_ID][i] = self.nodes_colors_array[orig_seq_index]
-                    self.nodes_outline_color_array_by_groups[group_ID][i] = \
-                        self.nodes_outline_color_array[orig_seq_index]
-
-                    # If in 'hide singeltons' mode - color the nodes+outline in white
-                    if self.is_hide_singeltons and cfg.singeltons_list[orig_seq_index]:
-                        self.nodes_color_array_by_groups[group_ID][i] = cfg.hide_color
-                        self.nodes_outline_color_array_by_groups[group_ID][i] = cfg.hide_color
-
-                #if group_ID == 'none':
-                    #color = self.nodes_default_color
-                #else:
-                    #color = cfg.groups_by_categories[group_by]['groups'][group_ID]['color_array']
-
-                if self.is_hide_singeltons and cfg.singeltons_list[orig_seq_index]:
-                    color = cfg.hide_color
+            members_array = self.members_array_by_groups[group_ID]
+            if len(members_array) > 0:
+                self.pos_array_by_groups[group_ID] = pos_array[members_array].astype(np.float32)
+                self.size_array_by_groups[group_ID] = self.nodes_size_array[members_array].astype(np.float32)
+                # (in 'hide singeltons' mode, the singeltons are already colored in white)
+                self.nodes_color_array_by_groups[group_ID] = nodes_color_array[members_array]
+                self.nodes_outline_color_array_by_groups[group_ID] = nodes_outline_color_array[members_array]
 
                 self.scatter_by_groups[group_ID].set_data(pos=self.pos_array_by_groups[group_ID],
                                                           face_color=self.nodes_color_array_by_groups[group_ID],
@@ -1391,6 +1288,7 @@ class Network3D:
         self.remove_from_group_names_visual(group_by, group_ID)
 
     def edit_group_parameters(self, group_ID, dim_num, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
 
         # The group is not empty
         if len(cfg.groups_by_categories[group_by]['groups'][group_ID]['seqIDs']) > 0:
@@ -1438,6 +1336,7 @@ class Network3D:
         self.reset_group_names_positions(group_by)
 
     def add_to_group(self, points_dict, group_ID, dim_num, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
 
         if group_ID in self.groups_to_show:
             for seq_index in points_dict:
@@ -1456,6 +1355,8 @@ class Network3D:
             self.update_2d_view(z_index_mode, color_by, group_by)
 
     def remove_from_group(self, points_dict, dim_num, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
+
         for seq_index in points_dict:
             self.nodes_colors_array[seq_index] = self.nodes_default_color
 
@@ -1470,6 +1371,17 @@ class Network3D:
         else:
             self.update_2d_view(z_index_mode, color_by, group_by)
 
+    # Return the screen-coordinates index of the data points.
+    # The index is built again only when the camera (the scene transform) or the positions have changed
+    # since the last selection.
+    def get_screen_index(self):
+        trans = self.view.scene.transform
+
+        if self.screen_index is None or not self.screen_index.is_valid(trans, self.rotated_pos_array):
+            self.screen_index = si.ScreenIndex(trans, self.rotated_pos_array, np.amax(self.nodes_size_array))
+
+        return self.screen_index
+
     def find_selected_point(self, selection_type, clicked_screen_coor, z_index_mode, color_by, group_by,
                             is_show_group_names, group_names_display):
 
@@ -1478,79 +1390,66 @@ class Network3D:
         groups_in_radius = {}
         deselect = 0
 
-        trans = self.view.scene.transform
-
-        for seq_index in range(self.rotated_pos_array.shape[0]):
+        # Find the data points whose distance from the clicked point (in screen coor) is not larger than their radius
+        # (the radius in pixels around the clicked position is the size of each data point)
+        points_found = self.get_screen_index().find_points_in_radius(clicked_screen_coor, self.nodes_size_array)
 
-            # Define the radius (in pixels) around the clicked position to look for a data point(s)
-            radius = self.nodes_size_array[seq_index]
+        for seq_index in points_found.tolist():
 
-            # Translate the data coordinates into screen coordinates
-            data_screen_coor = trans.map(self.rotated_pos_array[seq_index])
-            data_screen_coor /= data_screen_coor[3]
-
-            # Calculate the euclidean distances of all the points from the clicked point (in screen coor)
-            distance_screen_coor = np.linalg.norm(data_screen_coor[:2] - clicked_screen_coor)
-
-            # Found a data point in the radius of the clicked point
-            if distance_screen_coor <= radius:
+            # Select / deselect a data-point (sequence)
+            if selection_type == 'sequences':
+                points_in_radius.append(seq_index)
 
-                # Select / deselect a data-point (sequence)
-                if selection_type == 'sequences':
-                    points_in_radius.append(seq_index)
-
-                    # Deselect the data point
-                    if seq_index in self.selected_points:
-                        del self.selected_points[seq_index]
-                        cfg.sequences_array[seq_index]['in_subset'] = False
-                        deselect = 1
-                    # Select the data point
-                    else:
-                        self.selected_points[seq_index] = 1
-                        cfg.sequences_array[seq_index]['in_subset'] = True
-                    #print("Found matching point: Index = " + str(seq_index))
-                    #print("Position in screen coor: " + str(data_screen_coor))
-                    #print("Distance from clicked point: " + str(distance_screen_coor))
-
-                # Select / deselect all the sequences belonging to the group of the selected data-point (if any)
+                # Deselect the data point
+                if seq_index in self.selected_points:
+                    del self.selected_points[seq_index]
+                    cfg.sequences_array[seq_index]['in_subset'] = False
+                    deselect = 1
+                # Select the data point
                 else:
-                    if cfg.groups_by_categories[group_by]['sequences'][seq_index] > -1:
-                        group_ID = cfg.groups_by_categories[group_by]['sequences'][seq_index]
-                        #print("Found matching group: Index = " + str(group_index))
+                    self.selected_points[seq_index] = 1
+                    cfg.sequences_array[seq_index]['in_subset'] = True
+                #print("Found matching point: Index = " + str(seq_index))
 
-                        # The first time we encounter this group
-                        if group_ID not in groups_in_radius:
+            # Select / deselect all the sequences belonging to the group of the selected data-point (if any)
+            else:
+                if cfg.groups_by_categories[group_by]['sequences'][seq_index] > -1:
+                    group_ID = cfg.groups_by_categories[group_by]['sequences'][seq_index]
+                    #print("Found matching group: Index = " + str(group_index))
 
-                            points_in_radius = []
+                    # The first time we encounter this group
+                    if group_ID not in groups_in_radius:
 
-                            # A loop over all the sequences belonging to this group
-                            for seqID in cfg.groups_by_categories[group_by]['groups'][group_ID]['seqIDs']:
-                                points_in_radius.append(seqID)
+                        points_in_radius = []
 
-                                # Deselect the sequences
-                                if group_ID in self.selected_groups:
-                                    del self.selected_points[seqID]
-                                    cfg.sequences_array[seqID]['in_subset'] = False
-                                # Select the sequences
-                                else:
-                                    self.selected_points[seqID] = 1
-                                    cfg.sequences_array[seqID]['in_subset'] = True
+                        # A loop over all the sequences belonging to this group
+                        for seqID in cfg.groups_by_categories[group_by]['groups'][group_ID]['seqIDs']:
+                            points_in_radius.append(seqID)
 
-                            # Deselect the group
+                            # Deselect the sequences
                             if group_ID in self.selected_groups:
-                                self.remove_from_selected_group_names_visual(group_by, group_ID)
-                                del self.selected_groups[group_ID]
-                                # Unmark the sequences from the selected group
-                                self.unmark_selected_points(points_in_radius, 2, z_index_mode, color_by, group_by)
-                            # Select the group
+                                del self.selected_points[seqID]
+                                cfg.sequences_array[seqID]['in_subset'] = False
+                            # Select the sequences
                             else:
-                                self.selected_groups[group_ID] = 1
-                                self.mark_selected_points(points_in_radius, z_index_mode, color_by, group_by)
-                                self.add_to_selected_group_names_visual(group_by, group_ID)
-                                if is_show_group_names and group_names_display == 'selected':
-                                    self.show_group_names(group_names_display)
+                                self.selected_points[seqID] = 1
+                                cfg.sequences_array[seqID]['in_subset'] = True
+
+                        # Deselect the group
+                        if group_ID in self.selected_groups:
+                            self.remove_from_selected_group_names_visual(group_by, group_ID)
+                            del self.selected_groups[group_ID]
+                            # Unmark the sequences from the selected group
+                            self.unmark_selected_points(points_in_radius, 2, z_index_mode, color_by, group_by)
+                        # Select the group
+                        else:
+                            self.selected_groups[group_ID] = 1
+                            self.mark_selected_points(points_in_radius, z_index_mode, color_by, group_by)
+                            self.add_to_selected_group_names_visual(group_by, group_ID)
+                            if is_show_group_names and group_names_display == 'selected':
+                                self.show_group_names(group_names_display)
 
-                            groups_in_radius[group_ID] = 1
+                        groups_in_radius[group_ID] = 1
 
         if selection_type == 'sequences' and len(points_in_radius) > 0:
             #print("Selected point(s) indices:")
@@ -1572,46 +1471,39 @@ class Network3D:
         points_in_area = []
         groups_in_area = {}
 
-        trans = self.view.scene.transform
+        # Find the data points inside the selected area (in screen coor)
+        points_found = self.get_screen_index().find_points_in_rectangle(drag_start_screen_coor,
+                                                                        drag_end_screen_coor)
 
-        for seq_index in range(self.rotated_pos_array.shape[0]):
+        for seq_index in points_found.tolist():
 
-            # Translate the data coordinates into screen coordinates
-            data_screen_coor = trans.map(self.rotated_pos_array[seq_index])
-            data_screen_coor /= data_screen_coor[3]
-
-
-            # Data point is inside the selected area
-            if drag_start_screen_coor[0] <= data_screen_coor[0] <= drag_end_screen_coor[0] and \
-                    drag_start_screen_coor[1] <= data_screen_coor[1] <= drag_end_screen_coor[1]:
-
-                # Sequences selection mode
-                if selection_type == "sequences":
-                    self.selected_points[seq_index] = 1
-                    cfg.sequences_array[seq_index]['in_subset'] = True
-                    points_in_area.append(seq_index)
+            # Sequences selection mode
+            if selection_type == "sequences":
+                self.selected_points[seq_index] = 1
+                cfg.sequences_array[seq_index]['in_subset'] = True
+                points_in_area.append(seq_index)
 
-                # Groups selection mode
-                else:
-                    # Data point belongs to a group
-                    if cfg.groups_by_categories[group_by]['sequences'][seq_index] > -1:
-                        group_ID = cfg.groups_by_categories[group_by]['sequences'][seq_index]
-                        #print("Found matching group: Index = " + str(group_index))
+            # Groups selection mode
+            else:
+                # Data point belongs to a group
+                if cfg.groups_by_categories[group_by]['sequences'][seq_index] > -1:
+                    group_ID = cfg.groups_by_categories[group_by]['sequences'][seq_index]
+                    #print("Found matching group: Index = " + str(group_index))
 
-                        # The first time we encounter this group
-                        if group_ID not in groups_in_area:
-                            self.selected_groups[group_ID] = 1
-                            self.add_to_selected_group_names_visual(group_by, group_ID)
-                            if is_show_group_names and group_names_display == 'selected':
-                                self.show_group_names(group_names_display)
+                    # The first time we encounter this group
+                    if group_ID not in groups_in_area:
+                        self.selected_groups[group_ID] = 1
+                        self.add_to_selected_group_names_visual(group_by, group_ID)
+                        if is_show_group_names and group_names_display == 'selected':
+                            self.show_group_names(group_names_display)
 
-                            # A loop over all the sequences belonging to this group
-                            for seqID in cfg.groups_by_categories[group_by]['groups'][group_ID]['seqIDs']:
-                                points_in_area.append(seqID)
-                                self.selected_points[seqID] = 1
-                                cfg.sequences_array[seqID]['in_subset'] = True
+                        # A loop over all the sequences belonging to this group
+                        for seqID in cfg.groups_by_categories[group_by]['groups'][group_ID]['seqIDs']:
+                            points_in_area.append(seqID)
+                            self.selected_points[seqID] = 1
+                            cfg.sequences_array[seqID]['in_subset'] = True
 
-                            groups_in_area[group_ID] = 1
+                        groups_in_area[group_ID] = 1
 
         if len(points_in_area) > 0:
             #print("Point(s) in area indices:")
@@ -1637,6 +1529,7 @@ class Network3D:
             self.set_subset_view(dim_num, color_by, group_by, z_index_mode)
 
     def mark_selected_points(self, selected_array, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
 
         for i in range(len(selected_array)):
 
@@ -1662,6 +1555,7 @@ class Network3D:
         self.update_2d_view(z_index_mode, color_by, group_by)
 
     def unmark_selected_points(self, selected_array, dim_num, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
 
         for seq_index in selected_array:
 
@@ -1691,6 +1585,7 @@ class Network3D:
 
     def select_all(self, selection_type, dim_num, z_index_mode, color_by, group_by, is_show_group_names,
                    group_names_display):
+        self.invalidate_display_colors()
 
         for seq_index in range(cfg.run_params['total_sequences_num']):
             if seq_index not in self.selected_points:
@@ -1715,6 +1610,7 @@ class Network3D:
 
     def inverse_selection(self, dim_num_view, z_index_mode, color_by, group_by, is_show_group_names,
                           group_names_display):
+        self.invalidate_display_colors()
 
         new_selected_points = []
         old_selected_points = []
@@ -1772,6 +1668,7 @@ class Network3D:
         #self.update_view(dim_num_view, color_by, group_by, z_index_mode)
 
     def select_subset(self, selected_dict, dim_num, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
 
         for seq_index in selected_dict:
             if seq_index not in self.selected_points:
@@ -1787,6 +1684,7 @@ class Network3D:
 
     def reset_selection(self, dim_num_view, z_index_mode, color_by, group_by, is_show_group_names,
                         group_names_display):
+        self.invalidate_display_colors()
 
         for seq_index in self.selected_points:
             cfg.sequences_array[seq_index]['in_subset'] = False
@@ -1824,6 +1722,7 @@ class Network3D:
         self.update_view(dim_num_view, color_by, group_by, z_index_mode)
 
     def highlight_selected_points(self, selected_dict, dim_num, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
 
         # Full dataset mode
         if not self.is_subset_mode:
@@ -1873,6 +1772,7 @@ class Network3D:
         self.update_view(dim_num, color_by, group_by, z_index_mode)
 
     def unhighlight_selected_points(self, selected_dict, dim_num, z_index_mode, color_by, group_by):
+        self.invalidate_display_colors()
 
         # Full dataset mode
         if not self.is_subset_mode:
@@ -1988,16 +1888,12 @@ class Network3D:
     def update_moved_positions(self, moved_pos_dict, dim_num):
 
         if dim_num == 2:
-            for index in moved_pos_dict:
-                rotated_array = np.append(self.rotated_pos_array[index], 1)
-                inverse_array = np.dot(self.inverse_affine_mtx, rotated_array)
-                self.pos_array[index] = inverse_array[:3]
+            moved_indices = np.fromiter(moved_pos_dict, dtype=np.int64, count=len(moved_pos_dict))
+            self.pos_array[moved_indices] = ac.inverse_rotate_positions(self.rotated_pos_array[moved_indices],
+                                                                        self.rotation_mtx)
 
         seq.update_positions(self.pos_array.T, 'full')
 
-        # Calculate the angles of each point for future use when having rotations
-        self.calculate_initial_angles()
-
     def find_points_to_move(self, clicked_screen_coor):
 
         trans = self.view.scene.transform
@@ -2227,12 +2123,12 @@ class Network3D:
     def set_rotated_center(self):
         self.center = self.view.camera.center
 
-        center_array = np.append(np.array(self.center), 1)
+        center_array = np.array(self.center, dtype=np.float64)
 
         if self.is_subset_mode == 0:
-            rotated_center_array = np.dot(self.affine_mtx, center_array)
+            rotated_center_array = np.dot(self.rotation_mtx, center_array)
         else:
-            rotated_center_array = np.dot(self.selected_affine_mtx, center_array)
+            rotated_center_array = np.dot(self.selected_rotation_mtx, center_array)
         #print("Rotated center array:")
         #print(rotated_center_array)
 
@@ -0,0 +1,83 @@
+import numpy as np
+
+# Points used to detect changes of the scene transform (camera rotation / zoom / pan, canvas resize):
+# the transform is affine, so it is fully determined by the mapping of these points
+probe_points = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [1.0, 1.0, 1.0]])
+
+
+# Map all the data points to screen coordinates in one transform call
+def map_to_screen(trans, pos_array):
+    screen_coor = trans.map(pos_array)
+    return screen_coor[:, :2] / screen_coor[:, 3:4]
+
+
+# An index of the points in screen coordinates, used to find the points around a clicked position or inside a
+# dragged rectangle without looping over all the points.
+# The points are binned into a 2D grid of square cells; the points are sorted by their cell key (row * cols + col),
+# so the points of each cell (and of each consecutive range of cells in a row) are a contiguous slice.
+class ScreenIndex:
+
+    def __init__(self, trans, pos_array, cell_size):
+        self.probe = trans.map(probe_points)
+        self.pos_array = np.array(pos_array, copy=True)
+        self.screen_coor = map_to_screen(trans, self.pos_array)
+
+        self.cell_size = max(float(cell_size), 1.0)
+        if len(self.screen_coor) > 0:
+            self.min_coor = np.amin(self.screen_coor, axis=0)
+            max_cells = np.floor((np.amax(self.screen_coor, axis=0) - self.min_coor) / self.cell_size).astype(np.int64)
+        else:
+            self.min_coor = np.zeros(2)
+            max_cells = np.zeros(2, dtype=np.int64)
+        self.cols_num = int(max_cells[0]) + 1
+        self.rows_num = int(max_cells[1]) + 1
+
+        cells = self.get_cells(self.screen_coor)
+        keys = cells[:, 1] * self.cols_num + cells[:, 0]
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+
+    # Check whether the index is still valid for the current transform and positions
+    def is_valid(self, trans, pos_array):
+        return np.array_equal(trans.map(probe_points), self.probe) and np.array_equal(pos_array, self.pos_array)
+
+    def get_cells(self, screen_coor):
+        return np.floor((screen_coor - self.min_coor) / self.cell_size).astype(np.int64)
+
+    # Return the (sorted) indices of the points in the cells range [col_start, col_end] x [row_start, row_end]
+    def get_candidates(self, col_start, col_end, row_start, row_end):
+        col_start = max(col_start, 0)
+        row_start = max(row_start, 0)
+        col_end = min(col_end, self.cols_num - 1)
+        row_end = min(row_end, self.rows_num - 1)
+        if col_start > col_end or row_start > row_end:
+            return np.zeros(0, dtype=np.int64)
+
+        rows = np.arange(row_start, row_end + 1)
+        starts = np.searchsorted(self.sorted_keys, rows * self.cols_num + col_start, side='left')
+        ends = np.searchsorted(self.sorted_keys, rows * self.cols_num + col_end, side='right')
+        candidates = np.concatenate([self.order[start:end] for start, end in zip(starts, ends)])
+        return np.sort(candidates)
+
+    # Find the points whose distance (in pixels) from the clicked position is not larger than their radius
+    def find_points_in_radius(self, clicked_screen_coor, radius_array):
+        clicked_screen_coor = np.asarray(clicked_screen_coor, dtype=float)[:2]
+        max_radius = float(np.amax(radius_array)) if len(radius_array) > 0 else 0.0
+
+        start_cell = self.get_cells(clicked_screen_coor - max_radius)
+        end_cell = self.get_cells(clicked_screen_coor + max_radius)
+        candidates = self.get_candidates(start_cell[0], end_cell[0], start_cell[1], end_cell[1])
+
+        distances = np.linalg.norm(self.screen_coor[candidates] - clicked_screen_coor, axis=1)
+        return candidates[distances <= radius_array[candidates]]
+
+    # Find the points inside the rectangle (start and end are the lower-left and the upper-right corners)
+    def find_points_in_rectangle(self, start_screen_coor, end_screen_coor):
+        start_cell = self.get_cells(np.asarray(start_screen_coor, dtype=float)[:2])
+        end_cell = self.get_cells(np.asarray(end_screen_coor, dtype=float)[:2])
+        candidates = self.get_candidates(start_cell[0], end_cell[0], start_cell[1], end_cell[1])
+
+        candidates_coor = self.screen_coor[candidates]
+        is_inside = (start_screen_coor[0] <= candidates_coor[:, 0]) & (candidates_coor[:, 0] <= end_screen_coor[0]) & \
+                    (start_screen_coor[1] <= candidates_coor[:, 1]) & (candidates_coor[:, 1] <= end_screen_coor[1])
+        return candidates[is_inside]
@@ -0,0 +1,225 @@
+import os
+import json
+import numpy as np
+import clans.config as cfg
+import clans.clans.data.sequence_pairs as sp
+import clans.clans.io.file_formats.clans_format as clans_format
+
+# The binary CLANS project is a directory holding NumPy (.npy) arrays and a JSON header:
+# - header.json: the number of sequences, the type of values, the parameters block, the groups (without the
+#   sequences), the numeric parameters settings and the taxonomy
+# - sequences.npy: the structured sequences array (seq_dt), including the coordinates
+# - pairs_index1.npy, pairs_index2.npy, similarity_values.npy: the non-redundant sorted pairs and their values
+# - groups.npy: the group_ID of each sequence in each grouping category (-1 = no group)
+# - numeric_params.npy: the values of the numeric parameters (one row per parameter)
+# The arrays are memory-mapped when the project is loaded, so the loading time is bounded by the disk reads.
+format_version = 1
+header_file = "header.json"
+
+
+class BinaryFormat(clans_format.ClansFormat):
+
+    def __init__(self):
+        super().__init__()
+        self.sequences_array = None
+
+    def read_file(self, file_path):
+
+        self.file_name = os.path.basename(os.path.normpath(file_path))
+
+        # Verify that the project directory exists
+        if not os.path.isdir(file_path):
+            self.file_is_valid = 0
+            self.error = "The directory \'" + file_path + "\' does not exist"
+            print(self.error)
+            return
+
+        if not os.path.isfile(os.path.join(file_path, header_file)):
+            self.file_is_valid = 0
+            self.error = "The directory " + self.file_name + " is not a binary CLANS project:\n"
+            self.error += "The project must contain the header file (" + header_file + ")"
+            print(self.error)
+            return
+
+        with open(os.path.join(file_path, header_file)) as infile:
+            header = json.load(infile)
+
+        if header.get('format_version', 0) > format_version:
+            self.file_is_valid = 0
+            self.error = "The binary CLANS project " + self.file_name + " was saved by a newer version of CLANS " \
+                         "(format version " + str(header['format_version']) + ")"
+            print(self.error)
+            return
+
+        try:
+            # The sequences array is mapped copy-on-write: it can be updated (coordinates, subset) in memory
+            # without changing the file. The pairs arrays are mapped read-only.
+            self.sequences_array = np.load(os.path.join(file_path, "sequences.npy"), mmap_mode='c')
+            pairs_index1 = np.load(os.path.join(file_path, "pairs_index1.npy"), mmap_mode='r')
+            pairs_index2 = np.load(os.path.join(file_path, "pairs_index2.npy"), mmap_mode='r')
+            similarity_values = np.load(os.path.join(file_path, "similarity_values.npy"), mmap_mode='r')
+            groups = np.load(os.path.join(file_path, "groups.npy"), mmap_mode='r')
+            numeric_params = np.load(os.path.join(file_path, "numeric_params.npy"), mmap_mode='r')
+        except (OSError, ValueError) as err:
+            self.file_is_valid = 0
+            self.error = "The binary CLANS project " + self.file_name + " cannot be read:\n" + str(err)
+            print(self.error)
+            return
+
+        cfg.run_params['total_sequences_num'] = header['sequences']
+        print("Total number of sequences: " + str(cfg.run_params['total_sequences_num']))
+
+        if self.sequences_array.dtype != cfg.seq_dt or len(self.sequences_array) != header['sequences'] or \
+                not len(pairs_index1) == len(pairs_index2) == len(similarity_values):
+            self.file_is_valid = 0
+            self.error = "The binary CLANS project " + self.file_name + " is inconsistent:\n"
+            self.error += "The arrays do not match the header (" + str(header['sequences']) + " sequences)"
+            print(self.error)
+            return
+
+        self.type_of_values = header['type_of_values']
+        self.params = header['params']
+
+        # Initialize the 'in_subset' field and the subset coordinates (as done when reading a CLANS file)
+        if np.any(self.sequences_array['in_subset']):
+            self.sequences_array['in_subset'] = False
+        self.sequences_array['x_coor_subset'] = self.sequences_array['x_coor']
+        self.sequences_array['y_coor_subset'] = self.sequences_array['y_coor']
+        self.sequences_array['z_coor_subset'] = self.sequences_array['z_coor']
+
+        cfg.sequences_ID_to_index = dict(zip(self.sequences_array['seq_ID'].tolist(),
+                                             range(cfg.run_params['total_sequences_num'])))
+
+        # The pairs were saved sorted and non-redundant -> use them as they are
+        cfg.pairs_index1 = pairs_index1
+        cfg.pairs_index2 = pairs_index2
+        cfg.similarity_values = similarity_values
+        if self.type_of_values == 'att':
+            cfg.attraction_values = cfg.similarity_values
+        sp.reset_sorted_pairs()
+
+        # Groups: add the saved categories and restore the sequences of each group from the group_ID array
+        for category_index in range(len(header['categories'])):
+            category = header['categories'][category_index]
+            if category['name'] == 'Manual definition' or category['name'] == 'manual':
+                category['name'] = 'Manual - from file'
+
+            category_groups = dict()
+            for group in category['groups']:
+                group_ID = group.pop('group_ID')
+                group['seqIDs'] = dict.fromkeys(np.flatnonzero(groups[category_index] == group_ID).tolist(), 1)
+                category_groups[group_ID] = group
+            category['groups'] = category_groups
+
+            cfg.groups_by_categories.append(category)
+            self.is_groups = 1
+
+        # Numeric parameters
+        for param_index in range(len(header['numeric_params'])):
+            param = header['numeric_params'][param_index]
+            self.params_dict[param['name']] = {'min_color': param['min_color'], 'max_color': param['max_color'],
+                                               'min_val': param['min_val'], 'max_val': param['max_val'],
+                                               'values': numeric_params[param_index]}
+            self.is_seq_params = 1
+
+        # Taxonomy
+        for tax_level in header['taxonomy']:
+            cfg.seq_by_tax_level_dict[tax_level] = dict()
+            for name in header['taxonomy'][tax_level]:
+                cfg.seq_by_tax_level_dict[tax_level][name] = dict.fromkeys(header['taxonomy'][tax_level][name], 1)
+
+        if self.type_of_values not in ('hsp', 'att'):
+            self.file_is_valid = 0
+            self.error = "The binary CLANS project " + self.file_name + " is inconsistent:\n"
+            self.error += "Unknown type of values: " + str(self.type_of_values)
+            print(self.error)
+
+    def create_sequences_array(self):
+        cfg.sequences_array = self.sequences_array
+
+    # Save the full session (including the groups of all the categories, the metadata and the taxonomy)
+    # as a binary CLANS project
+    def write_file(self, file_path):
+        os.makedirs(file_path, exist_ok=True)
+
+        header = dict()
+        header['format_version'] = format_version
+        header['sequences'] = cfg.run_params['total_sequences_num']
+        header['type_of_values'] = cfg.run_params['type_of_values']
+        self.get_params()
+        header['params'] = self.params
+
+        # Groups: the settings of each category and group are saved in the header,
+        # the group_ID of each sequence is saved in the groups array
+        header['categories'] = []
+        groups = []
+        for category in cfg.groups_by_categories:
+            if len(category['groups']) == 0:
+                continue
+
+            category_settings = {k: v for k, v in category.items() if k not in ('groups', 'sequences')}
+            category_settings['groups'] = []
+            sequences = np.full(cfg.run_params['total_sequences_num'], -1, dtype=np.int32)
+
+            for group_ID in category['groups']:
+                group_settings = {k: v for k, v in category['groups'][group_ID].items() if k != 'seqIDs'}
+                group_settings['group_ID'] = group_ID
+                category_settings['groups'].append(group_settings)
+                sequences[list(category['groups'][group_ID]['seqIDs'])] = group_ID
+
+            header['categories'].append(category_settings)
+            groups.append(sequences)
+
+        header['numeric_params'] = []
+        numeric_params = []
+        for param in cfg.sequences_numeric_params:
+            header['numeric_params'].append({
+                'name': param,
+                'min_color': ";".join([str(c) for c in cfg.sequences_numeric_params[param]['min_color'].RGBA[0].tolist()]),
+                'max_color': ";".join([str(c) for c in cfg.sequences_numeric_params[param]['max_color'].RGBA[0].tolist()]),
+                'min_val': cfg.sequences_numeric_params[param]['min_val'],
+                'max_val': cfg.sequences_numeric_params[param]['max_val']
+            })
+            numeric_params.append(cfg.sequences_numeric_params[param]['raw'])
+
+        header['taxonomy'] = dict()
+        if cfg.run_params['is_taxonomy_available']:
+            for tax_level in cfg.seq_by_tax_level_dict:
+                header['taxonomy'][tax_level] = {name: list(cfg.seq_by_tax_level_dict[tax_level][name].keys())
+                                                 for name in cfg.seq_by_tax_level_dict[tax_level]}
+
+        # The header of an existing project is removed before its arrays are replaced, and the new header is written
+        # last, so an interrupted writing is not taken as a complete project
+        if os.path.isfile(os.path.join(file_path, header_file)):
+            os.remove(os.path.join(file_path, header_file))
+
+        self.save_array(file_path, "sequences.npy", cfg.sequences_array)
+        self.save_array(file_path, "pairs_index1.npy", np.asarray(cfg.pairs_index1, dtype=np.int64))
+        self.save_array(file_path, "pairs_index2.npy", np.asarray(cfg.pairs_index2, dtype=np.int64))
+        self.save_array(file_path, "similarity_values.npy", np.asarray(cfg.similarity_values, dtype=float))
+        self.save_array(file_path, "groups.npy",
+                        np.array(groups, dtype=np.int32).reshape(-1, cfg.run_params['total_sequences_num']))
+        self.save_array(file_path, "numeric_params.npy",
+                        np.array(numeric_params, dtype=float).reshape(-1, cfg.run_params['total_sequences_num']))
+
+        temp_file_path = os.path.join(file_path, header_file + ".tmp")
+        with open(temp_file_path, "w") as outfile:
+            json.dump(header, outfile, indent=1, default=json_value)
+        os.replace(temp_file_path, os.path.join(file_path, header_file))
+
+    # Each array is first written under a temporary name and then renamed: the previous file may still be
+    # memory-mapped (when saving to the directory the project was loaded from)
+    def save_array(self, file_path, array_file, array):
+        temp_file_path = os.path.join(file_path, array_file + ".tmp")
+        with open(temp_file_path, "wb") as outfile:
+            np.save(outfile, array)
+        os.replace(temp_file_path, os.path.join(file_path, array_file))
+
+
+# Convert NumPy values (found in the groups / parameters settings) to JSON values
+def json_value(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
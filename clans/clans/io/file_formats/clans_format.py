@@ -1,10 +1,15 @@
 import re
 import os
+import collections
+import itertools
 import numpy as np
 import clans.config as cfg
 import clans.clans.data.sequences as seq
 import clans.clans.data.sequence_pairs as sp
 
+# The number of lines which are read and parsed at once in the <pos>, <hsp> and <att> blocks
+block_chunk_size = 200000
+
 
 class ClansFormat:
 
@@ -18,6 +23,7 @@ class ClansFormat:
         self.file_name = ""
         self.params = dict()
         self.params_dict = dict()
+        self.pending_lines = collections.deque()
 
     def read_file(self, file_path):
 
@@ -26,14 +32,14 @@ class ClansFormat:
         in_seqgroups_block = 0
         in_seqparams_block = 0
         in_tax_block = 0
-        in_pos_block = 0
-        in_hsp_block = 0
-        in_att_block = 0
         found_seq_block = 0
         found_pos_block = 0
         found_hsp_block = 0
         found_att_block = 0
         level = ""
+        pairs_index1 = []
+        pairs_index2 = []
+        pairs_values = []
 
         self.file_name = os.path.basename(file_path)
 
@@ -57,15 +63,9 @@ class ClansFormat:
                 self.error += "The first line in the clans file must be: \'sequences=<number of sequences>\'"
                 return
 
-            # Create a 2D Numpy array for the similarity values and initialize it with 100
-            cfg.similarity_values_mtx = np.full([cfg.run_params['total_sequences_num'],
-                                                 cfg.run_params['total_sequences_num']], 100, dtype=float)
-            cfg.attraction_values_mtx = np.zeros([cfg.run_params['total_sequences_num'],
-                                                  cfg.run_params['total_sequences_num']])
-
             # A loop over the rest of the lines
             seq_index = 0
-            for line in infile:
+            for line in self.read_lines(infile):
                 if line.strip() == "<param>":
                     in_param_block = 1
                 elif in_param_block:
@@ -273,100 +273,44 @@ class ClansFormat:
                                         cfg.seq_by_tax_level_dict[tax_level][name][int(num)] = 1
 
                 elif line.strip() == "<pos>":
-                    in_pos_block = 1
                     found_pos_block = 1
-                elif in_pos_block:
-                    if line.strip() == "</pos>":
-                        in_pos_block = 0
-                    else:
-
-                        # If there was no <seq> lock, probably it's the minimal-clans format -> print an error
-                        if found_seq_block == 0:
-                            self.file_is_valid = 0
-                            self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
-                            self.error += "The full CLANS format must contain a sequences block (<seq>)\n" \
-                                          "including the original sequences in FASTA format\n" \
-                                          "Alternatively, load a file in 'minimal-clans' format"
-                            break
-
-                        m = re.search(r"^(\d+)\s+(\S+)\s+(\S+)\s+(\S+)", line.strip())
-                        if m:
-                            index = int(m.group(1))
-                            x_coor = m.group(2)
-                            y_coor = m.group(3)
-                            z_coor = m.group(4)
+                    block_lines_num, block_arrays = self.read_block(infile, "pos")
+
+                    # If there was no <seq> lock, probably it's the minimal-clans format -> print an error
+                    if found_seq_block == 0 and block_lines_num > 0:
+                        self.file_is_valid = 0
+                        self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
+                        self.error += "The full CLANS format must contain a sequences block (<seq>)\n" \
+                                      "including the original sequences in FASTA format\n" \
+                                      "Alternatively, load a file in 'minimal-clans' format"
+                        break
+
+                    for (indices, x_coor, y_coor, z_coor) in block_arrays:
+                        for index, x, y, z in zip(indices.tolist(), x_coor.tolist(), y_coor.tolist(),
+                                                  z_coor.tolist()):
                             # Create a tuple with the coordinates information + initialization for the 'in_group'
                             # and 'in_subset' fields
-                            coor_tuple = (x_coor, y_coor, z_coor, False, x_coor, y_coor, z_coor)
+                            coor_tuple = (x, y, z, False, x, y, z)
                             self.sequences_list[index] += coor_tuple
-                        else:
-                            self.file_is_valid = 0
-                            self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
-                            self.error += "The coordinates (<pos> block) cannot be read. The correct format is:\n" \
-                                         "<sequence index> <coor_x> <coor_y> <coor_z>"
-                            break
-
-                elif line.strip() == "<hsp>":
-                    in_hsp_block = 1
-                    found_hsp_block = 1
-                elif in_hsp_block == 1:
-                    if line.strip() == "</hsp>":
-                        in_hsp_block = 0
-                    else:
-                        m = re.search(r"^(\d+)\s+(\d+):(\S+)", line.strip())
-                        if m:
-                            index1 = int(m.group(1))
-                            index2 = int(m.group(2))
-                            evalue = m.group(3)
 
-                            if index1 < index2:
+                    if not self.file_is_valid:
+                        break
 
-                                # Assign the Evalue to the pair + reciprocal pair
-                                if float(evalue) == 0.0:
-                                    cfg.similarity_values_mtx[index1][index2] = 10 ** -180
-                                    cfg.similarity_values_mtx[index2][index1] = 10 ** -180
-                                else:
-                                    cfg.similarity_values_mtx[index1][index2] = evalue
-                                    cfg.similarity_values_mtx[index2][index1] = evalue
-
-                                pair_tuple = (index1, index2, evalue)
-                                cfg.similarity_values_list.append(pair_tuple)
-                        else:
-                            self.file_is_valid = 0
-                            self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
-                            self.error += "The HSPs cannot be read. The correct format is:\n" \
-                                         "<sequence1 index> <sequence2 index>: <E-value>"
-                            break
-
-                elif line.strip() == "<att>":
-                    in_att_block = 1
-                    found_att_block = 1
-                elif in_att_block == 1:
-                    if line.strip() == "</att>":
-                        in_att_block = 0
+                elif line.strip() == "<hsp>" or line.strip() == "<att>":
+                    if line.strip() == "<hsp>":
+                        found_hsp_block = 1
+                        block_lines_num, block_arrays = self.read_block(infile, "hsp")
                     else:
-                        m = re.search(r"^(\d+)\s+(\d+)\s+(\S+)", line.strip())
-                        if m:
-                            index1 = int(m.group(1))
-                            index2 = int(m.group(2))
-                            att = m.group(3)
-                            # Assign the attraction value to the pair + reciprocal pair
-                            if 0.0 <= float(att) <= 1.0:
-                                cfg.attraction_values_mtx[index1][index2] = att
-                                cfg.attraction_values_mtx[index2][index1] = att
-                            else:
-                                self.file_is_valid = 0
-                                self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
-                                self.error += "Attraction values must be numbers between 0 and 1"
-                                break
-                            pair_tuple = (index1, index2, att)
-                            cfg.similarity_values_list.append(pair_tuple)
-                        else:
-                            self.file_is_valid = 0
-                            self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
-                            self.error += "The attraction values cannot be read. The correct format is:\n" \
-                                         "<sequence1 index> <sequence2 index>: <attraction value>"
-                            break
+                        found_att_block = 1
+                        block_lines_num, block_arrays = self.read_block(infile, "att")
+
+                    for (indices1, indices2, values) in block_arrays:
+                        pairs_index1.append(indices1)
+                        pairs_index2.append(indices2)
+                        pairs_values.append(values)
+
+                    if not self.file_is_valid:
+                        break
 
         # Check whether there is either <hsp> block or <att>
         if self.file_is_valid:
@@ -397,12 +341,202 @@ class ClansFormat:
                     self.error += "The clans file must contain either HSPs (in <hsp> block) or attraction values " \
                                  "(in <att> block)"
 
-        else:
+        # Save the pairs of sequences and their values in the sparse similarity arrays
+        if self.file_is_valid:
+            pairs_index1 = np.concatenate(pairs_index1) if len(pairs_index1) > 0 else np.zeros(0, dtype=int)
+            pairs_index2 = np.concatenate(pairs_index2) if len(pairs_index2) > 0 else np.zeros(0, dtype=int)
+            pairs_values = np.concatenate(pairs_values) if len(pairs_values) > 0 else np.zeros(0)
+
+            if len(pairs_index1) > 0 and max(np.amax(pairs_index1), np.amax(pairs_index2)) >= \
+                    cfg.run_params['total_sequences_num']:
+                self.file_is_valid = 0
+                self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
+                self.error += "The sequence indices in the <" + self.type_of_values + "> block must be smaller " \
+                              "than the number of sequences"
+            else:
+                sp.set_similarity_values(pairs_index1, pairs_index2, pairs_values, self.type_of_values)
+
+        if not self.file_is_valid:
             print(self.error)
 
-    def fill_values(self):
-        # Create the structured NumPy array of sequences
+    # Iterate over the lines of the file, including lines that were read ahead by read_block but are not part of
+    # the block (they are returned before continuing with the file)
+    def read_lines(self, infile):
+        for line in infile:
+            yield line
+            while len(self.pending_lines) > 0:
+                yield self.pending_lines.popleft()
+
+    def read_lines_chunk(self, infile):
+        if len(self.pending_lines) > 0:
+            lines = list(self.pending_lines)
+            self.pending_lines.clear()
+        else:
+            lines = list(itertools.islice(infile, block_chunk_size))
+        return lines
+
+    # Read a <pos>, <hsp> or <att> block in chunks of lines. The end of the block is found once per chunk
+    # (only the closing tag or an invalid line can contain the '<' character) and the lines of each chunk are parsed
+    # together into NumPy arrays. Returns the number of lines in the block and the list of the parsed chunks.
+    def read_block(self, infile, block):
+        end_tag = "</" + block + ">"
+        block_arrays = []
+        block_lines_num = 0
+        is_block_end = 0
+
+        while not is_block_end:
+            lines = self.read_lines_chunk(infile)
+            if len(lines) == 0:
+                break
+
+            text = "".join(lines)
+            tag_pos = text.find("<")
+            if tag_pos != -1:
+                tag_line_num = text.count("\n", 0, tag_pos)
+                if lines[tag_line_num].strip() == end_tag:
+                    is_block_end = 1
+                    # Keep the lines which follow the block for the main loop
+                    self.pending_lines.extendleft(reversed(lines[tag_line_num + 1:]))
+                    lines = lines[:tag_line_num]
+                    text = text[:text.rfind("\n", 0, tag_pos) + 1]
+
+            if len(lines) == 0:
+                continue
+            block_lines_num += len(lines)
+
+            arrays = self.parse_block(text, len(lines), block)
+            if arrays is None:
+                arrays = self.parse_block_lines(lines, block)
+            if arrays is not None:
+                block_arrays.append(arrays)
+            if not self.file_is_valid:
+                break
+
+        return block_lines_num, block_arrays
+
+    # Parse the lines of a block in bulk: split the whole text at once and convert each column to a NumPy array.
+    # Returns None if the lines do not have the expected format (they are then parsed line by line by
+    # parse_block_lines, which finds the invalid line)
+    def parse_block(self, text, lines_num, block):
+
+        if block == "hsp":
+            # <sequence1 index> <sequence2 index>:<E-value> (without white spaces around the colon)
+            for separator in (" :", "\t:", ": ", ":\t", ":\n", ":\r"):
+                if separator in text:
+                    return None
+            fields = text.replace(":", " : ").split()
+            if len(fields) != 4 * lines_num or fields[2::4].count(":") != lines_num:
+                return None
+            columns = (fields[0::4], fields[1::4], fields[3::4])
+        elif block == "att":
+            # <sequence1 index> <sequence2 index> <attraction value>
+            fields = text.split()
+            if len(fields) != 3 * lines_num:
+                return None
+            columns = (fields[0::3], fields[1::3], fields[2::3])
+        else:
+            # <sequence index> <coor_x> <coor_y> <coor_z>
+            fields = text.split()
+            if len(fields) != 4 * lines_num:
+                return None
+            columns = (fields[0::4], fields[1::4], fields[2::4], fields[3::4])
+
+        try:
+            indices1 = np.array(columns[0], dtype=np.int64)
+            if block == "pos":
+                if np.any(indices1 < 0):
+                    return None
+                return indices1, np.array(columns[1], dtype=float), np.array(columns[2], dtype=float), \
+                    np.array(columns[3], dtype=float)
+
+            indices2 = np.array(columns[1], dtype=np.int64)
+            if np.any(indices1 < 0) or np.any(indices2 < 0):
+                return None
+
+            if block == "hsp":
+                # Take each pair only once (the E-values of the other lines are not converted at all)
+                is_pair = indices1 < indices2
+                values = np.array(columns[2], dtype=object)[is_pair].astype(float)
+                return indices1[is_pair], indices2[is_pair], values
+
+            values = np.array(columns[2], dtype=float)
+        except ValueError:
+            return None
+
+        # Attraction values which are not between 0 and 1 are reported by parse_block_lines
+        if not np.all((values >= 0.0) & (values <= 1.0)):
+            return None
+        return indices1, indices2, values
+
+    # Parse the lines of a block one by one (used only for chunks which cannot be parsed in bulk).
+    # Stops at the first invalid line and returns the values of the lines before it.
+    def parse_block_lines(self, lines, block):
+        indices1 = []
+        indices2 = []
+        values = []
+
+        for line in lines:
+            if block == "pos":
+                m = re.search(r"^(\d+)\s+(\S+)\s+(\S+)\s+(\S+)", line.strip())
+                if m:
+                    indices1.append(int(m.group(1)))
+                    values.append((float(m.group(2)), float(m.group(3)), float(m.group(4))))
+                else:
+                    self.file_is_valid = 0
+                    self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
+                    self.error += "The coordinates (<pos> block) cannot be read. The correct format is:\n" \
+                                  "<sequence index> <coor_x> <coor_y> <coor_z>"
+                    break
+
+            elif block == "hsp":
+                m = re.search(r"^(\d+)\s+(\d+):(\S+)", line.strip())
+                if m:
+                    index1 = int(m.group(1))
+                    index2 = int(m.group(2))
+                    evalue = m.group(3)
+
+                    if index1 < index2:
+                        indices1.append(index1)
+                        indices2.append(index2)
+                        values.append(float(evalue))
+                else:
+                    self.file_is_valid = 0
+                    self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
+                    self.error += "The HSPs cannot be read. The correct format is:\n" \
+                                  "<sequence1 index> <sequence2 index>: <E-value>"
+                    break
+
+            else:
+                m = re.search(r"^(\d+)\s+(\d+)\s+(\S+)", line.strip())
+                if m:
+                    att = float(m.group(3))
+                    if 0.0 <= att <= 1.0:
+                        indices1.append(int(m.group(1)))
+                        indices2.append(int(m.group(2)))
+                        values.append(att)
+                    else:
+                        self.file_is_valid = 0
+                        self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
+                        self.error += "Attraction values must be numbers between 0 and 1"
+                        break
+                else:
+                    self.file_is_valid = 0
+                    self.error = "The file " + self.file_name + " has invalid CLANS format:\n"
+                    self.error += "The attraction values cannot be read. The correct format is:\n" \
+                                  "<sequence1 index> <sequence2 index>: <attraction value>"
+                    break
+
+        if block == "pos":
+            coor = np.array(values, dtype=float).reshape(-1, 3)
+            return np.array(indices1, dtype=np.int64), coor[:, 0], coor[:, 1], coor[:, 2]
+        return np.array(indices1, dtype=np.int64), np.array(indices2, dtype=np.int64), np.array(values, dtype=float)
+
+    # Create the structured NumPy array of sequences
+    def create_sequences_array(self):
         seq.create_sequences_array(self.sequences_list)
+
+    def fill_values(self):
+        self.create_sequences_array()
         seq.init_groups_by_categories()
 
         # Update the default nodes_size
@@ -429,11 +563,11 @@ class ClansFormat:
         if self.is_groups:
             for category_index in range(len(cfg.groups_by_categories)):
                 cfg.groups_by_categories[category_index]['sequences'] = np.full(cfg.run_params['total_sequences_num'],
-                                                                                -1)
+                                                                                -1, dtype=np.int32)
                 for group_ID in cfg.groups_by_categories[category_index]['groups']:
-                    for seq_num in cfg.groups_by_categories[category_index]['groups'][group_ID]['seqIDs']:
-                        seq_index = int(seq_num)
-                        cfg.groups_by_categories[category_index]['sequences'][seq_index] = group_ID
+                    seq_indices = np.fromiter(cfg.groups_by_categories[category_index]['groups'][group_ID]['seqIDs'],
+                                              dtype=np.int64)
+                    cfg.groups_by_categories[category_index]['sequences'][seq_indices] = group_ID
 
                 # Add defaults for the category parameters (in case they are not written in the clans file)
                 if 'nodes_size' not in cfg.groups_by_categories[category_index]:
@@ -461,6 +595,8 @@ class ClansFormat:
         # If parameters were defined in the file - save them in the 'run_params' dict
         if 'rounds_done' in self.params:
             cfg.run_params['rounds_done'] = int(self.params['rounds_done'])
+        if 'energy' in self.params:
+            cfg.run_params['energy'] = float(self.params['energy'])
         if 'cluster2d' in self.params:
             if self.params['cluster2d'] == 'true':
                 cfg.run_params['dimensions_num_for_clustering'] = 2
@@ -528,9 +664,6 @@ class ClansFormat:
         seq_block = ""
         pos_block = ""
 
-        # Sort the connection pairs
-        cfg.similarity_values_list = sorted(cfg.similarity_values_list)
-
         output = open(file_path, "w")
         output.write('sequences=' + str(cfg.run_params['total_sequences_num']) + '\n')
 
@@ -538,6 +671,8 @@ class ClansFormat:
         if is_param:
             output.write('<param>\n')
             output.write('rounds_done='+str(cfg.run_params['rounds_done'])+'\n')
+            if 'energy' in cfg.run_params:
+                output.write('energy=' + str(cfg.run_params['energy']) + '\n')
             if cfg.run_params['dimensions_num_for_clustering'] == 2:
                 output.write('cluster2d=true\n')
             else:
@@ -585,66 +720,56 @@ class ClansFormat:
         output.write(pos_block)
         output.write('</pos>\n')
 
-        # Write the HSPs (<hsp>) block
-        if cfg.run_params['type_of_values'] == 'hsp':
-            output.write('<hsp>\n')
-            for i in range(len(cfg.similarity_values_list)):
-                index1 = cfg.similarity_values_list[i][0]
-                index2 = cfg.similarity_values_list[i][1]
-                eval = cfg.similarity_values_list[i][2]
-                pair_str = str(index1) + " " + str(index2) + ":" + str(eval) + "\n"
-                output.write(pair_str)
-            output.write('</hsp>')
-        # Write the attraction values (<att>) block
-        elif cfg.run_params['type_of_values'] == 'att':
-            output.write('<att>\n')
-            for i in range(len(cfg.similarity_values_list)):
-                index1 = cfg.similarity_values_list[i][0]
-                index2 = cfg.similarity_values_list[i][1]
-                att = cfg.similarity_values_list[i][2]
-                pair_str = str(index1) + " " + str(index2) + " " + str(att) + "\n"
-                output.write(pair_str)
-            output.write('</att>')
+        self.write_similarity_values(output)
 
         output.close()
 
+    # Fill the parameters of the full session (as written in the parameters block) in the params dict.
+    # Returns the list of the parameters names (by the writing order)
+    def get_params(self):
+        self.params = dict()
+
+        self.params['rounds_done'] = str(cfg.run_params['rounds_done'])
+        if 'energy' in cfg.run_params:
+            self.params['energy'] = str(cfg.run_params['energy'])
+        if cfg.run_params['dimensions_num_for_clustering'] == 2:
+            self.params['cluster2d'] = 'true'
+        else:
+            self.params['cluster2d'] = 'false'
+        self.params['pval'] = str(cfg.run_params['similarity_cutoff'])
+        self.params['attfactor'] = str(cfg.run_params['att_val'])
+        self.params['attvalpow'] = str(cfg.run_params['att_exp'])
+        self.params['repfactor'] = str(cfg.run_params['rep_val'])
+        self.params['repvalpow'] = str(cfg.run_params['rep_exp'])
+        self.params['cooling'] = str(cfg.run_params['cooling'])
+        if 'current_temp' in cfg.run_params and cfg.run_params['cooling'] < 1:
+            self.params['currcool'] = str(cfg.run_params['current_temp'])
+        self.params['dampening'] = str(cfg.run_params['dampening'])
+        self.params['maxmove'] = str(cfg.run_params['maxmove'])
+        self.params['minattract'] = str(cfg.run_params['gravity'])
+        self.params['nodes_size'] = str(cfg.run_params['nodes_size'])
+        self.params['nodes_color'] = ';'.join([str(int(c * 255)) for c in cfg.run_params['nodes_color']])
+        self.params['nodes_outline_color'] = ';'.join([str(int(c * 255))
+                                                       for c in cfg.run_params['nodes_outline_color']])
+        self.params['nodes_outline_width'] = str(cfg.run_params['nodes_outline_width'])
+        if cfg.run_params['is_taxonomy_available']:
+            self.params['is_taxonomy_available'] = str(cfg.run_params['is_taxonomy_available'])
+            self.params['found_taxa_number'] = str(cfg.run_params['found_taxa_num'])
+
+        return list(self.params.keys())
+
     # Print the session, including sequences information, metadata and running parameters into a file in CLANS format
     def write_full_file(self, file_path):
         seq_block = ""
         pos_block = ""
 
-        # Sort the connection pairs
-        cfg.similarity_values_list = sorted(cfg.similarity_values_list)
-
         output = open(file_path, "w")
         output.write('sequences=' + str(cfg.run_params['total_sequences_num']) + '\n')
 
         # Write the parameters block
         output.write('<param>\n')
-        output.write('rounds_done=' + str(cfg.run_params['rounds_done']) + '\n')
-        if cfg.run_params['dimensions_num_for_clustering'] == 2:
-            output.write('cluster2d=true\n')
-        else:
-            output.write('cluster2d=false\n')
-        output.write('pval=' + str(cfg.run_params['similarity_cutoff']) + '\n')
-        output.write('attfactor=' + str(cfg.run_params['att_val']) + '\n')
-        output.write('attvalpow=' + str(cfg.run_params['att_exp']) + '\n')
-        output.write('repfactor=' + str(cfg.run_params['rep_val']) + '\n')
-        output.write('repvalpow=' + str(cfg.run_params['rep_exp']) + '\n')
-        output.write('cooling=' + str(cfg.run_params['cooling']) + '\n')
-        if 'current_temp' in cfg.run_params and cfg.run_params['cooling'] < 1:
-            output.write('currcool=' + str(cfg.run_params['current_temp']) + '\n')
-        output.write('dampening=' + str(cfg.run_params['dampening']) + '\n')
-        output.write('maxmove=' + str(cfg.run_params['maxmove']) + '\n')
-        output.write('minattract=' + str(cfg.run_params['gravity']) + '\n')
-        output.write('nodes_size=' + str(cfg.run_params['nodes_size']) + '\n')
-        output.write('nodes_color=' + ';'.join([str(int(c * 255)) for c in cfg.run_params['nodes_color']]) + '\n')
-        output.write('nodes_outline_color=' + ';'.join([str(int(c * 255))
-                                                        for c in cfg.run_params['nodes_outline_color']]) + '\n')
-        output.write('nodes_outline_width=' + str(cfg.run_params['nodes_outline_width']) + '\n')
-        if cfg.run_params['is_taxonomy_available']:
-            output.write('is_taxonomy_available=' + str(cfg.run_params['is_taxonomy_available']) + '\n')
-            output.write('found_taxa_number=' + str(cfg.run_params['found_taxa_num']) + '\n')
+        for param in self.get_params():
+            output.write(param + '=' + self.params[param] + '\n')
         output.write('</param>\n')
 
         # Write the sequences block
@@ -761,26 +886,21 @@ class ClansFormat:
         output.write(pos_block)
         output.write('</pos>\n')
 
-        # Write the HSPs (<hsp>) block
+        self.write_similarity_values(output)
+
+        output.close()
+
+    # Write the HSPs (<hsp>) block or the attraction values (<att>) block (the pairs are already sorted)
+    def write_similarity_values(self, output):
+        pairs = zip(cfg.pairs_index1.tolist(), cfg.pairs_index2.tolist(), cfg.similarity_values.tolist())
+
         if cfg.run_params['type_of_values'] == 'hsp':
             output.write('<hsp>\n')
-            for i in range(len(cfg.similarity_values_list)):
-                index1 = cfg.similarity_values_list[i][0]
-                index2 = cfg.similarity_values_list[i][1]
-                eval = cfg.similarity_values_list[i][2]
-                pair_str = str(index1) + " " + str(index2) + ":" + str(eval) + "\n"
-                output.write(pair_str)
+            output.writelines([str(index1) + " " + str(index2) + ":" + str(evalue) + "\n"
+                               for index1, index2, evalue in pairs])
             output.write('</hsp>')
-        # Write the attraction values (<att>) block
         elif cfg.run_params['type_of_values'] == 'att':
             output.write('<att>\n')
-            for i in range(len(cfg.similarity_values_list)):
-                index1 = cfg.similarity_values_list[i][0]
-                index2 = cfg.similarity_values_list[i][1]
-                att = cfg.similarity_values_list[i][2]
-                pair_str = str(index1) + " " + str(index2) + " " + str(att) + "\n"
-                output.write(pair_str)
+            output.writelines([str(index1) + " " + str(index2) + " " + str(att) + "\n"
+                               for index1, index2, att in pairs])
             output.write('</att>')
-
-        output.close()
-
@@ -21,8 +21,9 @@ class DelimitedFormat:
 
         self.file_name = os.path.basename(file_path)
 
-        similarity_values_list = []
-        connections_dict = {}
+        pairs_index1 = []
+        pairs_index2 = []
+        pairs_values = []
 
         # Verify that the file exists
         if not os.path.isfile(file_path):
@@ -117,55 +118,28 @@ class DelimitedFormat:
 
                     seq_index += 1
 
-                if self.names_indices_dict[id1] < self.names_indices_dict[id2]:
-                    pair_tuple = (self.names_indices_dict[id1], self.names_indices_dict[id2], score)
-                    connection_str = str(self.names_indices_dict[id1]) + ":" + str(self.names_indices_dict[id2])
-                elif self.names_indices_dict[id1] > self.names_indices_dict[id2]:
-                    pair_tuple = (self.names_indices_dict[id2], self.names_indices_dict[id1], score)
-                    connection_str = str(self.names_indices_dict[id2]) + ":" + str(self.names_indices_dict[id1])
-                else:
+                # Ignore self-pairs (pairs that appear more than once are handled when the values are saved)
+                if self.names_indices_dict[id1] == self.names_indices_dict[id2]:
                     continue
 
-                # Verify that the connection appears only once before adding it to the list
-                if connection_str not in connections_dict:
-                    cfg.similarity_values_list.append(pair_tuple)
-                    connections_dict[connection_str] = 1
+                pairs_index1.append(self.names_indices_dict[id1])
+                pairs_index2.append(self.names_indices_dict[id2])
+                pairs_values.append(float(score))
 
         # Get the total number of sequences
         cfg.run_params['total_sequences_num'] = seq_index
         print("Total number of sequences: " + str(cfg.run_params['total_sequences_num']))
 
-        # Create a 2D Numpy array for the similarity values and initialize it with 1
-        cfg.similarity_values_mtx = np.full([cfg.run_params['total_sequences_num'],
-                                                 cfg.run_params['total_sequences_num']], 100, dtype=float)
-        cfg.attraction_values_mtx = np.zeros([cfg.run_params['total_sequences_num'],
-                                                  cfg.run_params['total_sequences_num']])
-
-        # Go over the list of pairs to fill the matrix
-        for pair in cfg.similarity_values_list:
-            index1 = pair[0]
-            index2 = pair[1]
-            score = pair[2]
-
-            # Assign the Evalue to the pair + reciprocal pair
-            # E-values (HSPs)
-            if self.type_of_values == "hsp":
-                if float(score) == 0.0:
-                    cfg.similarity_values_mtx[index1][index2] = 10 ** -180
-                    cfg.similarity_values_mtx[index2][index1] = 10 ** -180
-                else:
-                    cfg.similarity_values_mtx[index1][index2] = score
-                    cfg.similarity_values_mtx[index2][index1] = score
-            # Scores 0.0-1.0 (attraction values)
-            else:
-                if 0.0 <= float(score) <= 1.0:
-                    cfg.attraction_values_mtx[index1][index2] = score
-                    cfg.attraction_values_mtx[index2][index1] = score
-                else:
-                    self.file_is_valid = 0
-                    self.error = "The file " + self.file_name + " has invalid format:\n"
-                    self.error += "Attraction values must be numbers between 0 and 1"
-                    break
+        # Scores 0.0-1.0 (attraction values)
+        if self.type_of_values == "att" and len(pairs_values) > 0 and \
+                (min(pairs_values) < 0.0 or max(pairs_values) > 1.0):
+            self.file_is_valid = 0
+            self.error = "The file " + self.file_name + " has invalid format:\n"
+            self.error += "Attraction values must be numbers between 0 and 1"
+
+        # Save the pairs of sequences and their values in the sparse similarity arrays
+        else:
+            sp.set_similarity_values(pairs_index1, pairs_index2, pairs_values, self.type_of_values)
 
         if self.file_is_valid == 0:
             print(self.error)
@@ -199,17 +173,12 @@ class DelimitedFormat:
 
     def write_file(self, file_path):
 
-        # Sort the connection pairs
-        cfg.similarity_values_list = sorted(cfg.similarity_values_list)
-
         output = open(file_path, "w")
 
         output.write("ID_1\tID_2\tSimilarity_score\tType_of_score\n")
 
-        for i in range(len(cfg.similarity_values_list)):
-            index1 = cfg.similarity_values_list[i][0]
-            index2 = cfg.similarity_values_list[i][1]
-            score = cfg.similarity_values_list[i][2]
+        for index1, index2, score in zip(cfg.pairs_index1.tolist(), cfg.pairs_index2.tolist(),
+                                         cfg.similarity_values.tolist()):
 
             # Create the sequence names for the file (seq_ID up to 15 characters without spaces + seq index)
             m = re.search(r"^(\S+)", cfg.sequences_array[int(index1)]['seq_ID'])
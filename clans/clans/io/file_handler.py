@@ -1,6 +1,7 @@
 import clans.clans.io.file_formats.clans_format as clans
 import clans.clans.io.file_formats.fasta_format as fasta
 import clans.clans.io.file_formats.tab_delimited_format as tab
+import clans.clans.io.file_formats.binary_format as binary
 import clans.config as cfg
 
 
@@ -12,6 +13,8 @@ def read_input_file(file_path, file_format):
         format_object = clans.ClansFormat()
     elif file_format == 'delimited':
         format_object = tab.DelimitedFormat()
+    elif file_format == 'binary':
+        format_object = binary.BinaryFormat()
 
     # Read the input file according to the specified file format
     format_object.read_file(file_path)
@@ -38,6 +41,12 @@ def write_file(file_path, file_format, group_type):
 
         format_object.write_file(file_path, is_param_block, group_type)
 
+    # Binary CLANS project (a directory of NumPy arrays)
+    elif file_format == 'binary':
+        format_object = binary.BinaryFormat()
+
+        format_object.write_file(file_path)
+
     # tab-delimited format
     else:
         format_object = tab.DelimitedFormat()
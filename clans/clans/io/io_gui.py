@@ -2,6 +2,7 @@ from PyQt5.QtCore import QObject, QRunnable, pyqtSignal, pyqtSlot
 import clans.config as cfg
 import clans.clans.io.file_formats.clans_format as clans
 import clans.clans.io.file_formats.tab_delimited_format as tab
+import clans.clans.io.file_formats.binary_format as binary
 import clans.clans.data.sequence_pairs as sp
 import clans.clans.taxonomy.taxonomy as tax
 import time
@@ -19,6 +20,8 @@ class ReadInputWorker(QRunnable):
 
         if format == 'clans':
             self.format_object = clans.ClansFormat()
+        elif format == 'binary':
+            self.format_object = binary.BinaryFormat()
         else:
             self.format_object = tab.DelimitedFormat()
 
@@ -1,5 +1,6 @@
 import argparse
 import os
+import numba
 import clans.config as cfg
 
 
@@ -8,13 +9,16 @@ def parse_arguments():
 
     parser.add_argument("-nogui", help="Run CLANS in command-line mode (for performing BLAST search or clustering "
                                        "large datasets)", action='store_true', default=False)
+    parser.add_argument("-precompile", help="Compile the numba functions of the layout calculation, save them in the "
+                                            "on-disk cache (so later runs do not need to compile them) and exit",
+                        action='store_true', default=False)
 
     parser.add_argument("-load", metavar="network_file_path",
                         help="Load a network file containing at least pairs of sequences and similarity-scores",
                         type=str)
     parser.add_argument("-input_format", metavar="input_file_format",
-                        help="Input file format (clans/delimited. default is 'clans' format)", type=str,
-                        choices=['clans', 'delimited'], default=cfg.input_format)
+                        help="Input file format (clans/delimited/binary. default is 'clans' format)", type=str,
+                        choices=['clans', 'delimited', 'binary'], default=cfg.input_format)
 
     parser.add_argument("-infile", metavar="fasta_file_path", help="a FASTA file input for BLAST search", type=str)
     parser.add_argument("-cores", metavar="number_of_cores",
@@ -31,6 +35,28 @@ def parse_arguments():
     ## Clustering parameters
     parser.add_argument("-dorounds", metavar="rounds", help="Number of clustering rounds to perform (default=0)",
                         type=int, default=0)
+    parser.add_argument("-converge", metavar="movement_threshold",
+                        help="Run the clustering until convergence: stop when the maximal movement of a sequence in "
+                             "a round is below this threshold for a number of successive rounds (see -patience)",
+                        type=float)
+    parser.add_argument("-patience", metavar="rounds",
+                        help="The number of successive rounds below the -converge threshold required to stop "
+                             "(default=" + str(cfg.run_params['convergence_patience']) + ")",
+                        type=int, default=cfg.run_params['convergence_patience'])
+    parser.add_argument("-max_rounds", metavar="rounds",
+                        help="The maximal number of clustering rounds when running until convergence (default="
+                             + str(cfg.run_params['max_rounds']) + ")",
+                        type=int, default=cfg.run_params['max_rounds'])
+    parser.add_argument("-checkpoint", metavar="rounds",
+                        help="Save a checkpoint of the clustering every K rounds (command-line mode only)", type=int,
+                        default=0)
+    parser.add_argument("-checkpoint_time", metavar="seconds",
+                        help="Save a checkpoint of the clustering every T seconds (command-line mode only)",
+                        type=float, default=0)
+    parser.add_argument("-checkpoint_file", metavar="checkpoint_file_path",
+                        help="The checkpoint file (default: <destination_file_path>.checkpoint.npz)", type=str)
+    parser.add_argument("-resume", help="Continue the clustering from the last checkpoint (the same input file and "
+                                        "clustering options must be given)", action='store_true', default=False)
     parser.add_argument("-pval", metavar="similarity_threshold", help="Similarity threshold (default="
                                                                       + str(cfg.similarity_cutoff) + ")", type=float,
                         default=cfg.similarity_cutoff)
@@ -38,10 +64,32 @@ def parse_arguments():
     parser.add_argument("-saveto", metavar="destination_file_path",
                         help="A destination path for saving the output file (in CLANS format, by default)", type=str)
     parser.add_argument("-output_format", metavar="output_file_format",
-                        help="Output file format (clans/delimited. default is 'clans' format)", type=str,
-                        choices=['clans', 'delimited'], default=cfg.output_format)
+                        help="Output file format (clans/delimited/binary. default is 'clans' format)", type=str,
+                        choices=['clans', 'delimited', 'binary'], default=cfg.output_format)
 
     ## Fruchterman-Reingold arguments
+    parser.add_argument("-threads", metavar="number_of_threads",
+                        help="The number of threads to use in the layout calculation (default: all the available "
+                             "cores)", type=int)
+    parser.add_argument("-fps", metavar="frames_per_second",
+                        help="The target redraw rate of the graph during the clustering in the graphical application. "
+                             "The calculation continues between the redraws (0 = redraw after every round, default="
+                             + str(cfg.run_params['frames_per_second']) + ")",
+                        type=float, default=cfg.run_params['frames_per_second'])
+    parser.add_argument("-rounds_per_frame", metavar="rounds",
+                        help="Redraw the graph every K clustering rounds in the graphical application "
+                             "(default: use the -fps redraw rate)", type=int,
+                        default=cfg.run_params['rounds_per_frame'])
+    parser.add_argument("-layout_process", help="Perform the clustering in a separate process in the graphical "
+                                                "application, so the calculation and the display don't slow each "
+                                                "other down (default: use a thread of the application)",
+                        action='store_true', default=False)
+    parser.add_argument("-edges_budget", metavar="connections_number",
+                        help="The maximal number of connections displayed while the graph is rotated or clustered in "
+                             "the graphical application. The connections are sampled according to their attraction "
+                             "values, and all of them are displayed when the view is idle (0 = always display all "
+                             "the connections, default=" + str(cfg.run_params['edges_lod_budget']) + ")",
+                        type=int, default=cfg.run_params['edges_lod_budget'])
     parser.add_argument("-cluster2d", help="Perform the clustering in 2D instead of 3D (default: cluster in 3D)",
                         action='store_true', default=False)
     parser.add_argument("--cooling", help="A multiplier for 'maxmove'. By default, set to 1 which causes the graph "
@@ -79,6 +127,28 @@ def parse_arguments():
                                           ". It scales linearly with the distance from origin (default="
                                           + str(cfg.layouts['FR']['params']['gravity']) + ")",
                         type=float, default=cfg.layouts['FR']['params']['gravity'])
+    parser.add_argument("--barnes_hut", help="Approximate the repulsive forces using the Barnes-Hut algorithm "
+                                             "(a quadtree / octree), which scales as O(N log N) instead of O(N^2). "
+                                             "Recommended for large datasets (default: calculate the exact forces)",
+                        action='store_true', default=cfg.layouts['FR']['params']['is_barnes_hut'])
+    parser.add_argument("--theta", help="The accuracy parameter of the Barnes-Hut approximation: a group of sequences "
+                                        "is treated as one body when (cell width / distance) < theta. Lower values "
+                                        "are more accurate and slower, 0 is exact (default="
+                                        + str(cfg.layouts['FR']['params']['theta']) + ")",
+                        type=float, default=cfg.layouts['FR']['params']['theta'])
+    parser.add_argument("--multilevel", help="Initialize the layout by a multilevel scheme: the graph is coarsened "
+                                             "repeatedly by merging strongly connected pairs of sequences, the "
+                                             "coarsest graph is laid out and the positions are refined level by level."
+                                             " Recommended for very large datasets (default: random initial positions)",
+                        action='store_true', default=cfg.run_params['is_multilevel'])
+    parser.add_argument("--multilevel_rounds", help="The number of layout rounds at each level of the multilevel "
+                                                    "initialization, over which the level is cooled down (default="
+                                                    + str(cfg.run_params['multilevel_rounds']) + ")",
+                        type=int, default=cfg.run_params['multilevel_rounds'])
+    parser.add_argument("--multilevel_temp", help="The starting temperature of each level of the multilevel "
+                                                  "initialization, which is lowered to 1 over the rounds of the level "
+                                                  "(default=" + str(cfg.run_params['multilevel_temp']) + ")",
+                        type=float, default=cfg.run_params['multilevel_temp'])
 
     # Misc parameters
     parser.add_argument("--debug", help="Debug mode: add debug printouts", action='store_true', default=False)
@@ -89,9 +159,10 @@ def parse_arguments():
 
     cfg.run_params['no_gui'] = args.nogui
     cfg.run_params['is_debug_mode'] = args.debug
+    cfg.run_params['precompile'] = args.precompile
 
-    # CMD mode - Check and fill command-line relevant arguments
-    if cfg.run_params['no_gui']:
+    # CMD mode - Check and fill command-line relevant arguments (no input is needed for precompiling)
+    if cfg.run_params['no_gui'] and not cfg.run_params['precompile']:
         if args.infile is not None:
             cfg.run_params['input_file'] = args.infile
             cfg.run_params['input_format'] = 'fasta'
@@ -130,8 +201,25 @@ def parse_arguments():
             cfg.run_params['input_format'] = args.input_format
 
     cfg.run_params['num_of_rounds'] = args.dorounds
-    cfg.run_params['similarity_cutoff'] = args.pval
-    cfg.run_params['num_of_rounds'] = args.dorounds
+    if args.converge is not None:
+        if args.converge <= 0 or args.patience < 1 or args.max_rounds < 1:
+            cfg.run_params['error'] = "Error: The convergence threshold (-converge), the patience (-patience) and " \
+                                      "the maximal number of rounds (-max_rounds) must be positive numbers."
+            return cfg.run_params['error']
+        cfg.run_params['convergence_threshold'] = args.converge
+        cfg.run_params['convergence_patience'] = args.patience
+        cfg.run_params['max_rounds'] = args.max_rounds
+
+    # Checkpoints are used only in command-line mode
+    if cfg.run_params['no_gui'] and (args.checkpoint > 0 or args.checkpoint_time > 0 or args.resume):
+        if args.checkpoint_file is not None:
+            cfg.run_params['checkpoint_file'] = args.checkpoint_file
+        else:
+            cfg.run_params['checkpoint_file'] = cfg.run_params['output_file'] + ".checkpoint.npz"
+        cfg.run_params['checkpoint_rounds'] = args.checkpoint
+        cfg.run_params['checkpoint_seconds'] = args.checkpoint_time
+        cfg.run_params['resume'] = args.resume
+
     cfg.run_params['similarity_cutoff'] = args.pval
     cfg.run_params['cooling'] = args.cooling
     cfg.run_params['maxmove'] = args.maxmove
@@ -141,6 +229,41 @@ def parse_arguments():
     cfg.run_params['rep_exp'] = args.rep_exp
     cfg.run_params['dampening'] = args.dampening
     cfg.run_params['gravity'] = args.gravity
+    cfg.run_params['is_barnes_hut'] = args.barnes_hut
+    if args.threads is not None:
+        if 1 <= args.threads <= numba.config.NUMBA_NUM_THREADS:
+            cfg.run_params['threads_num'] = args.threads
+        else:
+            cfg.run_params['error'] = "Error: The number of threads (-threads) must be between 1 and " + \
+                                      str(numba.config.NUMBA_NUM_THREADS) + " (the number of available cores)."
+            return cfg.run_params['error']
+    if args.fps < 0 or args.rounds_per_frame < 0:
+        cfg.run_params['error'] = "Error: The redraw rate (-fps) and the number of rounds per redraw " \
+                                  "(-rounds_per_frame) must be non-negative numbers."
+        return cfg.run_params['error']
+    cfg.run_params['frames_per_second'] = args.fps
+    cfg.run_params['rounds_per_frame'] = args.rounds_per_frame
+    cfg.run_params['is_layout_process'] = args.layout_process
+    if args.edges_budget < 0:
+        cfg.run_params['error'] = "Error: The number of connections displayed while the view moves (-edges_budget) " \
+                                  "must be a non-negative number."
+        return cfg.run_params['error']
+    cfg.run_params['edges_lod_budget'] = args.edges_budget
+    if args.theta < 0:
+        cfg.run_params['error'] = "Error: The Barnes-Hut theta parameter (--theta) must be a non-negative number."
+        return cfg.run_params['error']
+    cfg.run_params['theta'] = args.theta
+    if args.multilevel_rounds < 0:
+        cfg.run_params['error'] = "Error: The number of rounds at each level (--multilevel_rounds) must be a " \
+                                  "non-negative number."
+        return cfg.run_params['error']
+    if args.multilevel_temp < 1:
+        cfg.run_params['error'] = "Error: The starting temperature of the multilevel initialization " \
+                                  "(--multilevel_temp) must be at least 1."
+        return cfg.run_params['error']
+    cfg.run_params['is_multilevel'] = args.multilevel
+    cfg.run_params['multilevel_rounds'] = args.multilevel_rounds
+    cfg.run_params['multilevel_temp'] = args.multilevel_temp
     if args.cluster2d:
         cfg.run_params['dimensions_num_for_clustering'] = 2
     else:
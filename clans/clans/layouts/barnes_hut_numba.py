@@ -0,0 +1,215 @@
+import numpy as np
+import numba
+
+# Tree-building defaults: the maximal number of sequences held by a leaf and the maximal depth of the tree
+# (the depth limit prevents endless splitting of identical / nearly identical coordinates)
+leaf_size = 8
+max_depth = 32
+
+
+# Build a quadtree (2D) or an octree (3D) over the coordinates.
+# The tree is kept in flat arrays: each node holds a range [start, end) in the 'order' array (the sequences indices
+# sorted by the tree cells), its geometric center and half-width, its mass (number of sequences),
+# its center of mass and the indices of its children (-1 = no child).
+@numba.njit(cache=True)
+def build_tree(coor, n_dims, leaf_size, max_depth):
+    n_sequences = coor.shape[0]
+    n_children = 2 ** n_dims
+
+    order = np.arange(n_sequences)
+    codes = np.zeros(n_sequences, dtype=np.int64)
+    temp_order = np.zeros(n_sequences, dtype=np.int64)
+
+    capacity = max(64, 2 * n_sequences)
+    node_start = np.zeros(capacity, dtype=np.int64)
+    node_end = np.zeros(capacity, dtype=np.int64)
+    node_depth = np.zeros(capacity, dtype=np.int64)
+    node_center = np.zeros((capacity, n_dims))
+    node_half = np.zeros(capacity)
+    node_mass = np.zeros(capacity)
+    node_com = np.zeros((capacity, n_dims))
+    node_children = np.full((capacity, n_children), -1, dtype=np.int64)
+
+    # The root cell is a square / cube bounding all the sequences
+    half = 0.0
+    for dim in range(n_dims):
+        min_coor = np.amin(coor[:, dim])
+        max_coor = np.amax(coor[:, dim])
+        node_center[0, dim] = (min_coor + max_coor) / 2
+        if (max_coor - min_coor) / 2 > half:
+            half = (max_coor - min_coor) / 2
+    node_half[0] = half * 1.000001 + 1e-9
+    node_start[0] = 0
+    node_end[0] = n_sequences
+    n_nodes = 1
+
+    stack = np.zeros(max_depth * n_children + 1, dtype=np.int64)
+    stack[0] = 0
+    stack_size = 1
+
+    while stack_size > 0:
+        stack_size -= 1
+        node = stack[stack_size]
+        start = node_start[node]
+        end = node_end[node]
+
+        # Calculate the mass and the center of mass of the node
+        for k in range(start, end):
+            for dim in range(n_dims):
+                node_com[node, dim] += coor[order[k], dim]
+        node_mass[node] = end - start
+        for dim in range(n_dims):
+            node_com[node, dim] /= end - start
+
+        # Leaf node - do not split further
+        if end - start <= leaf_size or node_depth[node] >= max_depth:
+            continue
+
+        # Make sure there is enough room for all the children of the node
+        if n_nodes + n_children > capacity:
+            capacity *= 2
+            node_start = _grow_1d(node_start, capacity)
+            node_end = _grow_1d(node_end, capacity)
+            node_depth = _grow_1d(node_depth, capacity)
+            node_half = _grow_1d(node_half, capacity)
+            node_mass = _grow_1d(node_mass, capacity)
+            node_center = _grow_2d(node_center, capacity, 0.0)
+            node_com = _grow_2d(node_com, capacity, 0.0)
+            node_children = _grow_2d(node_children, capacity, -1)
+
+        # Find the child cell of each sequence in the node and sort the node's range by cells (counting sort)
+        counts = np.zeros(n_children, dtype=np.int64)
+        for k in range(start, end):
+            code = 0
+            for dim in range(n_dims):
+                if coor[order[k], dim] >= node_center[node, dim]:
+                    code += 2 ** dim
+            codes[k] = code
+            counts[code] += 1
+
+        offsets = np.zeros(n_children, dtype=np.int64)
+        offset = start
+        for c in range(n_children):
+            offsets[c] = offset
+            offset += counts[c]
+        for k in range(start, end):
+            temp_order[offsets[codes[k]]] = order[k]
+            offsets[codes[k]] += 1
+        for k in range(start, end):
+            order[k] = temp_order[k]
+
+        # Create the non-empty children
+        child_start = start
+        for c in range(n_children):
+            if counts[c] > 0:
+                child = n_nodes
+                n_nodes += 1
+                node_start[child] = child_start
+                node_end[child] = child_start + counts[c]
+                node_depth[child] = node_depth[node] + 1
+                node_half[child] = node_half[node] / 2
+                for dim in range(n_dims):
+                    if (c >> dim) & 1:
+                        node_center[child, dim] = node_center[node, dim] + node_half[child]
+                    else:
+                        node_center[child, dim] = node_center[node, dim] - node_half[child]
+                node_children[node, c] = child
+
+                stack[stack_size] = child
+                stack_size += 1
+            child_start += counts[c]
+
+    return order, node_start[:n_nodes], node_end[:n_nodes], node_center[:n_nodes], node_half[:n_nodes], \
+        node_mass[:n_nodes], node_com[:n_nodes], node_children[:n_nodes]
+
+
+@numba.njit(cache=True)
+def _grow_1d(array, capacity):
+    new_array = np.zeros(capacity, dtype=array.dtype)
+    new_array[:array.shape[0]] = array
+    return new_array
+
+
+@numba.njit(cache=True)
+def _grow_2d(array, capacity, fill_value):
+    new_array = np.full((capacity, array.shape[1]), fill_value, dtype=array.dtype)
+    new_array[:array.shape[0]] = array
+    return new_array
+
+
+# Calculate the repulsive movement of each sequence using the Barnes-Hut approximation:
+# a tree cell which is far enough from the sequence (cell_width / distance < theta) is treated as one body
+# with the cell's mass located at its center of mass. Closer cells are opened, and within leaves the
+# repulsion is calculated exactly (the same as in calculate_pair_forces).
+# Each sequence only updates its own movement, so the sequences are processed in parallel.
+@numba.njit(parallel=True, cache=True)
+def calculate_repulsive_forces(coor, movement, n_dims, rep_val, rep_exp, theta, order, node_start, node_end,
+                               node_center, node_half, node_mass, node_com, node_children):
+    n_sequences = coor.shape[0]
+    n_children = node_children.shape[1]
+    stack_capacity = max_depth * n_children + 1
+
+    for i in numba.prange(n_sequences):
+        stack = np.zeros(stack_capacity, dtype=np.int64)
+        seq_movement = np.zeros(n_dims)
+        stack[0] = 0
+        stack_size = 1
+
+        while stack_size > 0:
+            stack_size -= 1
+            node = stack[stack_size]
+
+            # Check whether the sequence itself is located inside the cell (such a cell is always opened)
+            is_inside = True
+            euclidean_dist = 0.0
+            for dim in range(n_dims):
+                if abs(coor[i, dim] - node_center[node, dim]) > node_half[node]:
+                    is_inside = False
+                euclidean_dist += (coor[i, dim] - node_com[node, dim]) ** 2
+            euclidean_dist = euclidean_dist ** 0.5
+
+            # The cell is far enough -> approximate it by its center of mass
+            if not is_inside and euclidean_dist > 0 and 2 * node_half[node] / euclidean_dist < theta:
+                rep_force = node_mass[node] * rep_val / (euclidean_dist ** rep_exp)
+                for dim in range(n_dims):
+                    seq_movement[dim] += (coor[i, dim] - node_com[node, dim]) / euclidean_dist * rep_force
+
+            # A leaf -> calculate the exact repulsion from each one of its sequences
+            elif _is_leaf(node_children, node):
+                for k in range(node_start[node], node_end[node]):
+                    j = order[k]
+                    if j == i:
+                        continue
+                    pair_dist = 0.0
+                    for dim in range(n_dims):
+                        pair_dist += (coor[i, dim] - coor[j, dim]) ** 2
+                    if pair_dist == 0:
+                        pair_dist = 0.000001
+                    else:
+                        pair_dist = pair_dist ** 0.5
+                    rep_force = rep_val / (pair_dist ** rep_exp)
+                    for dim in range(n_dims):
+                        seq_movement[dim] += (coor[i, dim] - coor[j, dim]) / pair_dist * rep_force
+
+            # Open the cell
+            else:
+                for c in range(n_children):
+                    if node_children[node, c] != -1:
+                        stack[stack_size] = node_children[node, c]
+                        stack_size += 1
+
+        for dim in range(n_dims):
+            movement[i, dim] += seq_movement[dim]
+
+
+@numba.njit(cache=True)
+def _is_leaf(node_children, node):
+    for c in range(node_children.shape[1]):
+        if node_children[node, c] != -1:
+            return False
+    return True
+
+
+def calculate_repulsive_movement(coor, movement, n_dims, rep_val, rep_exp, theta):
+    tree = build_tree(coor, n_dims, leaf_size, max_depth)
+    calculate_repulsive_forces(coor, movement, n_dims, rep_val, rep_exp, theta, *tree)
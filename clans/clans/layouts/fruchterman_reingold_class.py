@@ -1,11 +1,31 @@
+import os
 import numpy as np
+import numba
 import clans.config as cfg
 import clans.clans.layouts.fruchterman_reingold_numba as frn
+import clans.clans.layouts.barnes_hut_numba as bh
+
+
+# Build a CSR index of the connections of each sequence: the connections of sequence i are at positions
+# connections_ptr[i]:connections_ptr[i+1] of the returned arrays of connected sequences and attraction values.
+# Each connection is listed for both of its sequences, in the order of the connections list
+def build_connections_index(connected_sequences_list, att_values_list, seq_num):
+    endpoints = connected_sequences_list.ravel()
+    order = np.argsort(endpoints, kind='stable')
+
+    # The other sequence of each endpoint (the pairs are flattened as i0, j0, i1, j1...)
+    other_endpoints = connected_sequences_list[:, ::-1].ravel()
+
+    connections_ptr = np.zeros(seq_num + 1, dtype=np.int64)
+    connections_ptr[1:] = np.cumsum(np.bincount(endpoints, minlength=seq_num))
+
+    return connections_ptr, other_endpoints[order], np.repeat(att_values_list, 2)[order]
 
 
 class FruchtermanReingold:
 
-    def __init__(self, coor_x, coor_y, coor_z):
+    # The connections are taken from the global lists, unless other ones are given (e.g. of a coarsened graph)
+    def __init__(self, coor_x, coor_y, coor_z, connected_sequences_list=None, att_values_list=None):
 
         if cfg.run_params['dimensions_num_for_clustering'] == 3:
             self.coordinates = np.column_stack((coor_x, coor_y, coor_z))
@@ -16,14 +36,24 @@ class FruchtermanReingold:
 
         self.total_seq_num = self.coordinates.shape[0]
         self.total_seq_last_movement = np.zeros((self.total_seq_num, self.dim_num))
+        self.max_movement = 0.0
+        self.total_movement = 0.0
+        self.chunks_movement = None
+
+        # Factors of the repulsion and of the maximal movement of this layout (e.g. for the coarse graphs of the
+        # multilevel layout), applied on top of the global parameters
+        self.rep_factor = 1.0
+        self.maxmove_factor = 1.0
 
         if 'current_temp' in cfg.run_params:
             self.current_temp = cfg.run_params['current_temp']
         else:
             self.current_temp = 1.0
 
-        self.attraction_values = cfg.attraction_values_mtx
-        self.connected_sequences = cfg.connected_sequences_mtx
+        if connected_sequences_list is None:
+            self.update_connections()
+        else:
+            self.set_connections(connected_sequences_list, att_values_list)
 
     def init_calculation(self, coor_x, coor_y, coor_z):
 
@@ -36,10 +66,11 @@ class FruchtermanReingold:
 
         self.total_seq_num = self.coordinates.shape[0]
         self.total_seq_last_movement = np.zeros((self.total_seq_num, self.dim_num))
+        self.max_movement = 0.0
+        self.total_movement = 0.0
 
         self.current_temp = 1.0
-        self.attraction_values = cfg.attraction_values_mtx
-        self.connected_sequences = cfg.connected_sequences_mtx
+        self.update_connections()
 
     def init_coordinates(self, coor_x, coor_y, coor_z):
 
@@ -51,51 +82,172 @@ class FruchtermanReingold:
             self.dim_num = 2
 
         self.total_seq_last_movement = np.zeros((self.total_seq_num, self.dim_num))
-
+        self.subset_indices = None
+
+    # Save the current state of the calculation in a compressed NumPy (.npz) file.
+    # The file is first written under a temporary name and then renamed, so a job which is killed during the writing
+    # does not damage the previous checkpoint.
+    def save_checkpoint(self, file_path, rounds_done, converged_rounds=0):
+        temp_file_path = file_path + ".tmp"
+
+        with open(temp_file_path, "wb") as outfile:
+            np.savez_compressed(outfile, coordinates=self.coordinates,
+                                total_seq_last_movement=self.total_seq_last_movement,
+                                current_temp=self.current_temp, max_movement=self.max_movement,
+                                total_movement=self.total_movement, rounds_done=rounds_done,
+                                converged_rounds=converged_rounds)
+        os.replace(temp_file_path, file_path)
+
+    # Restore the state of the calculation from a checkpoint file.
+    # Returns the number of rounds done and the number of successive converged rounds (or an error message)
+    def load_checkpoint(self, file_path):
+        error = ""
+
+        if not os.path.isfile(file_path):
+            error = "The checkpoint file \'" + file_path + "\' does not exist"
+            return error, 0, 0
+
+        with np.load(file_path) as checkpoint:
+            if checkpoint['coordinates'].shape != self.coordinates.shape:
+                error = "The checkpoint file \'" + file_path + "\' does not match the input data (" + \
+                        str(checkpoint['coordinates'].shape[0]) + " sequences in " + \
+                        str(checkpoint['coordinates'].shape[1]) + "D)"
+                return error, 0, 0
+
+            self.coordinates = checkpoint['coordinates'].copy()
+            self.total_seq_last_movement = checkpoint['total_seq_last_movement'].copy()
+            self.current_temp = float(checkpoint['current_temp'])
+            self.max_movement = float(checkpoint['max_movement'])
+            self.total_movement = float(checkpoint['total_movement'])
+            rounds_done = int(checkpoint['rounds_done'])
+            converged_rounds = int(checkpoint['converged_rounds'])
+
+        return error, rounds_done, converged_rounds
+
+    # Take the list of connected pairs (non-redundant) and their attraction values
     def update_connections(self):
-        self.attraction_values = cfg.attraction_values_mtx
-        self.connected_sequences = cfg.connected_sequences_mtx
-
-    def calculate_new_positions(self, is_subset_mode):
-
-        movement = np.zeros((self.total_seq_num, self.dim_num))
-
-        # Calculate the movement created by the attractive and repulsive forces between the pairs
-        if not is_subset_mode:
-            frn.calculate_pair_forces(self.coordinates, self.attraction_values, self.connected_sequences, movement,
-                                      self.dim_num, cfg.run_params['att_val'], cfg.run_params['att_exp'],
-                                      cfg.run_params['rep_val'], cfg.run_params['rep_exp'])
-
-        # Subset mode - ignore pairs which are not in the subset
+        self.set_connections(cfg.connected_sequences_list, cfg.att_values_for_connected_list)
+
+    # Use the given list of connected pairs and their attraction values (e.g. of a coarsened graph)
+    def set_connections(self, connected_sequences_list, att_values_list):
+        self.connected_sequences_list = np.asarray(connected_sequences_list, dtype=int).reshape(-1, 2)
+        self.att_values_list = np.asarray(att_values_list, dtype=float)
+        self.connections_index = build_connections_index(self.connected_sequences_list, self.att_values_list,
+                                                         self.total_seq_num)
+
+        # The compact sub-graph of the subset is built again on the next subset-mode round
+        self.subset_indices = None
+
+    # Subset mode: build a compact sub-graph of the sequences in the subset - their indices and the connections
+    # between them (both sequences in the subset), re-indexed to positions in the subset.
+    # The layout of the subset is calculated on the compact arrays, so its cost depends only on the subset size.
+    # Should be called again when the subset or the connections change.
+    def update_subset_graph(self):
+        self.subset_indices = np.flatnonzero(cfg.sequences_array['in_subset'])
+
+        compact_index = np.full(self.total_seq_num, -1, dtype=int)
+        compact_index[self.subset_indices] = np.arange(len(self.subset_indices))
+
+        in_subset_connections = np.flatnonzero((compact_index[self.connected_sequences_list[:, 0]] >= 0) &
+                                               (compact_index[self.connected_sequences_list[:, 1]] >= 0))
+        self.subset_connected_sequences_list = compact_index[self.connected_sequences_list[in_subset_connections]]
+        self.subset_att_values_list = self.att_values_list[in_subset_connections]
+        self.subset_connections_index = build_connections_index(self.subset_connected_sequences_list,
+                                                                self.subset_att_values_list,
+                                                                len(self.subset_indices))
+
+    # Approximate the repulsive forces using a quadtree / octree (Barnes-Hut)
+    def calculate_barnes_hut_forces(self, coordinates, movement):
+        if coordinates.shape[0] > 1:
+            bh.calculate_repulsive_movement(coordinates, movement, self.dim_num,
+                                            cfg.run_params['rep_val'] * self.rep_factor,
+                                            cfg.run_params['rep_exp'], cfg.run_params['theta'])
+
+    # The per-thread movement buffers of the exact repulsive forces, allocated once and reused in every round
+    # (allocated again only when the number of sequences or of threads changes)
+    def get_chunks_movement(self, coordinates):
+        chunks_num = max(1, min(numba.get_num_threads(), coordinates.shape[0] - 1))
+        if self.chunks_movement is None or self.chunks_movement.shape != (chunks_num,) + coordinates.shape:
+            self.chunks_movement = np.zeros((chunks_num,) + coordinates.shape)
+        return self.chunks_movement
+
+    # Calculate the movement of one round for the given coordinates and connections (CSR index)
+    def calculate_movement(self, coordinates, last_movement, connections_index, current_temp):
+
+        movement = np.zeros(coordinates.shape)
+
+        # Calculate the movement created by the repulsive forces between all the pairs
+        # Barnes-Hut mode: approximate the repulsive forces using a quadtree / octree
+        if cfg.run_params['is_barnes_hut']:
+            self.calculate_barnes_hut_forces(coordinates, movement)
         else:
-            frn.calculate_pair_forces_subset(self.coordinates, self.attraction_values, self.connected_sequences,
-                                             movement, self.dim_num, cfg.run_params['att_val'],
-                                             cfg.run_params['att_exp'], cfg.run_params['rep_val'],
-                                             cfg.run_params['rep_exp'], cfg.sequences_array['in_subset'])
+            frn.calculate_repulsive_forces(coordinates, movement, self.dim_num,
+                                           cfg.run_params['rep_val'] * self.rep_factor,
+                                           cfg.run_params['rep_exp'], self.get_chunks_movement(coordinates))
+
+        # Calculate the movement created by the attractive forces between the connected pairs only
+        connections_ptr, connected_sequences, connected_att_values = connections_index
+        frn.calculate_attractive_forces(coordinates, connections_ptr, connected_sequences, connected_att_values,
+                                        movement, self.dim_num, cfg.run_params['att_val'], cfg.run_params['att_exp'])
         # print("movement:" + str(movement))
 
         # Add the 'gravity' movement towards the origin
-        movement -= self.coordinates * cfg.run_params['gravity']
+        movement -= coordinates * cfg.run_params['gravity']
 
         # Calculate the normalized movement vector for each sequence in each dimension
         # including the consideration of the last movement (according to the dampening parameter)
         # and the current temperature of the system.
-        if not is_subset_mode:
-            frn.calculate_total_sequence_movement(self.total_seq_last_movement, self.dim_num,
-                                                  cfg.run_params['dampening'], cfg.run_params['maxmove'],
-                                                  self.current_temp, movement)
-        else:
-            frn.calculate_total_sequence_movement_subset(self.total_seq_last_movement, self.dim_num,
-                                                  cfg.run_params['dampening'], cfg.run_params['maxmove'],
-                                                  self.current_temp, cfg.sequences_array['in_subset'], movement)
+        frn.calculate_total_sequence_movement(last_movement, self.dim_num, cfg.run_params['dampening'],
+                                              cfg.run_params['maxmove'] * self.maxmove_factor, current_temp, movement)
         # print("total_seq_movement:" + str(movement))
 
-        # Move the position of all the sequences according to the total movement vector
-        self.coordinates += movement
+        return movement
+
+    def calculate_new_positions(self, is_subset_mode):
+
+        # Set the number of threads for the parallel calculation (the setting is per calling thread)
+        if cfg.run_params['threads_num'] is not None:
+            numba.set_num_threads(cfg.run_params['threads_num'])
+
+        if not is_subset_mode:
+            movement = self.calculate_movement(self.coordinates, self.total_seq_last_movement, self.connections_index,
+                                               self.current_temp)
+
+            # Move the position of all the sequences according to the total movement vector
+            self.coordinates += movement
+
+            # Save the current movement for the next iteration
+            self.total_seq_last_movement = movement
+
+        # Subset mode - gather the coordinates and the last movement of the subset sequences into compact arrays,
+        # calculate the movement of the compact sub-graph and scatter the results back
+        else:
+            if self.subset_indices is None:
+                self.update_subset_graph()
+
+            subset_num = len(self.subset_indices)
+            if subset_num > 0:
+                subset_coordinates = self.coordinates[self.subset_indices]
+                subset_last_movement = self.total_seq_last_movement[self.subset_indices]
+
+                # The movement is normalized by the number of sequences in the compact arrays, so the temperature is
+                # scaled to keep the normalization by the total number of sequences
+                movement = self.calculate_movement(subset_coordinates, subset_last_movement,
+                                                   self.subset_connections_index,
+                                                   self.current_temp * subset_num / self.total_seq_num)
+
+                self.coordinates[self.subset_indices] = subset_coordinates + movement
+                self.total_seq_last_movement[self.subset_indices] = movement
+            else:
+                movement = np.zeros((0, self.dim_num))
         # print("FR.calculate_new_positions: New coordinates including dampening and cooling:" + str(coordinates))
 
-        # Save the current movement for the next iteration
-        self.total_seq_last_movement = movement.copy()
+        # Save the maximal and the total (summed over all the sequences) size of the movement in this round
+        # (used to check whether the layout has converged)
+        seq_movement = np.sqrt(np.sum(movement ** 2, axis=1))
+        if len(seq_movement) > 0:
+            self.max_movement = float(np.amax(seq_movement))
+            self.total_movement = float(np.sum(seq_movement))
 
         # Update the current temperature of the system (if cooling<1, the system gradually cools down until temp=0)
         self.current_temp *= cfg.run_params['cooling']
@@ -2,103 +2,114 @@ import numpy as np
 import numba
 
 
-@numba.njit
+@numba.njit(cache=True)
 def square_num(num):
     return num ** 2
 
 
-@numba.njit
+@numba.njit(cache=True)
 def sqrt_num(num):
     return num ** 0.5
 
 
-@numba.njit
+@numba.njit(cache=True)
 def calc_att_force(att_val, att_factor, euc_dist, att_exp):
     att_forces = att_val * att_factor * (euc_dist ** att_exp)
     return att_forces
 
 
-@numba.njit
+@numba.njit(cache=True)
 def calc_rep_force(rep_val, euc_dist, rep_exp):
     rep_forces = rep_val / (euc_dist ** rep_exp)
     return rep_forces
 
 
-@numba.njit
+@numba.njit(cache=True)
 def calc_pair_move(pair_dist_1d, euc_dist, pair_force):
     pair_moves = pair_dist_1d / euc_dist * pair_force
     return pair_moves
 
 
-@numba.njit
+@numba.njit(cache=True)
 def calc_moves_per_seq(pair_moves):
     seq_moves = np.sum(pair_moves)
     return seq_moves
 
 
-@numba.njit(parallel=True)
-def calculate_pair_forces(coor, attraction_values, connected_sequences, movement, n_dims, att_val, att_exp, rep_val, rep_exp):
+# Calculate the repulsive forces between all the pairs of sequences.
+# The rows (sequences i) are distributed cyclically between chunks which are processed in parallel (the cyclic
+# distribution balances the work, since row i has N-i-1 pairs). Each chunk accumulates the movement of both sequences
+# of each pair in its own buffer, so there are no races between threads, and the buffers are summed in the end.
+# The buffers (n_chunks x N x dims) are allocated once by the caller and reused in every round: the number of chunks
+# is taken from their first dimension (calling numba.get_num_threads() inside a compiled function prevents saving it
+# in the on-disk cache)
+@numba.njit(parallel=True, cache=True)
+def calculate_repulsive_forces(coor, movement, n_dims, rep_val, rep_exp, chunks_movement):
     n_sequences = coor.shape[0]
-    dist_array = np.zeros(n_dims)
+    n_chunks = chunks_movement.shape[0]
 
-    for i in range(n_sequences-1):
-        for j in range(i+1, n_sequences):
-            euclidean_dist = 0
+    for chunk in numba.prange(n_chunks):
+        dist_array = np.zeros(n_dims)
+        chunks_movement[chunk, :, :] = 0.0
 
-            # Calculate the pair-distances in each dimension and the Euclidean distance for each pair
-            for dim in range(n_dims):
-                dist_array[dim] = coor[i][dim] - coor[j][dim]
-                euclidean_dist += square_num(dist_array[dim])
-            if euclidean_dist == 0:
-                euclidean_dist = 0.000001
-            else:
-                euclidean_dist = sqrt_num(euclidean_dist)
-
-            # Calculate the pairwise repulsive forces between all the sequences
-            rep_force = calc_rep_force(rep_val, euclidean_dist, rep_exp)
+        for i in range(chunk, n_sequences-1, n_chunks):
+            for j in range(i+1, n_sequences):
+                euclidean_dist = 0
 
-            # Calculate the pairwise attractive forces between the connected sequences only
-            if connected_sequences[i][j] == 1:
-                att_force = calc_att_force(attraction_values[i][j], att_val, euclidean_dist, att_exp)
+                # Calculate the pair-distances in each dimension and the Euclidean distance for each pair
+                for dim in range(n_dims):
+                    dist_array[dim] = coor[i][dim] - coor[j][dim]
+                    euclidean_dist += square_num(dist_array[dim])
+                if euclidean_dist == 0:
+                    euclidean_dist = 0.000001
+                else:
+                    euclidean_dist = sqrt_num(euclidean_dist)
 
-            for dim in range(n_dims):
-                # Calculate the pairwise movement, resulted from the repulsive force, in each dimension separately
-                rep_movement = calc_pair_move(dist_array[dim], euclidean_dist, rep_force)
+                # Calculate the pairwise repulsive forces between all the sequences
+                rep_force = calc_rep_force(rep_val, euclidean_dist, rep_exp)
 
-                # add the repulsive movement to both sequences in opposite directions
-                movement[i][dim] += rep_movement
-                movement[j][dim] -= rep_movement
+                for dim in range(n_dims):
+                    # Calculate the pairwise movement, resulted from the repulsive force, in each dimension separately
+                    rep_movement = calc_pair_move(dist_array[dim], euclidean_dist, rep_force)
 
-                if connected_sequences[i][j] == 1:
-                    # Calculate the pairwise movement, resulted from the attractive force, in each dimension separately
-                    att_movement = calc_pair_move(dist_array[dim], euclidean_dist, att_force)
+                    # add the repulsive movement to both sequences in opposite directions
+                    chunks_movement[chunk][i][dim] += rep_movement
+                    chunks_movement[chunk][j][dim] -= rep_movement
 
-                    # add the attractive movement to both sequences in opposite directions (towards each other)
-                    movement[i][dim] -= att_movement
-                    movement[j][dim] += att_movement
+    add_chunks_movement(chunks_movement, movement)
 
 
-@numba.njit(parallel=True)
-def calculate_pair_forces_subset(coor, attraction_values, connected_sequences, movement, n_dims, att_val, att_exp,
-                                 rep_val, rep_exp, in_subset):
-    n_sequences = coor.shape[0]
-    dist_array = np.zeros(n_dims)
+# Sum the movement buffers of all the chunks into the movement array (in parallel over the sequences)
+@numba.njit(parallel=True, cache=True)
+def add_chunks_movement(chunks_movement, movement):
+    n_chunks = chunks_movement.shape[0]
+    n_sequences = chunks_movement.shape[1]
+    n_dims = chunks_movement.shape[2]
 
-    for i in range(n_sequences-1):
+    for i in numba.prange(n_sequences):
+        for chunk in range(n_chunks):
+            for dim in range(n_dims):
+                movement[i][dim] += chunks_movement[chunk][i][dim]
 
-        # Ignore sequences which are not included in the subset
-        if not in_subset[i]:
-            continue
 
-        for j in range(i+1, n_sequences):
+# Calculate the attractive forces between the connected sequences only.
+# The connections of each sequence are given in a CSR index (connections_ptr[i]:connections_ptr[i+1] are the
+# positions of the connections of sequence i in connected_sequences / connected_att_values, listing each connection
+# for both of its sequences). The sequences are processed in parallel and each one accumulates only its own movement,
+# so there are no races between threads and no per-thread buffers
+@numba.njit(parallel=True, cache=True)
+def calculate_attractive_forces(coor, connections_ptr, connected_sequences, connected_att_values, movement, n_dims,
+                                att_val, att_exp):
+    n_sequences = coor.shape[0]
 
-            # Ignore sequences which are not included in the subset
-            if not in_subset[j]:
-                continue
+    for i in numba.prange(n_sequences):
+        dist_array = np.zeros(n_dims)
+        seq_movement = np.zeros(n_dims)
 
+        for k in range(connections_ptr[i], connections_ptr[i + 1]):
+            j = connected_sequences[k]
             euclidean_dist = 0
 
-            # Calculate the pair-distances in each dimension and the Euclidean distance for each pair
             for dim in range(n_dims):
                 dist_array[dim] = coor[i][dim] - coor[j][dim]
                 euclidean_dist += square_num(dist_array[dim])
@@ -107,32 +118,18 @@ def calculate_pair_forces_subset(coor, attraction_values, connected_sequences, m
             else:
                 euclidean_dist = sqrt_num(euclidean_dist)
 
-            # Calculate the pairwise repulsive forces between all the sequences
-            rep_force = calc_rep_force(rep_val, euclidean_dist, rep_exp)
-
-            # Calculate the pairwise attractive forces between the connected sequences only
-            if connected_sequences[i][j] == 1:
-                att_force = calc_att_force(attraction_values[i][j], att_val, euclidean_dist, att_exp)
+            att_force = calc_att_force(connected_att_values[k], att_val, euclidean_dist, att_exp)
 
             for dim in range(n_dims):
-                # Calculate the pairwise movement, resulted from the repulsive force, in each dimension separately
-                rep_movement = calc_pair_move(dist_array[dim], euclidean_dist, rep_force)
-
-                # add the repulsive movement to both sequences in opposite directions
-                movement[i][dim] += rep_movement
-                movement[j][dim] -= rep_movement
+                # the attractive movement is towards the connected sequence
+                seq_movement[dim] -= calc_pair_move(dist_array[dim], euclidean_dist, att_force)
 
-                if connected_sequences[i][j] == 1:
-                    # Calculate the pairwise movement, resulted from the attractive force, in each dimension separately
-                    att_movement = calc_pair_move(dist_array[dim], euclidean_dist, att_force)
-
-                    # add the attractive movement to both sequences in opposite directions (towards each other)
-                    movement[i][dim] -= att_movement
-                    movement[j][dim] += att_movement
+        for dim in range(n_dims):
+            movement[i][dim] += seq_movement[dim]
 
 
 @numba.guvectorize([(numba.float64[:, :], numba.int64, numba.float64, numba.float64, numba.float64, numba.float64[:, :])],
-                   '(m, n), (), (), (), () -> (m, n)', nopython=True, target='parallel')
+                   '(m, n), (), (), (), () -> (m, n)', nopython=True, target='parallel', cache=True)
 def calculate_total_sequence_movement(last_movement, n_dims, dampening, maxmove, current_temp, movement):
     n_sequences = movement.shape[0]
 
@@ -163,44 +160,3 @@ def calculate_total_sequence_movement(last_movement, n_dims, dampening, maxmove,
         if xyz_movement > maxmove:
             for dim in range(n_dims):
                 movement[i][dim] *= limit_movement_factor
-
-
-@numba.guvectorize([(numba.float64[:, :], numba.int64, numba.float64, numba.float64, numba.float64, numba.bool_[:], numba.float64[:, :])],
-                   '(m, n), (), (), (), (), (m) -> (m, n)', nopython=True, target='parallel')
-def calculate_total_sequence_movement_subset(last_movement, n_dims, dampening, maxmove, current_temp, in_subset, movement):
-    n_sequences = movement.shape[0]
-
-    for i in range(n_sequences):
-
-        # Ignore sequences which are not included in the subset
-        if not in_subset[i]:
-            continue
-
-        xyz_movement = 0
-
-        for dim in range(n_dims):
-            # The last movement is added to the current movement with the weight of (1-dampening)
-            movement[i][dim] += last_movement[i][dim] * (1 - dampening)
-
-            # The sum of the last movement and the current movement is multiplied by the current temperature
-            movement[i][dim] *= current_temp
-
-            # Normalizing the movement by the number of sequences
-            movement[i][dim] /= n_sequences
-
-            # Calculate the euclidean movement
-            xyz_movement += square_num(movement[i][dim])
-
-        if xyz_movement == 0:
-            xyz_movement = 0.000001
-        else:
-            xyz_movement = sqrt_num(xyz_movement)
-
-        # In case the 3D movement-vector is bigger than the maximum allowed movement ('maxmove'),
-        # multiply the movement in each dimension by a limiting factor (maxmove / movement_vector)
-        limit_movement_factor = maxmove / xyz_movement
-        if xyz_movement > maxmove:
-            for dim in range(n_dims):
-                movement[i][dim] *= limit_movement_factor
-
-
@@ -1,6 +1,9 @@
 from PyQt5.QtCore import QObject, QRunnable, pyqtSignal, pyqtSlot
+import threading
 import time
+import numpy as np
 import clans.config as cfg
+import clans.clans.layouts.layout_process as lp
 
 
 class LayoutCalculationSignals(QObject):
@@ -8,12 +11,65 @@ class LayoutCalculationSignals(QObject):
     stopped = pyqtSignal(str)
 
 
+# A double-buffered copy of the layout coordinates, passed from the calculation thread to the GUI.
+# The calculation thread writes the coordinates into the back buffer and swaps the buffers, while the GUI draws the
+# front buffer. The back buffer is never written while the GUI still uses it (between read() and release()).
+class CoordinatesSnapshot:
+
+    def __init__(self, coordinates):
+        self.buffers = [coordinates.copy(), coordinates.copy()]
+        self.front = 0
+        self.in_use = None
+        self.rounds = 0  # The number of rounds done since the last read
+        self.is_new_frame = False
+        self.lock = threading.Lock()
+
+    # Called by the calculation thread.
+    # Returns whether the coordinates were written and whether the GUI should be signalled (no frame is waiting)
+    def publish(self, coordinates, rounds):
+        with self.lock:
+            back = 1 - self.front
+            if self.in_use == back:
+                return False, False
+
+        if self.buffers[back].shape == coordinates.shape:
+            np.copyto(self.buffers[back], coordinates)
+        else:
+            self.buffers[back] = coordinates.copy()
+
+        with self.lock:
+            self.front = back
+            self.rounds += rounds
+            is_signal = not self.is_new_frame
+            self.is_new_frame = True
+
+        return True, is_signal
+
+    # Called by the GUI: returns the last coordinates and the number of rounds done since the previous read
+    def read(self):
+        with self.lock:
+            self.in_use = self.front
+            self.is_new_frame = False
+            rounds = self.rounds
+            self.rounds = 0
+            return self.buffers[self.front], rounds
+
+    def release(self):
+        with self.lock:
+            self.in_use = None
+
+
 class LayoutCalculationWorker(QRunnable):
     def __init__(self, layout_object, is_subset_mode):
         super().__init__()
 
         self.layout_object = layout_object
         self.is_subset_mode = is_subset_mode
+        self.snapshot = CoordinatesSnapshot(layout_object.coordinates)
+
+        # Build the compact sub-graph of the current subset (it may have changed since the last calculation)
+        if is_subset_mode:
+            layout_object.update_subset_graph()
 
         self.signals = LayoutCalculationSignals()
 
@@ -22,6 +78,8 @@ class LayoutCalculationWorker(QRunnable):
     @pyqtSlot()
     def run(self):
         error = ""
+        rounds_since_frame = 0
+        last_frame_time = time.time()
 
         while self.is_stopped is False:
 
@@ -38,11 +96,138 @@ class LayoutCalculationWorker(QRunnable):
                 self.signals.stopped.emit(cfg.run_params['error'])
                 return
 
-            self.signals.finished_iteration.emit()
-            time.sleep(0.01)
+            rounds_since_frame += 1
+
+            # Pass the coordinates to the GUI (if the GUI is still drawing the previous frame, continue calculating)
+            if lp.is_frame_due(rounds_since_frame, last_frame_time):
+                is_published, is_signal = self.snapshot.publish(self.layout_object.coordinates, rounds_since_frame)
+                if is_published:
+                    rounds_since_frame = 0
+                    last_frame_time = time.time()
+                if is_signal:
+                    self.signals.finished_iteration.emit()
+                    time.sleep(0.001)
+
+        # Pass the final coordinates to the GUI
+        if rounds_since_frame > 0:
+            is_published, is_signal = self.snapshot.publish(self.layout_object.coordinates, rounds_since_frame)
+            while not is_published:
+                time.sleep(0.001)
+                is_published, is_signal = self.snapshot.publish(self.layout_object.coordinates, rounds_since_frame)
+            if is_signal:
+                self.signals.finished_iteration.emit()
 
         if self.is_stopped is True:
             self.signals.stopped.emit(error)
 
     def stop(self):
         self.is_stopped = True
+
+
+# The GUI side of the frames written by the layout process into the shared-memory buffers.
+# The buffers that are neither the last frame nor in use by the GUI are released back to the layout process.
+# The final coordinates (received when the calculation stops) are kept as a third, local buffer.
+class SharedCoordinatesSnapshot:
+
+    def __init__(self, layout_process):
+        self.layout_process = layout_process
+        self.buffers = [layout_process.buffers[0], layout_process.buffers[1], None]
+        self.front = None
+        self.in_use = None
+        self.rounds = 0
+        self.is_new_frame = False
+        self.lock = threading.Lock()
+
+    # Called by the calculation thread when a new frame has arrived. Returns whether the GUI should be signalled
+    def add_frame(self, buffer_index, rounds):
+        with self.lock:
+            previous = self.front
+            self.front = buffer_index
+            self.rounds += rounds
+            if previous is not None and previous != self.in_use and previous < 2:
+                self.layout_process.release(previous)
+            is_signal = not self.is_new_frame
+            self.is_new_frame = True
+        return is_signal
+
+    def add_final_frame(self, coordinates, rounds):
+        self.buffers[2] = coordinates
+        return self.add_frame(2, rounds)
+
+    def read(self):
+        with self.lock:
+            self.in_use = self.front
+            self.is_new_frame = False
+            rounds = self.rounds
+            self.rounds = 0
+            return self.buffers[self.front], rounds
+
+    def release(self):
+        with self.lock:
+            if self.in_use is not None and self.in_use != self.front and self.in_use < 2:
+                self.layout_process.release(self.in_use)
+            self.in_use = None
+
+
+# Runs the layout calculation in a separate process (see layout_process.py): this thread only passes the commands
+# and the frames between the GUI and the layout process, so the calculation doesn't compete with the GUI
+# on the Python interpreter.
+class LayoutProcessWorker(QRunnable):
+    def __init__(self, layout_process, layout_object, is_subset_mode):
+        super().__init__()
+
+        self.layout_process = layout_process
+        self.layout_object = layout_object
+        self.is_subset_mode = is_subset_mode
+        self.snapshot = SharedCoordinatesSnapshot(layout_process)
+
+        self.signals = LayoutCalculationSignals()
+
+        self.is_stopped = False
+
+    @pyqtSlot()
+    def run(self):
+        error = ""
+
+        try:
+            self.layout_process.start(self.layout_object, self.is_subset_mode)
+
+            while True:
+                message = self.layout_process.conn.recv()
+
+                if message[0] == 'frame':
+                    if self.snapshot.add_frame(message[1], message[2]):
+                        self.signals.finished_iteration.emit()
+
+                # The calculation has stopped - take the final state of the calculation
+                elif message[0] == 'stopped':
+                    state = message[1]
+                    self.layout_object.coordinates = state['coordinates']
+                    self.layout_object.total_seq_last_movement = state['last_movement']
+                    self.layout_object.current_temp = state['current_temp']
+                    self.layout_object.max_movement = state['max_movement']
+                    self.layout_object.total_movement = state['total_movement']
+
+                    if self.snapshot.add_final_frame(self.layout_object.coordinates, state['rounds']):
+                        self.signals.finished_iteration.emit()
+                    break
+
+                elif message[0] == 'error':
+                    error = message[1]
+                    break
+
+        except (EOFError, OSError) as err:
+            if cfg.run_params['is_debug_mode']:
+                print("\nError in the layout process:")
+                print(err)
+            error = "The layout process has stopped unexpectedly"
+
+        if error != "":
+            cfg.run_params['is_problem'] = True
+            cfg.run_params['error'] = error
+        self.is_stopped = True
+        self.signals.stopped.emit(error)
+
+    def stop(self):
+        if not self.is_stopped:
+            self.layout_process.stop()
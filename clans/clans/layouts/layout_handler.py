@@ -1,49 +1,107 @@
 import time
 import clans.config as cfg
 import clans.clans.data.sequences as seq
-import clans.clans.layouts.fruchterman_reingold as fr
+import clans.clans.data.sequence_pairs as sp
+import clans.clans.layouts.fruchterman_reingold_class as fr_class
+import clans.clans.layouts.precompile as precompile
+import clans.clans.layouts.multilevel_layout as multilevel
 
 
 def calculate_layout(layout):
     if layout == "FR":
-        fr.init_variables()
-        # If pre-defined number of rounds, perform this number of iterations
-        if cfg.run_params['num_of_rounds'] > 0:
+        # The list of connected pairs is needed by the Barnes-Hut mode
+        sp.define_connected_sequences_list()
+
+        # Multilevel mode: calculate the initial positions by laying out a hierarchy of coarsened graphs
+        # (not needed when the calculation continues from a checkpoint)
+        if cfg.run_params['is_multilevel'] and not cfg.run_params['resume']:
+            print("Calculating the multilevel initial layout")
             before = time.time()
+            cfg.sequences_array['x_coor'], cfg.sequences_array['y_coor'], cfg.sequences_array['z_coor'] = \
+                multilevel.calculate_multilevel_positions(cfg.run_params['total_sequences_num'],
+                                                          cfg.connected_sequences_list,
+                                                          cfg.att_values_for_connected_list)
+            if cfg.run_params['is_debug_mode']:
+                print("The multilevel initial layout took " + str(time.time() - before) + " seconds")
 
-            # If the cooling parameter < 1, keep iterating as long as the temperature > 1e-5
-            if cfg.run_params['cooling'] < 1.0:
-                i = 0
-                while fr.current_temp > 1e-5:
-                    fr.calculate_new_positions()
-                    i += 1
+        fr = fr_class.FruchtermanReingold(cfg.sequences_array['x_coor'], cfg.sequences_array['y_coor'],
+                                          cfg.sequences_array['z_coor'])
 
-                    if i % 100 == 0:
-                        after = time.time()
-                        duration = after - before
-                        print("The calculation of " + str(i+1) + " rounds took " + str(duration) + " seconds")
+        # Running until convergence - iterate up to the maximal number of rounds
+        if cfg.run_params['convergence_threshold'] is not None:
+            rounds_limit = cfg.run_params['max_rounds']
+        # If the cooling parameter < 1, keep iterating as long as the temperature > 1e-5
+        elif cfg.run_params['cooling'] < 1.0:
+            rounds_limit = None
+        # Iterate for the requested number of rounds
+        else:
+            rounds_limit = cfg.run_params['num_of_rounds']
 
-                cfg.run_params['rounds_done'] = i
+        i = 0
+        converged_rounds = 0
+        is_converged = False
 
-            # Iterate for the requested number of rounds
-            else:
-                for i in range(cfg.run_params['num_of_rounds']):
-                    fr.calculate_new_positions()
+        # Continue the calculation from the state saved in the checkpoint file
+        if cfg.run_params['resume']:
+            error, i, converged_rounds = fr.load_checkpoint(cfg.run_params['checkpoint_file'])
+            if error != "":
+                cfg.run_params['is_problem'] = True
+                cfg.run_params['error'] = error
+                return
+            print("Resuming the calculation from round " + str(i))
 
-                    if (i+1) % 100 == 0:
-                        after = time.time()
-                        duration = after - before
-                        print("The calculation of " + str(i+1) + " rounds took " + str(duration) + " seconds")
+        before = time.time()
+        last_checkpoint_time = before
+        start_round = i
 
-                cfg.run_params['rounds_done'] = i+1
+        # Measure the time spent on compiling numba functions (not loaded from the on-disk cache) during the rounds
+        compile_timer = precompile.start_compile_timer()
 
-        # If the cooling parameter < 1, keep iterating as long as the temperature > 1e-5
-        elif cfg.run_params['cooling'] < 1.0:
-            i = 0
-            while fr.current_temp > 1e-5:
-                fr.calculate_new_positions()
-                i += 1
-            cfg.run_params['rounds_done'] = i
+        while rounds_limit is None or i < rounds_limit:
+
+            if cfg.run_params['cooling'] < 1.0 and fr.current_temp <= 1e-5:
+                break
+
+            fr.calculate_new_positions(False)
+            i += 1
+
+            if (i - start_round) % 100 == 0:
+                after = time.time()
+                duration = after - before
+                print("The calculation of " + str(i - start_round) + " rounds took " + str(duration) + " seconds")
+
+            # Check convergence: the maximal movement of a sequence has been below the threshold
+            # for 'patience' successive rounds
+            if cfg.run_params['convergence_threshold'] is not None:
+                if fr.max_movement < cfg.run_params['convergence_threshold']:
+                    converged_rounds += 1
+                else:
+                    converged_rounds = 0
+
+                if converged_rounds >= cfg.run_params['convergence_patience']:
+                    is_converged = True
+                    break
+
+            # Save a checkpoint every K rounds and / or every T seconds
+            if cfg.run_params['checkpoint_file'] is not None:
+                if (cfg.run_params['checkpoint_rounds'] > 0 and i % cfg.run_params['checkpoint_rounds'] == 0) or \
+                        (cfg.run_params['checkpoint_seconds'] > 0 and
+                         time.time() - last_checkpoint_time >= cfg.run_params['checkpoint_seconds']):
+                    fr.save_checkpoint(cfg.run_params['checkpoint_file'], i, converged_rounds)
+                    last_checkpoint_time = time.time()
+                    if cfg.run_params['is_debug_mode']:
+                        print("Saved a checkpoint after " + str(i) + " rounds")
+
+        cfg.run_params['layout_compile_time'] = precompile.stop_compile_timer(compile_timer)
+        cfg.run_params['rounds_done'] = i
+        cfg.run_params['energy'] = fr.total_movement
+
+        if cfg.run_params['convergence_threshold'] is not None:
+            if is_converged:
+                print("The layout has converged after " + str(i) + " rounds")
+            else:
+                print("The layout has not converged after " + str(i) + " rounds")
 
         # In the end of the clustering cycles, update the new coordinates in the main sequences_array
         seq.update_positions(fr.coordinates.T, 'full')
+        cfg.run_params['current_temp'] = fr.current_temp
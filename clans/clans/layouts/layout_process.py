@@ -0,0 +1,175 @@
+import multiprocessing
+import multiprocessing.shared_memory
+import threading
+import time
+import numpy as np
+import clans.config as cfg
+import clans.clans.layouts.fruchterman_reingold_class as fr_class
+
+# The run parameters needed by the layout calculation (passed to the layout process on start / parameters change)
+layout_params = ['cooling', 'maxmove', 'att_val', 'att_exp', 'rep_val', 'rep_exp', 'dampening', 'gravity',
+                 'is_barnes_hut', 'theta', 'threads_num', 'dimensions_num_for_clustering', 'frames_per_second',
+                 'rounds_per_frame', 'is_debug_mode']
+
+
+def get_layout_params():
+    return {param: cfg.run_params[param] for param in layout_params}
+
+
+# An out-of-process layout engine: a separate process owns the Fruchterman-Reingold calculation and writes the
+# coordinates into two shared-memory buffers. The commands are sent over a pipe:
+# ('start', state), ('stop',), ('params', params), ('release', buffer_index), ('quit',)
+# and the process answers with:
+# ('frame', buffer_index, rounds), ('stopped', state), ('error', message)
+# A buffer is written by the process only after the main process has released it.
+class LayoutProcess:
+
+    def __init__(self, sequences_num, dim_num):
+        self.shape = (sequences_num, dim_num)
+        self.shm = multiprocessing.shared_memory.SharedMemory(create=True, size=2 * sequences_num * dim_num * 8)
+        self.buffers = np.ndarray((2,) + self.shape, dtype=np.float64, buffer=self.shm.buf)
+
+        # The process is started using 'spawn' (forking a process with running GUI threads is not safe)
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=run_layout_process, args=(child_conn, self.shm.name, self.shape),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        # The commands may be sent from different threads (the GUI and the calculation worker)
+        self.send_lock = threading.Lock()
+
+    def send(self, command):
+        with self.send_lock:
+            self.conn.send(command)
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def start(self, fr_object, is_subset_mode):
+        state = {'coordinates': fr_object.coordinates, 'last_movement': fr_object.total_seq_last_movement,
+                 'current_temp': fr_object.current_temp, 'connected_sequences_list': fr_object.connected_sequences_list,
+                 'att_values_list': fr_object.att_values_list, 'in_subset': cfg.sequences_array['in_subset'].copy(),
+                 'is_subset_mode': is_subset_mode, 'params': get_layout_params()}
+        self.send(('start', state))
+
+    def stop(self):
+        self.send(('stop',))
+
+    def update_params(self):
+        self.send(('params', get_layout_params()))
+
+    def release(self, buffer_index):
+        self.send(('release', buffer_index))
+
+    def close(self):
+        try:
+            self.send(('quit',))
+            self.process.join(timeout=5)
+        except (OSError, ValueError):
+            pass
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.buffers = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def run_layout_process(conn, shm_name, shape):
+    shm = multiprocessing.shared_memory.SharedMemory(name=shm_name)
+    buffers = np.ndarray((2,) + shape, dtype=np.float64, buffer=shm.buf)
+
+    fr = None
+    is_subset_mode = False
+    is_running = False
+    free_buffers = [0, 1]
+    rounds_since_frame = 0
+    last_frame_time = time.time()
+
+    while True:
+
+        # Handle all the waiting commands (wait for a command when the calculation is not running)
+        while not is_running or conn.poll():
+            try:
+                command = conn.recv()
+            except EOFError:
+                command = ('quit',)
+
+            if command[0] == 'start':
+                state = command[1]
+                cfg.run_params.update(state['params'])
+                cfg.connected_sequences_list = state['connected_sequences_list']
+                cfg.att_values_for_connected_list = state['att_values_list']
+
+                # Only the 'in_subset' field of the sequences array is used by the calculation
+                cfg.sequences_array = np.zeros(len(state['in_subset']), dtype=[('in_subset', bool)])
+                cfg.sequences_array['in_subset'] = state['in_subset']
+                cfg.run_params['current_temp'] = state['current_temp']
+
+                coordinates = state['coordinates']
+                if coordinates.shape[1] == 3:
+                    fr = fr_class.FruchtermanReingold(coordinates[:, 0], coordinates[:, 1], coordinates[:, 2])
+                else:
+                    fr = fr_class.FruchtermanReingold(coordinates[:, 0], coordinates[:, 1], None)
+                fr.total_seq_last_movement = state['last_movement'].copy()
+
+                is_subset_mode = state['is_subset_mode']
+                free_buffers = [0, 1]
+                rounds_since_frame = 0
+                last_frame_time = time.time()
+                is_running = True
+
+            elif command[0] == 'stop':
+                if is_running:
+                    is_running = False
+                    conn.send(('stopped', {'coordinates': fr.coordinates,
+                                           'last_movement': fr.total_seq_last_movement,
+                                           'current_temp': fr.current_temp, 'max_movement': fr.max_movement,
+                                           'total_movement': fr.total_movement, 'rounds': rounds_since_frame}))
+
+            elif command[0] == 'params':
+                cfg.run_params.update(command[1])
+
+            elif command[0] == 'release':
+                if command[1] not in free_buffers:
+                    free_buffers.append(command[1])
+
+            elif command[0] == 'quit':
+                buffers = None
+                shm.close()
+                conn.close()
+                return
+
+        try:
+            fr.calculate_new_positions(is_subset_mode)
+        except Exception as error:
+            is_running = False
+            if cfg.run_params['is_debug_mode']:
+                print("\nError in the layout process (calculate_new_positions):")
+                print(error)
+            conn.send(('error', "An error has occurred during clustering"))
+            continue
+
+        rounds_since_frame += 1
+
+        # Write the coordinates into a free buffer, according to the redraw rate
+        # (if both buffers are still used by the main process, continue calculating)
+        if len(free_buffers) > 0 and is_frame_due(rounds_since_frame, last_frame_time) \
+                and fr.coordinates.shape == shape:
+            buffer_index = free_buffers.pop(0)
+            buffers[buffer_index] = fr.coordinates
+            conn.send(('frame', buffer_index, rounds_since_frame))
+            rounds_since_frame = 0
+            last_frame_time = time.time()
+
+
+# Redraw the graph every 'rounds_per_frame' rounds, or according to the target frame rate
+# (when both are 0, redraw after every round)
+def is_frame_due(rounds_since_frame, last_frame_time):
+    if cfg.run_params['rounds_per_frame'] > 0:
+        return rounds_since_frame >= cfg.run_params['rounds_per_frame']
+    elif cfg.run_params['frames_per_second'] > 0:
+        return time.time() - last_frame_time >= 1.0 / cfg.run_params['frames_per_second']
+    return True
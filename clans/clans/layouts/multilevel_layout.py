@@ -0,0 +1,218 @@
+import numpy as np
+import numba
+import clans.config as cfg
+import clans.clans.data.sequences as seq
+import clans.clans.layouts.fruchterman_reingold_class as fr_class
+
+
+# Heavy-edge matching: go over the connections from the strongest (the highest attraction value) and match the two
+# sequences of each connection if both of them are not matched yet.
+# Each matched pair (or unmatched sequence) becomes one node of the coarse graph.
+# Returns the index of the coarse node of each sequence and the number of coarse nodes
+@numba.njit(cache=True)
+def match_heavy_edges(sorted_connections, seq_num):
+    match = np.full(seq_num, -1)
+
+    for k in range(sorted_connections.shape[0]):
+        i = sorted_connections[k][0]
+        j = sorted_connections[k][1]
+        if match[i] == -1 and match[j] == -1:
+            match[i] = j
+            match[j] = i
+
+    coarse_index = np.full(seq_num, -1)
+    coarse_num = 0
+    for i in range(seq_num):
+        if coarse_index[i] == -1:
+            coarse_index[i] = coarse_num
+            if match[i] != -1:
+                coarse_index[match[i]] = coarse_num
+            coarse_num += 1
+
+    return coarse_index, coarse_num
+
+
+# Coarsen the graph once: merge the matched sequences and their connections.
+# A connection between two coarse nodes sums the attraction values of the merged connections.
+# Returns the coarse node of each sequence, the number of coarse nodes and the coarse connections (sorted by
+# decreasing attraction values) and their attraction values
+def coarsen_graph(seq_num, connected_sequences_list, att_values_list):
+    sorted_indices = np.argsort(-att_values_list, kind='stable')
+    coarse_index, coarse_num = match_heavy_edges(connected_sequences_list[sorted_indices], seq_num)
+
+    # Convert the connections to coarse nodes and ignore the connections inside a coarse node
+    coarse_pairs = coarse_index[connected_sequences_list]
+    not_self_pairs = coarse_pairs[:, 0] != coarse_pairs[:, 1]
+    coarse_pairs = np.sort(coarse_pairs[not_self_pairs], axis=1)
+    coarse_att_values = att_values_list[not_self_pairs]
+
+    # Merge the duplicated connections and sum their attraction values
+    sorted_indices = np.lexsort((coarse_pairs[:, 1], coarse_pairs[:, 0]))
+    coarse_pairs = coarse_pairs[sorted_indices]
+    coarse_att_values = coarse_att_values[sorted_indices]
+    is_first = np.ones(len(coarse_pairs), dtype=bool)
+    is_first[1:] = np.any(coarse_pairs[1:] != coarse_pairs[:-1], axis=1)
+    first_indices = np.flatnonzero(is_first)
+    coarse_pairs = coarse_pairs[first_indices]
+    if len(first_indices) > 0:
+        coarse_att_values = np.add.reduceat(coarse_att_values, first_indices)
+
+    sorted_indices = np.argsort(-coarse_att_values, kind='stable')
+
+    return coarse_index, coarse_num, coarse_pairs[sorted_indices], coarse_att_values[sorted_indices]
+
+
+# Build the hierarchy of coarse graphs: coarsen repeatedly until the graph is small enough, or until the coarsening
+# doesn't reduce the graph significantly (e.g. when most of the sequences are singletons)
+def build_levels(seq_num, connected_sequences_list, att_values_list):
+    levels = []
+
+    while seq_num > cfg.run_params['multilevel_min_sequences']:
+        coarse_index, coarse_num, coarse_pairs, coarse_att_values = \
+            coarsen_graph(seq_num, connected_sequences_list, att_values_list)
+
+        if coarse_num > seq_num * 0.9:
+            break
+
+        levels.append((coarse_index, coarse_num, coarse_pairs, coarse_att_values))
+        seq_num = coarse_num
+        connected_sequences_list = coarse_pairs
+        att_values_list = coarse_att_values
+
+    return levels
+
+
+# The spread of the coordinates: the root mean square distance of the sequences from their center
+def calculate_spread(coordinates):
+    return np.sqrt(np.mean(np.sum((coordinates - np.mean(coordinates, axis=0)) ** 2, axis=1)))
+
+
+# Estimate the spread of the converged layout of a finer level with fine_num sequences, by fitting the spread of the
+# converged layouts of the last two laid out levels as a power of their number of sequences.
+# (with only one laid out level, the finer layout is assumed to have the same spread, since the forces of the coarse
+# levels are weighted by the number of sequences in each coarse node)
+def estimate_spread(fine_num, laid_out_levels):
+    coarse_num, coarse_spread = laid_out_levels[-1]
+    exponent = 0.0
+
+    if len(laid_out_levels) > 1:
+        coarser_num, coarser_spread = laid_out_levels[-2]
+        if coarser_spread > 0 and coarse_num > coarser_num:
+            exponent = np.log(coarse_spread / coarser_spread) / np.log(coarse_num / coarser_num)
+            exponent = min(max(exponent, 0.0), 1.0)
+
+    return coarse_spread * (fine_num / coarse_num) ** exponent
+
+
+# Place the sequences of a finer level on the position of their coarse node, with a small random shift (so the
+# matched sequences don't overlap), and scale the positions to the estimated spread of the finer layout
+def interpolate_positions(coarse_coordinates, coarse_index, fine_spread, rng):
+    center = np.mean(coarse_coordinates, axis=0)
+    coarse_spread = calculate_spread(coarse_coordinates)
+    if coarse_spread > 0:
+        scale = fine_spread / coarse_spread
+    else:
+        scale = 1.0
+
+    coordinates = (coarse_coordinates[coarse_index] - center) * scale + center
+    coordinates += rng.uniform(-0.01, 0.01, coordinates.shape) * fine_spread
+
+    return coordinates
+
+
+# Lay out one level of the hierarchy: perform Fruchterman-Reingold rounds on the given positions and connections,
+# with a cooling schedule of its own - the temperature starts at multilevel_temp and is lowered geometrically to 1
+# over multilevel_rounds rounds. The maximal movement of a sequence is raised by the same factor as the temperature,
+# so the hot rounds are not capped back to the regular step. The level stops early if it converges (the maximal
+# movement of a sequence is below the threshold for 'patience' successive rounds, as in the regular calculation).
+# Each coarse node stands for 'weight' sequences on average, so the repulsion is multiplied by the weight and the
+# (summed) attraction values are divided by it - this keeps the coarse layout close to the layout of the full graph
+def layout_level(coordinates, connected_sequences_list, att_values_list, weight):
+    if cfg.run_params['convergence_threshold'] is not None:
+        threshold = cfg.run_params['convergence_threshold']
+    else:
+        threshold = cfg.run_params['multilevel_threshold']
+
+    if coordinates.shape[1] == 3:
+        fr = fr_class.FruchtermanReingold(coordinates[:, 0], coordinates[:, 1], coordinates[:, 2],
+                                          connected_sequences_list, att_values_list / weight)
+    else:
+        fr = fr_class.FruchtermanReingold(coordinates[:, 0], coordinates[:, 1], None,
+                                          connected_sequences_list, att_values_list / weight)
+    fr.rep_factor = weight
+
+    temp = cfg.run_params['multilevel_temp']
+    cooling = (1.0 / temp) ** (1.0 / max(cfg.run_params['multilevel_rounds'], 1))
+
+    rounds_done = 0
+    converged_rounds = 0
+    while rounds_done < cfg.run_params['multilevel_rounds'] and \
+            converged_rounds < cfg.run_params['convergence_patience']:
+        fr.current_temp = temp
+        fr.maxmove_factor = temp
+        fr.calculate_new_positions(False)
+        rounds_done += 1
+        temp = max(temp * cooling, 1.0)
+
+        if fr.max_movement < threshold:
+            converged_rounds += 1
+        else:
+            converged_rounds = 0
+
+    return fr.coordinates, rounds_done
+
+
+# Calculate initial positions for the Fruchterman-Reingold layout by a multilevel scheme:
+# coarsen the graph repeatedly by heavy-edge matching, lay out the coarsest graph from random positions, and then
+# interpolate the positions to each finer level (scaled to its estimated spread) and refine them by the
+# Fruchterman-Reingold rounds of each level, including the full graph itself.
+# Returns the x, y and z coordinates of the sequences (as seq.init_positions does)
+def calculate_multilevel_positions(seq_num, connected_sequences_list, att_values_list):
+    connected_sequences_list = np.asarray(connected_sequences_list, dtype=int).reshape(-1, 2)
+    att_values_list = np.asarray(att_values_list, dtype=float)
+    dim_num = cfg.run_params['dimensions_num_for_clustering']
+    rng = np.random.default_rng()
+
+    coor_x, coor_y, coor_z = seq.init_positions(seq_num)
+    levels = build_levels(seq_num, connected_sequences_list, att_values_list)
+    rounds_per_level = []
+
+    # The graph can't be coarsened: the full graph is laid out from the random positions
+    if len(levels) == 0:
+        coordinates = np.column_stack((coor_x, coor_y, coor_z))[:, :dim_num]
+
+    else:
+        # Lay out the coarsest graph from random positions
+        coordinates = np.column_stack(seq.init_positions(levels[-1][1]))[:, :dim_num]
+        coordinates, rounds_done = layout_level(coordinates, levels[-1][2], levels[-1][3], seq_num / levels[-1][1])
+        laid_out_levels = [(levels[-1][1], calculate_spread(coordinates))]
+        rounds_per_level.append(rounds_done)
+
+        # Interpolate to each finer level and refine
+        for level_index in range(len(levels) - 1, 0, -1):
+            fine_num = levels[level_index - 1][1]
+            coordinates = interpolate_positions(coordinates, levels[level_index][0],
+                                                estimate_spread(fine_num, laid_out_levels), rng)
+            coordinates, rounds_done = layout_level(coordinates, levels[level_index - 1][2],
+                                                    levels[level_index - 1][3], seq_num / fine_num)
+            laid_out_levels.append((fine_num, calculate_spread(coordinates)))
+            rounds_per_level.append(rounds_done)
+
+        coordinates = interpolate_positions(coordinates, levels[0][0], estimate_spread(seq_num, laid_out_levels),
+                                            rng)
+
+    # The full graph has its own cooling schedule as well
+    coordinates, rounds_done = layout_level(coordinates, connected_sequences_list, att_values_list, 1.0)
+    rounds_per_level.append(rounds_done)
+
+    if cfg.run_params['is_debug_mode']:
+        print("Multilevel layout: " + " -> ".join([str(seq_num)] + [str(level[1]) for level in levels]) +
+              " sequences, " + " / ".join([str(rounds) for rounds in rounds_per_level[::-1]]) + " rounds")
+
+    # In 2D, only the x and y coordinates are calculated
+    coor_x = coordinates[:, 0].copy()
+    coor_y = coordinates[:, 1].copy()
+    if dim_num == 3:
+        coor_z = coordinates[:, 2].copy()
+
+    return coor_x, coor_y, coor_z
@@ -0,0 +1,83 @@
+import time
+import numpy as np
+from numba.core import event
+import clans.config as cfg
+import clans.clans.data.sequences as seq
+import clans.clans.layouts.fruchterman_reingold_class as fr_class
+
+# The size of the small random network used for compiling the layout functions
+precompile_sequences_num = 50
+precompile_connections_num = 200
+
+
+# Measure the time spent on compiling numba functions (from now until stop_compile_timer is called).
+# Loading a function from the on-disk cache is not counted as compilation.
+def start_compile_timer():
+    compile_timer = event.TimingListener()
+    event.register("numba:compile", compile_timer)
+    return compile_timer
+
+
+# Returns the number of seconds spent on compilation since the timer was started
+def stop_compile_timer(compile_timer):
+    event.unregister("numba:compile", compile_timer)
+    if compile_timer.done:
+        return compile_timer.duration
+    return 0.0
+
+
+# Compile all the numba functions of the layout calculation (exact / Barnes-Hut) and of the random
+# initialization of the coordinates, by running them once on a small random network.
+# The compiled functions are saved in the on-disk cache, so later runs of CLANS load them instead of compiling them.
+# Returns a list of (description, compilation seconds, execution seconds)
+def precompile_functions():
+    timings = []
+
+    # Keep the global data and parameters which are used by the layout calculation
+    saved_connections = cfg.connected_sequences_list
+    saved_att_values = cfg.att_values_for_connected_list
+    saved_params = {param: cfg.run_params[param] for param in ['dimensions_num_for_clustering', 'is_barnes_hut']}
+
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, precompile_sequences_num, (precompile_connections_num, 2))
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    cfg.connected_sequences_list = np.column_stack((np.amin(pairs, axis=1), np.amax(pairs, axis=1)))
+    cfg.att_values_for_connected_list = rng.random(len(pairs))
+
+    compile_timer = start_compile_timer()
+    before = time.time()
+    coor_x, coor_y, coor_z = seq.init_positions(precompile_sequences_num)
+    after = time.time()
+    compile_time = stop_compile_timer(compile_timer)
+    timings.append(("Initialization of the coordinates", compile_time, after - before - compile_time))
+
+    # The same compiled functions serve the 2D and the 3D layouts
+    cfg.run_params['dimensions_num_for_clustering'] = 3
+    for is_barnes_hut in (False, True):
+        cfg.run_params['is_barnes_hut'] = is_barnes_hut
+
+        compile_timer = start_compile_timer()
+        before = time.time()
+        fr = fr_class.FruchtermanReingold(coor_x, coor_y, coor_z)
+        fr.calculate_new_positions(False)
+        after = time.time()
+        compile_time = stop_compile_timer(compile_timer)
+
+        if is_barnes_hut:
+            timings.append(("Layout round (Barnes-Hut)", compile_time, after - before - compile_time))
+        else:
+            timings.append(("Layout round (exact forces)", compile_time, after - before - compile_time))
+
+    cfg.connected_sequences_list = saved_connections
+    cfg.att_values_for_connected_list = saved_att_values
+    cfg.run_params.update(saved_params)
+
+    return timings
+
+
+def run_precompile():
+    print("Compiling the numba functions (they are saved in the on-disk cache for the next runs)")
+
+    for description, compile_time, execution_time in precompile_functions():
+        print(description + ": compilation " + "{:.3f}".format(compile_time) + " seconds, execution " +
+              "{:.3f}".format(execution_time) + " seconds")
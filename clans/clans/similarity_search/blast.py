@@ -1,29 +1,40 @@
 import os
 import sys
-import shutil
 import re
+import json
+import time
+import hashlib
 import numpy as np
 from Bio import SeqIO
+import signal
 import subprocess
 import multiprocessing
+import multiprocessing.connection
+import threading
+import queue
+import collections
 import clans.config as cfg
 import clans.clans.data.sequence_pairs as sp
 
+# The initial size of the HSPs arrays and the size (in bytes) of the chunks of BLAST output lines parsed at once
+hsps_initial_capacity = 100000
+hsps_chunk_size = 8000000
+
+# The manifest of the BLAST run (saved in the blast-output directory), which enables the reuse of the database and of
+# the finished chunks when the search is run again with the same sequences
+manifest_file = "manifest.json"
+
 
 def find_HSPs():
     # Create the blast-output directory under the working directory
+    # (if it already exists, the results of a previous run on the same sequences are reused)
     blast_out_path = cfg.run_params['working_dir'] + '/blast_output/'
-
-    # If the blast output dir already exists - delete its content
-    if os.path.exists(blast_out_path):
-        print("\nDirectory " + blast_out_path + " already exists - deleting its content")
-        shutil.rmtree(blast_out_path)
-    # Create a new blast output dir
-    try:
-        os.makedirs(blast_out_path)
-    except OSError:
-        print("\nmkdir " + blast_out_path + " has failed")
-        exit()
+    if not os.path.isdir(blast_out_path):
+        try:
+            os.makedirs(blast_out_path)
+        except OSError:
+            print("\nmkdir " + blast_out_path + " has failed")
+            exit()
 
     blastDB_path = blast_out_path + "blastDB/"
     if not os.path.isdir(blastDB_path):
@@ -43,10 +54,11 @@ def find_HSPs():
     fasta_2line = blast_out_path + name_parts[0] + '_orig' + name_parts[1]
     fasta_indexed = blast_out_path + name_parts[0] + '_indexed' + name_parts[1]
     blast_db_file_path = blastDB_path + name_parts[0] + "_blastDB"
+    manifest_path = blast_out_path + manifest_file
 
     # Create two FASTA files under the 'blast_output' directory:
     #  one as the original (with one-line sequence) and the other with indices as titles
-    prepare_fasta(cfg.run_params['input_file'], fasta_2line, fasta_indexed, fasta_batches_path, name_parts[0])
+    prepare_fasta(cfg.run_params['input_file'], fasta_2line, fasta_indexed)
 
     # Verify that the files were indeed created
     if not os.path.isfile(fasta_2line) or os.path.getsize(fasta_2line) == 0:
@@ -58,17 +70,54 @@ def find_HSPs():
         cfg.run_params['error'] = "Error creating the indexed file " + fasta_indexed + " - cannot make BLAST DB."
         return
 
-    # Create a BLAST database from the input FASTA file
-    rc_db = make_blast_DB(fasta_indexed, blast_db_file_path)
+    # Read the manifest of the previous run (if any) and compare it to the current sequences and search parameters
+    fasta_hash = get_file_hash(fasta_indexed)
+    search_params = get_search_params()
+    manifest = read_manifest(manifest_path)
+
+    is_same_sequences = manifest is not None and manifest['fasta_hash'] == fasta_hash
+    is_same_search = is_same_sequences and manifest['search_params'] == search_params
+
+    # Start a new manifest (the chunks of the previous run cannot be reused)
+    if not is_same_search:
+        if manifest is not None:
+            print("\nThe sequences or the search parameters have changed since the previous BLAST run - "
+                  "starting a new search")
+        manifest = create_manifest(fasta_hash, search_params, is_same_sequences and manifest['is_db_ready'],
+                                   name_parts[0])
+        remove_old_outputs(out_batches_path)
+        write_manifest(manifest_path, manifest)
+
+    # Create the fasta files of the chunks which are not finished yet
+    write_chunks_fasta(manifest['chunks'], fasta_batches_path)
+
+    # Create a BLAST database from the input FASTA file (unless it was already created from the same sequences)
+    if manifest['is_db_ready'] and is_blast_DB_exists(blast_db_file_path):
+        print("\nUsing the existing BLAST database " + blast_db_file_path)
+    else:
+        rc_db = make_blast_DB(fasta_indexed, blast_db_file_path)
 
-    # makeblastdb has failed
-    if rc_db:
-        cfg.run_params['is_problem'] = True
-        cfg.run_params['error'] = "Cannot create BLAST database."
-        return
+        # makeblastdb has failed
+        if rc_db:
+            cfg.run_params['is_problem'] = True
+            cfg.run_params['error'] = "Cannot create BLAST database."
+            return
 
-    # Run the all-vs-all BLAST search in batches using by multiprocessing to speed up the calculation
-    rc_blast = manage_blast_execution(fasta_batches_path, blast_db_file_path, out_batches_path)
+        manifest['is_db_ready'] = True
+        write_manifest(manifest_path, manifest)
+
+    # The output of each blastp process is read by a background thread as soon as the process has finished,
+    # so the reading of the HSPs overlaps with the rest of the search
+    hsps_reader = HSPsReader()
+    hsps_reader.start()
+
+    # Run the all-vs-all BLAST search in chunks, using multiprocessing to speed up the calculation
+    # (the chunks that were finished in a previous run are only read)
+    rc_blast = manage_blast_execution(manifest, manifest_path, fasta_batches_path, blast_db_file_path,
+                                      out_batches_path, hsps_reader)
+
+    # Wait until the reader has finished reading all the output files
+    hsps_reader.finish()
 
     # The blast search stage has failed
     if rc_blast:
@@ -76,9 +125,8 @@ def find_HSPs():
         cfg.run_params['error'] = "The BLAST search stage has failed."
         return
 
-    # Read the list of HSPs (BLAST output) and save the lower value for each pair of sequences in the global arrays
-    # similarity_values_list and similarity_values_mtx
-    hsp_error = read_blast_HSPs(out_batches_path)
+    # Save the lower value for each pair of sequences in the global sparse similarity arrays
+    hsp_error = hsps_reader.save_similarity_values()
     if hsp_error != "":
         cfg.run_params['is_problem'] = True
         cfg.run_params['error'] = hsp_error
@@ -87,7 +135,7 @@ def find_HSPs():
     fill_values()
 
 
-def prepare_fasta(orig_file_path, two_line_file, indexed_file, fasta_batches_path, file_prefix):
+def prepare_fasta(orig_file_path, two_line_file, indexed_file):
     # Write the two full fasta files (one with original headers and the indexed one with indexes as headers)
     with open(two_line_file, 'w') as two_line_out:
         with open(indexed_file, 'w') as indexed_out:
@@ -102,29 +150,107 @@ def prepare_fasta(orig_file_path, two_line_file, indexed_file, fasta_batches_pat
                 SeqIO.write(record, indexed_out, "fasta-2line")
                 n += 1
 
-    # Set the sequences batch size according to the overall number of sequences
-    if cfg.run_params['total_sequences_num'] <= 100000:
-        cfg.blast_batch_size = 500
-    else:
-        cfg.blast_batch_size = 1000
 
-    # Create fasta files with batch_size number of sequences to be later run by blast in parallel
-    file_counter = 0
-    for seq_in_file_index in range(0, cfg.run_params['total_sequences_num'], cfg.blast_batch_size):
+# Create a fasta file for each chunk of sequences which is not finished yet, to be later run by blast in parallel
+def write_chunks_fasta(chunks_list, fasta_batches_path):
+    for chunk in chunks_list:
+        if chunk['status'] == 'done':
+            continue
+
+        with open(fasta_batches_path + chunk['fasta_file'], 'w') as fasta_batch:
+            for seq_index in range(chunk['first_seq'], chunk['end_seq']):
+                fasta_batch.write(">" + str(seq_index) + "\n")
+                fasta_batch.write(cfg.sequences_array['sequence'][seq_index] + "\n")
+
+
+def get_file_hash(file_path):
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as infile:
+        for block in iter(lambda: infile.read(1048576), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+# The parameters which affect the output of the search
+def get_search_params():
+    return {'evalue': cfg.run_params['evalue_cutoff'], 'matrix': cfg.run_params['scoring_matrix']}
+
+
+# Create the manifest of a new search: the sequences are divided into chunks with about the same total number of
+# residues, all of them waiting for execution
+def create_manifest(fasta_hash, search_params, is_db_ready, file_prefix):
+    seq_lengths = np.fromiter((len(sequence) for sequence in cfg.sequences_array['sequence']), dtype=np.int64,
+                              count=cfg.run_params['total_sequences_num'])
+    chunks_bounds = get_chunks_bounds(seq_lengths, cfg.run_params['cores_num'])
+
+    chunks_list = []
+    for chunk_index in range(len(chunks_bounds) - 1):
+        first_seq = int(chunks_bounds[chunk_index])
+        end_seq = int(chunks_bounds[chunk_index + 1])
+        chunks_list.append({'fasta_file': file_prefix + str(chunk_index + 1) + ".fasta",
+                            'first_seq': first_seq, 'end_seq': end_seq,
+                            'residues': int(np.sum(seq_lengths[first_seq:end_seq])),
+                            'status': 'pending', 'time': None})
+
+    return {'fasta_hash': fasta_hash, 'search_params': search_params, 'is_db_ready': is_db_ready,
+            'chunks': chunks_list}
+
+
+def read_manifest(manifest_path):
+    if not os.path.isfile(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path) as infile:
+            manifest = json.load(infile)
+        for key in ['fasta_hash', 'search_params', 'is_db_ready', 'chunks']:
+            if key not in manifest:
+                return None
+        return manifest
+
+    except (OSError, ValueError) as err:
+        print("\nCannot read the BLAST manifest " + manifest_path + " - starting a new search")
+        print(err)
+        return None
+
+
+# Write the manifest into a temporary file and rename it, so an interruption never leaves a partial manifest
+def write_manifest(manifest_path, manifest):
+    temp_file_path = manifest_path + ".tmp"
+    with open(temp_file_path, 'w') as outfile:
+        json.dump(manifest, outfile, indent=1)
+    os.replace(temp_file_path, manifest_path)
+
 
-        file_counter += 1
-        file_name = fasta_batches_path + file_prefix + str(file_counter) + ".fasta"
+# Remove the output files of a previous search
+def remove_old_outputs(out_batches_path):
+    for file in os.listdir(out_batches_path):
+        if re.search(r"^.+\.blast", file):
+            os.remove(out_batches_path + file)
 
-        # Open a file that should contain the batch_size fasta sequences
-        with open(file_name, 'w') as fasta_batch:
 
-            # A loop over the sequences that should be written to the current file
-            for seq_index in range(seq_in_file_index, seq_in_file_index + cfg.blast_batch_size):
-                if seq_index < cfg.run_params['total_sequences_num']:
-                    fasta_batch.write(">" + str(seq_index) + "\n")
-                    fasta_batch.write(cfg.sequences_array['sequence'][seq_index] + "\n")
+# A BLAST database consists of several files with the database name as a prefix
+def is_blast_DB_exists(blast_db_file_path):
+    db_dir, db_name = os.path.split(blast_db_file_path)
+    return os.path.isdir(db_dir) and any(file.startswith(db_name + ".") for file in os.listdir(db_dir))
 
-        fasta_batch.close()
+
+# Divide the sequences into consecutive chunks with about the same total number of residues (the running time of a
+# blastp job is roughly proportional to the total length of its queries). Several chunks are created for each core,
+# so that the jobs can be distributed evenly between the workers. Return the bounds of the chunks (sequence indices).
+def get_chunks_bounds(seq_lengths, cores_num):
+    sequences_num = len(seq_lengths)
+    total_residues = int(np.sum(seq_lengths))
+    chunk_residues = max(cfg.blast_chunk_min_residues,
+                         int(np.ceil(total_residues / (cores_num * cfg.blast_chunks_per_core))))
+
+    # Each chunk ends with the first sequence that brings the cumulative number of residues to a multiple of
+    # chunk_residues
+    cumulative_residues = np.cumsum(seq_lengths)
+    chunks_ends = np.searchsorted(cumulative_residues, np.arange(chunk_residues, total_residues, chunk_residues),
+                                  side='left') + 1
+
+    return np.unique(np.concatenate(([0], chunks_ends, [sequences_num])))
 
 
 # Creates a BLAST database from the input fasta file
@@ -153,14 +279,14 @@ def make_blast_DB(infile, outfile):
     return 0
 
 
-def manage_blast_execution(fasta_batches_path, blast_db_file_path, out_batches_path):
+def manage_blast_execution(manifest, manifest_path, fasta_batches_path, blast_db_file_path, out_batches_path,
+                           hsps_reader=None):
     # Set the parameters for the BLAST run
     evalue = cfg.run_params['evalue_cutoff']  # user-defined parameter
     matrix = cfg.run_params['scoring_matrix']  # user-defined parameter
     outfmt = "6 qacc sacc evalue"
     max_hsps = 1
     max_target_seqs = cfg.run_params['total_sequences_num']
-    threads_num = cfg.BLAST_threads_num
 
     # Set the gap_open and gap_extend parameters according to the scoring matrix
     gapopen = 11
@@ -173,67 +299,116 @@ def manage_blast_execution(fasta_batches_path, blast_db_file_path, out_batches_p
         gapopen = 15
         gapext = 2
 
-    # Create a list of the fasta sequences files
-    fasta_files_list = []
-    for file in os.listdir(fasta_batches_path):
-        if re.search(r"^.+\.fasta", file):  # List only fasta files
-            fasta_files_list.append(file)
-    files_num = len(fasta_files_list)
-
-    # A loop over batches of processes in the size of the available number of threads
-    batch_counter = 0
-    failed = 0
-    for batch_index in range(0, files_num, cfg.run_params['cores_num']):
-
-        batch_processes = []
-        batch_counter += 1
-
-        # A loop over the files of a certain multiprocessing batch
-        for file_index in range(batch_index, batch_index + cfg.run_params['cores_num']):
-            if file_index < files_num:
-                fasta_file = fasta_files_list[file_index]
-                name_parts = os.path.splitext(fasta_file)
-                blast_outfile = name_parts[0] + ".blast"
-                fasta_file_path = fasta_batches_path + fasta_file
-                blast_file_path = out_batches_path + blast_outfile
-
-                process = multiprocessing.Process(target=run_blastp,
-                                                  args=(fasta_file_path, blast_db_file_path, blast_file_path,
-                                                        evalue, outfmt, max_hsps, max_target_seqs, threads_num,
-                                                        gapopen, gapext))
-                # Start the process
-                process.start()
-
-                # Add the process to the list for later control
-                batch_processes.append(process)
-
-        print("\nRunning " + str(len(batch_processes)) + " processes of blastp in batch number " + str(batch_counter))
-
-        # wait until all the processes in the batch are finished
-        fail = 0
-        for proc in batch_processes:
-            proc.join()
-            exit_code = proc.exitcode
-
-            if exit_code != 0:
-                fail = 1
-                print("\nBatch number " + str(batch_counter) + " failed or finished without any valid hits")
-                print("Stopping blast execution")
-                break
+    chunks_num = len(manifest['chunks'])
 
-        if fail:
-            break
+    # Skip the chunks which were finished in a previous run (their complete output files are only read)
+    chunks_list = []
+    for chunk in manifest['chunks']:
+        blast_file_path = out_batches_path + os.path.splitext(chunk['fasta_file'])[0] + ".blast"
+        if chunk['status'] == 'done' and os.path.isfile(blast_file_path):
+            if hsps_reader is not None:
+                hsps_reader.add_file(blast_file_path)
         else:
-            print("\nAll processes in batch number " + str(batch_counter) + " finished successfully")
+            chunk['status'] = 'pending'
+            chunks_list.append(chunk)
+
+    finished_num = chunks_num - len(chunks_list)
+    if finished_num > 0:
+        print("\n" + str(finished_num) + " of " + str(chunks_num) + " chunks were already finished in a previous run")
+    if len(chunks_list) == 0:
+        return 0
+
+    # Run one blastp process per core; when there are fewer chunks than cores, use the free cores as blastp threads
+    workers_num = min(cfg.run_params['cores_num'], len(chunks_list))
+    threads_num = max(1, cfg.run_params['cores_num'] // workers_num)
+
+    print("\nRunning blastp on " + str(len(chunks_list)) + " chunks of sequences, using " + str(workers_num) +
+          " parallel processes (" + str(threads_num) + " threads each)")
+
+    # A queue of the chunks waiting for execution (the largest chunks first, so the shorter ones fill the gaps at the
+    # end of the search). A new process is started whenever a running one finishes
+    chunks_queue = collections.deque(sorted(chunks_list, key=lambda chunk: chunk['residues'], reverse=True))
+    running_processes = dict()
+    fail = 0
+
+    while (len(chunks_queue) > 0 or len(running_processes) > 0) and not fail:
+
+        # Start new processes as long as there are free workers
+        while len(chunks_queue) > 0 and len(running_processes) < workers_num:
+            chunk = chunks_queue.popleft()
+            name_parts = os.path.splitext(chunk['fasta_file'])
+            fasta_file_path = fasta_batches_path + chunk['fasta_file']
+            blast_file_path = out_batches_path + name_parts[0] + ".blast"
+
+            # blastp writes into a temporary file, which is renamed only when it is complete
+            process = multiprocessing.Process(target=run_blastp,
+                                              args=(fasta_file_path, blast_db_file_path, blast_file_path + ".tmp",
+                                                    evalue, outfmt, max_hsps, max_target_seqs, threads_num,
+                                                    gapopen, gapext))
+            process.start()
+            running_processes[process.sentinel] = (process, chunk, blast_file_path, time.time())
+
+        # Wait until at least one of the running processes is finished (all the processes which are finished are
+        # handled, also when one of them has failed)
+        for sentinel in multiprocessing.connection.wait(list(running_processes.keys())):
+            process, chunk, blast_file_path, start_time = running_processes.pop(sentinel)
+            process.join()
+            chunk['time'] = round(time.time() - start_time, 3)
+
+            if process.exitcode != 0:
+                fail = 1
+                chunk['status'] = 'failed'
+                write_manifest(manifest_path, manifest)
+                print("\nThe chunk " + chunk['fasta_file'] + " failed or finished without any valid hits")
+                continue
+
+            finished_num += 1
+            finish_chunk(manifest_path, manifest, chunk, blast_file_path, hsps_reader)
+            print("Chunk " + chunk['fasta_file'] + " finished successfully (" + str(finished_num) + "/" +
+                  str(chunks_num) + ")")
 
     if fail:
+        print("Stopping blast execution")
+
+        # Stop the chunks which are still running (they remain pending in the manifest and are run again when the
+        # search is resumed). A chunk which has finished before it was stopped is kept
+        for process, chunk, blast_file_path, start_time in running_processes.values():
+            process.terminate()
+        for process, chunk, blast_file_path, start_time in running_processes.values():
+            process.join()
+            if process.exitcode == 0:
+                finish_chunk(manifest_path, manifest, chunk, blast_file_path, hsps_reader)
+            elif os.path.isfile(blast_file_path + ".tmp"):
+                os.remove(blast_file_path + ".tmp")
+
         return 1
     else:
         return 0
 
 
+# Mark a chunk whose blastp process has finished successfully as done: rename its complete output file, save the
+# manifest and pass the output file to the HSPs reader
+def finish_chunk(manifest_path, manifest, chunk, blast_file_path, hsps_reader):
+    if os.path.isfile(blast_file_path + ".tmp"):
+        os.replace(blast_file_path + ".tmp", blast_file_path)
+    else:
+        open(blast_file_path, 'w').close()
+    chunk['status'] = 'done'
+    write_manifest(manifest_path, manifest)
+
+    if hsps_reader is not None:
+        hsps_reader.add_file(blast_file_path)
+
+
+# Stop the blastp command when its process is terminated (subprocess.run kills the command when it is interrupted)
+def stop_blastp(signum, frame):
+    sys.exit(1)
+
+
 def run_blastp(infile, blast_db_file_path, outfile, evalue, outfmt, max_hsps, max_target_seqs, threads_num, gapopen,
                gapext):
+    signal.signal(signal.SIGTERM, stop_blastp)
+
     command = "blastp -query " + infile + " -db " + blast_db_file_path + " -evalue " + str(evalue) + \
               " -out " + outfile + " -outfmt " + outfmt + " -max_target_seqs " + str(max_target_seqs) + \
               " -max_hsps " + str(max_hsps) + " -seg no -gapopen " + str(gapopen) + " -gapextend " + str(gapext) + \
@@ -258,52 +433,131 @@ def run_blastp(infile, blast_db_file_path, outfile, evalue, outfmt, max_hsps, ma
         sys.exit(1)
 
 
-def read_blast_HSPs(blast_out_dir):
-    error = ""
+# Reads the tabular BLAST output files (qacc sacc evalue) on a background thread, while the search is still running.
+# The HSPs are parsed in bulk and appended to growing NumPy arrays (index1, index2, E-value), so the memory is
+# proportional to the number of HSPs.
+class HSPsReader:
+
+    def __init__(self):
+        self.files_queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.files_num = 0
+        self.hsps_num = 0
+        self.pairs_index1 = np.zeros(hsps_initial_capacity, dtype=np.int64)
+        self.pairs_index2 = np.zeros(hsps_initial_capacity, dtype=np.int64)
+        self.pairs_values = np.zeros(hsps_initial_capacity)
+        self.error = ""
+
+    def start(self):
+        self.thread.start()
+
+    # Add an output file to the reading queue
+    def add_file(self, file_path):
+        self.files_queue.put(file_path)
+
+    # Wait until all the files in the queue were read
+    def finish(self):
+        self.files_queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            file_path = self.files_queue.get()
+            if file_path is None:
+                break
 
-    # Create a 2D Numpy array for the similarity values and initialize it with 100
-    cfg.similarity_values_mtx = np.full([cfg.run_params['total_sequences_num'],
-                                         cfg.run_params['total_sequences_num']], 100, dtype=float)
-    cfg.attraction_values_mtx = np.zeros([cfg.run_params['total_sequences_num'],
-                                          cfg.run_params['total_sequences_num']])
+            try:
+                self.read_file(file_path)
+            except Exception as err:
+                self.error = "Error reading the BLAST output file " + file_path + ":\n" + str(err)
 
-    blast_files_list = []
-    for file in os.listdir(blast_out_dir):
-        if re.search(r"^.+\.blast", file):  # List only blast files
-            blast_files_list.append(file)
-    files_num = len(blast_files_list)
+    def read_file(self, file_path):
+        if not os.path.isfile(file_path):
+            return
+        self.files_num += 1
 
-    # Verify that there are any output files in the output directory
-    if files_num == 0:
-        error = "No blast output files."
-        return error
+        with open(file_path) as infile:
+            while True:
+                lines = infile.readlines(hsps_chunk_size)
+                if len(lines) == 0:
+                    break
+                self.add_hsps(*parse_blast_lines(lines))
+
+    # Append the HSPs to the arrays (doubling their size when needed)
+    def add_hsps(self, pairs_index1, pairs_index2, pairs_values):
+        new_hsps_num = self.hsps_num + len(pairs_index1)
+
+        if new_hsps_num > len(self.pairs_index1):
+            capacity = max(new_hsps_num, 2 * len(self.pairs_index1))
+            self.pairs_index1 = np.resize(self.pairs_index1, capacity)
+            self.pairs_index2 = np.resize(self.pairs_index2, capacity)
+            self.pairs_values = np.resize(self.pairs_values, capacity)
+
+        self.pairs_index1[self.hsps_num:new_hsps_num] = pairs_index1
+        self.pairs_index2[self.hsps_num:new_hsps_num] = pairs_index2
+        self.pairs_values[self.hsps_num:new_hsps_num] = pairs_values
+        self.hsps_num = new_hsps_num
+
+    # Save the pairs in the sparse similarity arrays (keeping the lowest E-value for each pair)
+    def save_similarity_values(self):
+        if self.error != "":
+            return self.error
+
+        # Verify that there are any output files
+        if self.files_num == 0:
+            return "No blast output files."
+
+        sp.set_similarity_values(self.pairs_index1[:self.hsps_num], self.pairs_index2[:self.hsps_num],
+                                 self.pairs_values[:self.hsps_num], 'hsp')
+        return ""
+
+
+# Parse lines of tabular BLAST output (<query index> <subject index> <E-value>) into NumPy arrays.
+# The lines are split together; if they do not all have the expected three fields, they are parsed one by one
+# and the invalid lines are ignored. Only the pairs with index1 < index2 are returned.
+def parse_blast_lines(lines):
+    fields = "".join(lines).split()
 
-    # A loop over the files in the output dir
-    for file in blast_files_list:
+    try:
+        if len(fields) != 3 * len(lines):
+            raise ValueError
+        index1 = np.array(fields[0::3], dtype=np.int64)
+        index2 = np.array(fields[1::3], dtype=np.int64)
+        is_pair = index1 < index2
+        evalues = np.array(fields[2::3], dtype=object)[is_pair].astype(float)
+        if np.any(index1 < 0) or np.any(index2 < 0):
+            raise ValueError
+        return index1[is_pair], index2[is_pair], evalues
+
+    except ValueError:
+        pairs_index1 = []
+        pairs_index2 = []
+        pairs_values = []
+
+        for line in lines:
+            m = re.search(r"^(\d+)\s+(\d+)\s+(\S+)", line.strip())
+            if m:
+                index1 = int(m.group(1))
+                index2 = int(m.group(2))
+
+                if index1 < index2:
+                    pairs_index1.append(index1)
+                    pairs_index2.append(index2)
+                    pairs_values.append(float(m.group(3)))
+
+        return np.array(pairs_index1, dtype=np.int64), np.array(pairs_index2, dtype=np.int64), \
+            np.array(pairs_values, dtype=float)
+
+
+# Read all the BLAST output files in a directory (after the search has finished)
+def read_blast_HSPs(blast_out_dir):
+    hsps_reader = HSPsReader()
 
-        file_path = blast_out_dir + file
+    for file in os.listdir(blast_out_dir):
+        if re.search(r"^.+\.blast", file):  # List only blast files
+            hsps_reader.read_file(blast_out_dir + file)
 
-        with open(file_path) as infile:
-            for line in infile:
-                m = re.search(r"^(\d+)\s+(\d+)\s+(\S+)", line.strip())
-                if m:
-                    index1 = int(m.group(1))
-                    index2 = int(m.group(2))
-                    evalue = float(m.group(3))
-
-                    if index1 < index2:
-                        # Assign the Evalue to the pair + reciprocal pair
-                        if float(evalue) == 0.0:
-                            cfg.similarity_values_mtx[index1][index2] = 10 ** -180
-                            cfg.similarity_values_mtx[index2][index1] = 10 ** -180
-                        else:
-                            cfg.similarity_values_mtx[index1][index2] = evalue
-                            cfg.similarity_values_mtx[index2][index1] = evalue
-
-                        pair_tuple = (index1, index2, evalue)
-                        cfg.similarity_values_list.append(pair_tuple)
-
-    return error
+    return hsps_reader.save_similarity_values()
 
 
 # Calculate and save the attraction values and apply the similarity cutoff
@@ -47,17 +47,28 @@ def run_cmd():
         print(err)
         exit()
 
-    # Run the Fruchterman-Reingold layout calculation for the defined number of rounds
+    # Run the Fruchterman-Reingold layout calculation for the defined number of rounds (or until convergence)
     try:
-        if cfg.run_params['num_of_rounds'] > 0:
-            print("Running clustering of " + str(cfg.run_params['num_of_rounds']) + " rounds")
+        if cfg.run_params['num_of_rounds'] > 0 or cfg.run_params['convergence_threshold'] is not None:
+            if cfg.run_params['convergence_threshold'] is not None:
+                print("Running clustering until convergence (maximum " + str(cfg.run_params['max_rounds']) +
+                      " rounds)")
+            else:
+                print("Running clustering of " + str(cfg.run_params['num_of_rounds']) + " rounds")
             before = time.time()
             lh.calculate_layout("FR")
             after = time.time()
             duration = (after - before)
+            if cfg.run_params['is_problem']:
+                print(cfg.run_params['error'])
+                exit()
             if cfg.run_params['is_debug_mode'] and cfg.run_params['rounds_done'] % 100 != 0:
                 print("The calculation of " + str(cfg.run_params['rounds_done']) + " rounds took " + str(duration) +
                       " seconds")
+            if cfg.run_params['is_debug_mode']:
+                print("Compiling the numba functions took " + str(cfg.run_params['layout_compile_time']) +
+                      " seconds, executing the rounds took " +
+                      str(duration - cfg.run_params['layout_compile_time']) + " seconds")
 
     except Exception as err:
         print("An error has occurred while running the Fruchterman-Reingold layout calculation")
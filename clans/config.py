@@ -1,5 +1,4 @@
 import numpy as np
-from vispy.color import ColorArray
 import clans
 
 ## Defaults
@@ -13,8 +12,8 @@ output_format = 'clans'
 # Blast-related default parameters
 BLAST_Evalue_cutoff = 1.0
 BLAST_scoring_matrix = 'BLOSUM62'
-BLAST_threads_num = 2
-blast_batch_size = 500
+blast_chunk_min_residues = 20000  # the minimal number of residues in a chunk of query sequences
+blast_chunks_per_core = 4  # the number of query chunks per core (for distributing the work evenly)
 
 # Clustering parameters defaults
 similarity_cutoff = 1e-4
@@ -24,10 +23,12 @@ num_of_dimensions = 3
 nodes_color = [0.0, 0.0, 0.0, 1.0]
 nodes_outline_color = [0.0, 0.0, 0.0, 1.0]
 hide_color = [1.0, 1.0, 1.0, 0.0]
-min_param_color = ColorArray([1.0, 1.0, 0.0, 1.0])
-max_param_color = ColorArray([1.0, 0.0, 0.0, 1.0])
-short_color = ColorArray([1.0, 1.0, 0.0, 1.0])
-long_color = ColorArray([1.0, 0.0, 0.0, 1.0])
+# The default colors of the numeric parameters and the sequence length (vispy ColorArray objects).
+# They are created on first use (see __getattr__ below), so the command-line mode does not import vispy
+default_gradient_colors = {'min_param_color': [1.0, 1.0, 0.0, 1.0],
+                           'max_param_color': [1.0, 0.0, 0.0, 1.0],
+                           'short_color': [1.0, 1.0, 0.0, 1.0],
+                           'long_color': [1.0, 0.0, 0.0, 1.0]}
 inactive_color = "#A0A0A0"
 title_color = "maroon"
 
@@ -53,13 +54,16 @@ layouts = {'FR':
                      'att_exp': 1,
                      'rep_exp': 1,
                      'dampening': 0.2,
-                     'gravity': 1.0}}}
+                     'gravity': 1.0,
+                     'is_barnes_hut': False,
+                     'theta': 0.5}}}
 
 ## Running parameters
 run_params = {  # a dict to hold all the running parameters (given by the user / defaults) - filled by parser.py
     'is_problem': False,
     'error': None,
     'no_gui': False,
+    'precompile': False,  # compile the numba functions (saving them in the on-disk cache) and exit
     'total_sequences_num': 1,
     'input_format': input_format,
     'input_file': None,
@@ -74,6 +78,14 @@ run_params = {  # a dict to hold all the running parameters (given by the user /
     'dimensions_num_for_clustering': num_of_dimensions,
     'num_of_rounds': 0,
     'rounds_done': 0,
+    'layout_compile_time': 0.0,  # the seconds spent on compiling numba functions during the layout calculation
+    'convergence_threshold': None,  # stop the layout when the maximal movement is below it (None = no convergence check)
+    'convergence_patience': 20,  # the number of successive rounds below the threshold required for convergence
+    'max_rounds': 10000,  # the maximal number of rounds when running until convergence
+    'checkpoint_file': None,  # a .npz file for saving / resuming the state of the layout calculation (command-line)
+    'checkpoint_rounds': 0,  # save a checkpoint every K rounds (0 = never)
+    'checkpoint_seconds': 0,  # save a checkpoint every T seconds (0 = never)
+    'resume': False,  # continue the layout calculation from the checkpoint file
     'cooling': layouts['FR']['params']['cooling'],
     'maxmove': layouts['FR']['params']['maxmove'],
     'att_val': layouts['FR']['params']['att_val'],
@@ -82,6 +94,19 @@ run_params = {  # a dict to hold all the running parameters (given by the user /
     'rep_exp': layouts['FR']['params']['rep_exp'],
     'dampening': layouts['FR']['params']['dampening'],
     'gravity': layouts['FR']['params']['gravity'],
+    'is_barnes_hut': layouts['FR']['params']['is_barnes_hut'],
+    'theta': layouts['FR']['params']['theta'],
+    'is_multilevel': False,  # initialize the layout by coarsening the graph and refining its layout level by level
+    'multilevel_rounds': 300,  # the number of layout rounds (cooling schedule) of each level in the multilevel init.
+    'multilevel_temp': 100.0,  # the starting temperature of each level, lowered to 1 over multilevel_rounds rounds
+    'multilevel_min_sequences': 100,  # stop coarsening the graph when it has fewer sequences than this number
+    'multilevel_threshold': 0.01,  # each level converges when its max. movement is below it (without -converge)
+    'threads_num': None,  # the number of threads for the layout calculation (None = all the available cores)
+    'frames_per_second': 25,  # the target redraw rate of the graph during the clustering (GUI), 0 = after every round
+    'rounds_per_frame': 0,  # redraw the graph every K rounds during the clustering (GUI), 0 = use frames_per_second
+    'is_layout_process': False,  # perform the clustering in a separate process (GUI)
+    'edges_lod_budget': 100000,  # the max. number of connections displayed while the view moves (GUI), 0 = all
+    'edges_lod_idle_time': 300,  # display all the connections after the view is idle for this time (milliseconds)
     'nodes_size': 8,
     'nodes_color': [0.0, 0.0, 0.0, 1.0],
     'nodes_outline_color': [0.0, 0.0, 0.0, 1.0],
@@ -150,11 +175,26 @@ groups_by_categories.append({
 })
 
 fasta_seq_list = []  # a list of the original fasta sequences (in case the user runs blast)
-similarity_values_list = []  # a list of the non-redundant significant HSPs ('seq1_index', 'seq2_index', 'Evalue')
-similarity_values_mtx = []  # a 2D matrix filled with Evalues for all pairs (redundant). The diagonal and non-significant pairs = 1
-attraction_values_mtx = []  # a 2D matrix filled with attraction values for all pairs (redundant). The diagonal and non-significant pairs = 0
-connected_sequences_mtx = []  # a boolean matrix (redundant). 1 for connected sequences (according to current Pvalue cutoff)
-connected_sequences_mtx_subset = []
+# The similarity values are saved in a sparse (COO) representation: 1D arrays holding the non-redundant pairs
+# of sequences that have a similarity value (index1 < index2), sorted by index1 and then by index2.
+# Non-significant pairs (no HSP) are not saved at all, so the memory grows with the number of pairs and not with N^2
+pairs_index1 = np.zeros(0, dtype=int)  # the index of the first sequence in each pair
+pairs_index2 = np.zeros(0, dtype=int)  # the index of the second sequence in each pair
+similarity_values = np.zeros(0)  # the E-value (hsp) or the given attraction value (att) of each pair
+attraction_values = np.zeros(0)  # the attraction value (0-1) of each pair
+connected_pairs = np.zeros(0, dtype=bool)  # True for connected pairs (according to the current P-value cutoff)
+# The pairs sorted by their similarity (the most similar first), so the connected pairs under any cutoff are a prefix
+# of the sorted pairs (their number is found by a binary search)
+sorted_pairs_order = None  # the indices of the sorted pairs (None = not sorted yet)
+sorted_pairs = np.zeros((0, 2), dtype=int)  # the sorted pairs ([index1, index2])
+sorted_pairs_keys = np.zeros(0)  # the sorted E-values (hsp) / minus the attraction values (att)
+sorted_att_values = np.zeros(0)  # the attraction values of the sorted pairs
+connected_pairs_num = 0  # the number of connected pairs (the length of the prefix)
+# An index of the pairs by their first sequence (CSR): the pairs of sequence i (as index1) are
+# pairs_index_ptr[i]:pairs_index_ptr[i+1], and their positions in the sorted pairs are in pairs_sorted_position
+pairs_index_ptr = np.zeros(1, dtype=int)
+pairs_sorted_position = np.zeros(0, dtype=int)  # the position of each pair in the sorted pairs
+connections_per_sequence = np.zeros(0, dtype=int)  # the number of connections of each sequence
 connected_sequences_list = []  # a 2D matrix listing the pairs of connected sequences according to the current P-value (non-redundant).
 att_values_for_connected_list = []  # a 2D matrix listing the attraction values of connected sequences according to the current P-value (non-redundant).
 connected_sequences_list_subset = []  # a 2D matrix listing the pairs of connected sequences according to the current P-value (non-redundant).
@@ -191,6 +231,11 @@ icons_dir = str(clans.__path__[0]) + "/clans/GUI/icons/"
 input_example_dir = str(clans.__path__[0]) + "/input_example/"
 
 
+# Create the default gradient colors on their first use
+def __getattr__(name):
+    if name in default_gradient_colors:
+        from vispy.color import ColorArray
+        globals()[name] = ColorArray(default_gradient_colors[name])
+        return globals()[name]
 
-
-
+    raise AttributeError("module '" + __name__ + "' has no attribute '" + name + "'")
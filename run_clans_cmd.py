@@ -7,11 +7,17 @@ import clans.clans.io.parser as parser
 import clans.clans.io.file_handler as fh
 import clans.clans.similarity_search.blast as blast
 import clans.clans.layouts.layout_handler as lh
+import clans.clans.layouts.precompile as precompile
 
 # Parse the command-line arguments
 parser.parse_arguments()
 cfg.run_params['working_dir'] = os.getcwd()
 
+# Compile the numba functions, save them in the on-disk cache and exit
+if cfg.run_params['precompile']:
+    precompile.run_precompile()
+    exit()
+
 # Read the input file (fasta/clans/delimited) and fill the relevant main data-structures
 try:
     print("Reading the input file")
@@ -51,17 +57,28 @@ except Exception as err:
     print(err)
     exit()
 
-# Run the Fruchterman-Reingold layout calculation for the defined number of rounds
+# Run the Fruchterman-Reingold layout calculation for the defined number of rounds (or until convergence)
 try:
-    if cfg.run_params['num_of_rounds'] > 0:
-        print("Running clustering of " + str(cfg.run_params['num_of_rounds']) + " rounds")
+    if cfg.run_params['num_of_rounds'] > 0 or cfg.run_params['convergence_threshold'] is not None:
+        if cfg.run_params['convergence_threshold'] is not None:
+            print("Running clustering until convergence (maximum " + str(cfg.run_params['max_rounds']) +
+                  " rounds)")
+        else:
+            print("Running clustering of " + str(cfg.run_params['num_of_rounds']) + " rounds")
         before = time.time()
         lh.calculate_layout("FR")
         after = time.time()
         duration = (after - before)
+        if cfg.run_params['is_problem']:
+            print(cfg.run_params['error'])
+            exit()
         if cfg.run_params['is_debug_mode'] and cfg.run_params['rounds_done'] % 100 != 0:
             print("The calculation of " + str(cfg.run_params['rounds_done']) + " rounds took " + str(duration) +
                   " seconds")
+        if cfg.run_params['is_debug_mode']:
+            print("Compiling the numba functions took " + str(cfg.run_params['layout_compile_time']) +
+                  " seconds, executing the rounds took " + str(duration - cfg.run_params['layout_compile_time']) +
+                  " seconds")
 
 except Exception as err:
     print("An error has occurred while running the Fruchterman-Reingold layout calculation")